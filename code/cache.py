@@ -0,0 +1,96 @@
+"""
+Small thread-safe in-memory cache with per-entry expiry, and single-flight
+coalescing of concurrent calls.
+
+Module-level instances survive across warm invocations of the Cloud Function,
+so metadata verified by one request can be reused by the next, and requests
+served concurrently by one instance can share a single run.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+
+class TTLCache:
+    """Dictionary-like cache whose entries expire after a number of seconds."""
+
+    def __init__(self) -> None:
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl_seconds: float) -> None:
+        """Cache value under key for ttl_seconds; a TTL <= 0 disables caching."""
+        if ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+
+    def invalidate(self, key) -> None:
+        """Drop the entry for key if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; concurrent callers with the same
+    key wait for it and share its result (or exception).
+    """
+
+    def __init__(self) -> None:
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Call fn, or wait for the call already in flight for key.
+
+        Returns:
+            (fn's result, True if it came from another caller's call)
+
+        Raises:
+            Whatever fn raised, in every caller that shared the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result, False
+        finally:
+            # Callers arriving from now on start a new call.
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        """Number of keys with a call running."""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,248 @@
+"""
+Incremental "changes since the last scan" for inventory tables.
+
+For tables with a change_key in TABLE_CONFIGS, the ingestion paths keep a
+snapshot of every instance's last scan under CHANGES_SNAPSHOT_URI: one entry
+per item (its change_key values) with a hash of the item's contents. Each
+new scan is compared with that snapshot as its rows go by, and one row per
+added, removed or modified item is written to the table's <table_id>_changes
+companion. "What changed" queries then read those delta rows instead of
+self-joining two full scans.
+
+A scan is the set of rows sharing client_instance_id and
+scan_time_timestamp, and may arrive split over several ingest or load
+calls: the snapshot also holds the scan still being received, and rows of
+that scan in later calls are merged into it. ADDED and MODIFIED rows are
+written as soon as their item is seen. Which items a scan no longer has is
+only known once it is complete, so its REMOVED rows are written when the
+instance's next (newer) scan arrives. Scans of an instance are expected in
+time order; rows of a scan older than the one being received are ignored
+here (they are still written to the table itself).
+"""
+
+import hashlib
+import json
+import logging
+
+import pyarrow as pa
+
+import config
+from dedup import INSTANCE_COLUMN, IndexStore
+
+SCAN_TIME_COLUMN = "scan_time_timestamp"
+
+# Columns describing where and when an item was seen rather than the item.
+_CONTEXT_COLUMNS = {INSTANCE_COLUMN, "client_account_id", "client_volume_id", SCAN_TIME_COLUMN}
+
+_SNAPSHOT_SCHEMA = pa.schema(
+    [
+        ("item_key", pa.string()),
+        ("content_hash", pa.string()),
+        ("row", pa.string()),
+        ("scan_time", pa.timestamp("us", tz="UTC")),
+        ("client_account_id", pa.string()),
+        # True for items of the scan still being received (null in
+        # snapshots written before scans could span calls).
+        ("open", pa.bool_()),
+    ]
+)
+
+
+def _to_json(value) -> str:
+    return json.dumps(
+        value,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=lambda v: v.isoformat() if hasattr(v, "isoformat") else str(v),
+    )
+
+
+def _merge_snapshots(stored: pa.Table, ours: pa.Table) -> pa.Table:
+    """
+    Combine a snapshot another call stored concurrently with this one's.
+
+    Items of both are kept per scan (this call's entry wins for an item both
+    saw); the newest scan stays open if either had it open, with the scan
+    before it as the last complete one, and older scans are dropped.
+    """
+    entries = {}
+    for entry in [*stored.to_pylist(), *ours.to_pylist()]:
+        entries[(entry["scan_time"], entry["item_key"])] = entry
+    if not entries:
+        return ours
+    scan_times = sorted({scan_time for scan_time, _ in entries}, reverse=True)
+    newest = scan_times[0]
+    newest_open = any(e["open"] for (t, _), e in entries.items() if t == newest)
+    kept = scan_times[:2] if newest_open else scan_times[:1]
+    return pa.Table.from_pylist(
+        [
+            {**entry, "open": scan_time == newest and newest_open}
+            for (scan_time, _), entry in entries.items()
+            if scan_time in kept
+        ],
+        schema=_SNAPSHOT_SCHEMA,
+    )
+
+
+class _InstanceScans:
+    """The last complete scan of one instance and the scan being received."""
+
+    def __init__(self, snapshot: pa.Table):
+        self.previous, self.current = {}, {}
+        self.previous_time = self.current_time = None
+        self.account_id = None
+        for entry in snapshot.to_pylist():
+            if entry["open"]:
+                self.current[entry["item_key"]] = entry
+                self.current_time = entry["scan_time"]
+            else:
+                self.previous[entry["item_key"]] = entry
+                self.previous_time = entry["scan_time"]
+            self.account_id = entry["client_account_id"] or self.account_id
+        self.changed = False
+
+
+class ChangeTracker:
+    """
+    Diffs consecutive scans of each instance for one table.
+
+    observe() is fed every converted batch, finish() returns the change rows
+    once the input is exhausted, and commit() stores the new snapshots
+    (including the scan still being received) after those rows have been
+    written.
+    """
+
+    def __init__(self, table_config: dict, store: IndexStore):
+        self.table_id = table_config["table_id"]
+        self.change_table_id = table_config["table_id"] + config.CHANGE_TABLE_SUFFIX
+        self.key_columns = table_config["change_key"]
+        self.store = store
+        self._instances = {}
+        self._changes = []
+
+    def _scans(self, instance_id) -> _InstanceScans:
+        if instance_id not in self._instances:
+            snapshot = self.store.read(self.table_id, instance_id)
+            self._instances[instance_id] = _InstanceScans(snapshot)
+        return self._instances[instance_id]
+
+    def _change(self, scans, instance_id, change_type, key, row=None, previous=None):
+        self._changes.append(
+            {
+                INSTANCE_COLUMN: instance_id,
+                "client_account_id": scans.account_id,
+                SCAN_TIME_COLUMN: scans.current_time,
+                "previous_scan_time_timestamp": scans.previous_time,
+                "change_type": change_type,
+                "item_key": key,
+                "row": row,
+                "previous_row": previous,
+            }
+        )
+
+    def _close_scan(self, instance_id, scans: _InstanceScans) -> None:
+        """Report items missing from the complete current scan and make it the previous one."""
+        if scans.current_time is None:
+            return
+        for key, entry in scans.previous.items():
+            if key not in scans.current:
+                self._change(scans, instance_id, "REMOVED", key, previous=entry["row"])
+        scans.previous = scans.current
+        scans.previous_time = scans.current_time
+        scans.current, scans.current_time = {}, None
+        scans.changed = True
+
+    def observe(self, batch: pa.RecordBatch) -> None:
+        """Compare the rows of a converted batch with their instance's last scan."""
+        for row in batch.to_pylist():
+            scan_time = row.get(SCAN_TIME_COLUMN)
+            if scan_time is None:
+                continue
+            instance_id = row.get(INSTANCE_COLUMN)
+            scans = self._scans(instance_id)
+            if scans.current_time is None or scan_time > scans.current_time:
+                if scans.previous_time is not None and scan_time <= scans.previous_time:
+                    continue
+                # A newer scan means the current one is complete.
+                self._close_scan(instance_id, scans)
+                scans.current_time = scan_time
+            elif scan_time < scans.current_time:
+                continue
+            scans.account_id = row.get("client_account_id") or scans.account_id
+
+            key = _to_json([row.get(c) for c in self.key_columns])
+            item = {k: v for k, v in row.items() if k not in _CONTEXT_COLUMNS}
+            row_json = _to_json(item)
+            content_hash = hashlib.blake2b(row_json.encode(), digest_size=16).hexdigest()
+            if key in scans.current:
+                # Already seen in this scan (e.g. a resent chunk).
+                continue
+            scans.current[key] = {"content_hash": content_hash, "row": row_json}
+            scans.changed = True
+
+            previous = scans.previous.get(key)
+            if previous is None:
+                self._change(scans, instance_id, "ADDED", key, row=row_json)
+            elif previous["content_hash"] != content_hash:
+                self._change(
+                    scans, instance_id, "MODIFIED", key, row=row_json, previous=previous["row"]
+                )
+
+    def finish(self) -> list:
+        """
+        Return all change rows, oldest scan first.
+
+        The latest scan of each instance stays open, since more of its rows
+        may come in a later call; its REMOVED rows come with the next scan.
+        """
+        changes, self._changes = self._changes, []
+        return changes
+
+    def commit(self) -> None:
+        """
+        Store the last complete scan and the open scan of every instance seen,
+        merged with any snapshot another call stored since it was read.
+        """
+        for instance_id, scans in self._instances.items():
+            if not scans.changed:
+                continue
+            snapshot = pa.Table.from_pylist(
+                [
+                    {
+                        "item_key": key,
+                        "content_hash": entry["content_hash"],
+                        "row": entry["row"],
+                        "scan_time": scan_time,
+                        "client_account_id": scans.account_id,
+                        "open": is_open,
+                    }
+                    for entries, scan_time, is_open in (
+                        (scans.previous, scans.previous_time, False),
+                        (scans.current, scans.current_time, True),
+                    )
+                    for key, entry in entries.items()
+                ],
+                schema=_SNAPSHOT_SCHEMA,
+            )
+            stored = self.store.update(
+                self.table_id,
+                instance_id,
+                snapshot,
+                lambda current, snapshot=snapshot: _merge_snapshots(current, snapshot),
+            )
+            if stored is not snapshot:
+                self._instances[instance_id] = _InstanceScans(stored)
+            scans.changed = False
+            logging.info(
+                "Change snapshot for %s/%s holds %d item(s)",
+                self.table_id,
+                instance_id,
+                stored.num_rows,
+            )
+
+
+def get_change_tracker(table_config: dict):
+    """Return a ChangeTracker for the table, or None if changes are not tracked."""
+    if not table_config.get("change_key") or not config.CHANGES_SNAPSHOT_URI:
+        return None
+    return ChangeTracker(table_config, IndexStore(config.CHANGES_SNAPSHOT_URI, _SNAPSHOT_SCHEMA))
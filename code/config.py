@@ -1,492 +1,702 @@
-from google.cloud import bigquery
+import functools
+import json
 import os
 
+from schema import Field
+
 # ---------------------------
 # GLOBAL CONFIGURATION
 # ---------------------------
-PROJECT_ID = os.environ["PROJECT_ID"]
-DATASET_ID = os.environ["DATASET_ID"]
-LOCATION = os.environ["LOCATION"]
+# PROJECT_ID, DATASET_ID and LOCATION are required env vars; MAX_WORKERS is
+# the upper bound on concurrent table provisioning calls sharing one client and
+# METADATA_CACHE_TTL is how long (seconds) a warm instance trusts table
+# metadata it has just verified. INGEST_BATCH_ROWS and INGEST_MAX_IN_FLIGHT
+# size the Storage Write API appends made by the ingestion entry point.
+# LOAD_STAGING_URI (gs://bucket/prefix) is where the batch-load path stages
+# its Parquet files; unset, they are spooled to local temporary files.
+# DEDUP_INDEX_URI (gs://bucket/prefix or a local directory) holds the
+# per-instance indexes of tables with a dedup_key; unset, dedup is off.
+# CHANGES_SNAPSHOT_URI likewise holds the last scan of every instance for
+# tables with a change_key; unset, their _changes tables are not populated.
+# RETENTION_TIERS (JSON tier -> days) overrides the default tier lengths and
+# RETENTION_OVERRIDES (JSON table_id -> tier) moves tables between tiers; see
+# RETENTION below. RETENTION_ARCHIVE_URI (gs://bucket/prefix) is where the
+# retention entry point exports partitions about to expire; unset, they are
+# left to expire without a copy. FLEET_MAX_TARGETS bounds how many
+# (project, dataset) targets fleet mode provisions at once,
+# FLEET_PROJECT_CONCURRENCY how many of those may share a project and
+# FLEET_MAX_ATTEMPTS how often a target with retryable failures is tried.
+# THROTTLE_QUOTA_FRACTION is the share of BigQuery's admin quotas one
+# instance paces its table and dataset calls to, and THROTTLE_MAX_ATTEMPTS
+# how often each such call is tried (see throttle.py). TELEMETRY_EXPORTERS
+# lists where provisioning spans go: "log" (structured JSON on stdout) and/or
+# "otel" (OpenTelemetry, if installed); empty keeps them in-process only.
+# They are resolved on attribute access (PEP 562) rather than at import time,
+# so the module can be imported before the environment is inspected.
+_REQUIRED_SETTINGS = ("PROJECT_ID", "DATASET_ID", "LOCATION")
+_OPTIONAL_SETTINGS = {
+    "MAX_WORKERS": ("8", int),
+    "METADATA_CACHE_TTL": ("60", float),
+    "INGEST_BATCH_ROWS": ("10000", int),
+    "INGEST_MAX_IN_FLIGHT": ("4", int),
+    "LOAD_STAGING_URI": ("", str),
+    "DEDUP_INDEX_URI": ("", str),
+    "CHANGES_SNAPSHOT_URI": ("", str),
+    "RETENTION_TIERS": ("{}", json.loads),
+    "RETENTION_OVERRIDES": ("{}", json.loads),
+    "RETENTION_ARCHIVE_URI": ("", str),
+    "FLEET_MAX_TARGETS": ("8", int),
+    "FLEET_PROJECT_CONCURRENCY": ("2", int),
+    "FLEET_MAX_ATTEMPTS": ("3", int),
+    "THROTTLE_QUOTA_FRACTION": ("0.8", float),
+    "THROTTLE_MAX_ATTEMPTS": ("6", int),
+    "TELEMETRY_EXPORTERS": ("log", str),
+}
+
+
+def __getattr__(name: str):
+    if name in _REQUIRED_SETTINGS:
+        return os.environ[name]
+    if name in _OPTIONAL_SETTINGS:
+        default, cast = _OPTIONAL_SETTINGS[name]
+        return cast(os.environ.get(name, default))
+    if name == "TABLE_CONFIGS":
+        return _resolve_table_configs(
+            os.environ.get("RETENTION_TIERS", ""), os.environ.get("RETENTION_OVERRIDES", "")
+        )
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # ---------------------------
 # TABLE CONFIGURATIONS
 # ---------------------------
-TABLE_CONFIGS = [
+# partition_type is "DAY" or "HOUR". clustering_columns (up to 4, top-level,
+# non-repeated) are ordered from the most common filter outwards: per-client
+# and per-instance lookups first, then the table's own lookup key.
+# combine_columns (optional) maps a STRING column to raw input keys that the
+# ingestion path joins into it when the column itself is not sent.
+# dedup_key (optional) lists the columns identifying an unchanged row; rows
+# already written for the same instance are dropped on ingest (see dedup.py).
+# change_key (optional) lists the columns identifying one item of an
+# instance's inventory; such tables get a <table_id>_changes companion below.
+# retention_tier names the tier (see RETENTION) whose length becomes the
+# table's partition expiration_ms; TABLE_CONFIGS is this list with the tiers
+# resolved against the environment and expiration_ms filled in.
+_TABLE_DEFINITIONS = [
     {
         "table_id": "visibility",
         "partition_column": "created_at",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,  # 7 days
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "resource_id"],
+        "retention_tier": "standard",
         "schema": [
-            bigquery.SchemaField("client_account_id", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("client_name", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("resource_name", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("resource_id", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("vpc_id", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("subnet_id", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("parent_resource_id", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("parent_resource_name", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("state", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("scan_time", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("created_at", "TIMESTAMP", mode="NULLABLE"),
-            bigquery.SchemaField("year", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("month", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("day", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("hour", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("minute", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("data", "STRING", mode="NULLABLE"),
+            Field("client_account_id", "STRING", mode="NULLABLE"),
+            Field("client_name", "STRING", mode="NULLABLE"),
+            Field("resource_name", "STRING", mode="NULLABLE"),
+            Field("resource_id", "STRING", mode="NULLABLE"),
+            Field("vpc_id", "STRING", mode="NULLABLE"),
+            Field("subnet_id", "STRING", mode="NULLABLE"),
+            Field("parent_resource_id", "STRING", mode="NULLABLE"),
+            Field("parent_resource_name", "STRING", mode="NULLABLE"),
+            Field("state", "STRING", mode="NULLABLE"),
+            Field("scan_time", "STRING", mode="NULLABLE"),
+            Field("created_at", "TIMESTAMP", mode="NULLABLE"),
+            Field("year", "STRING", mode="NULLABLE"),
+            Field("month", "STRING", mode="NULLABLE"),
+            Field("day", "STRING", mode="NULLABLE"),
+            Field("hour", "STRING", mode="NULLABLE"),
+            Field("minute", "STRING", mode="NULLABLE"),
+            Field("data", "STRING", mode="NULLABLE"),
         ],
     },
     {
         "table_id": "os_linux_auditd",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id", "type"],
+        "retention_tier": "standard",
+        "combine_columns": {"args": ["a0", "a1", "a2", "a3"]},
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("type", "STRING"),
-            bigquery.SchemaField("serial_number", "STRING", description="Extracted serial number from msg field"),
-            bigquery.SchemaField("syscall", "STRING"),
-            bigquery.SchemaField("success", "STRING"),
-            bigquery.SchemaField("args", "STRING", description="Combined arguments from a0, a1, a2, a3"),
-            bigquery.SchemaField("pid", "STRING"),
-            bigquery.SchemaField("ppid", "STRING"),
-            bigquery.SchemaField("auid", "STRING"),
-            bigquery.SchemaField("uid", "STRING"),
-            bigquery.SchemaField("gid", "STRING"),
-            bigquery.SchemaField("euid", "STRING"),
-            bigquery.SchemaField("suid", "STRING"),
-            bigquery.SchemaField("fsuid", "STRING"),
-            bigquery.SchemaField("comm", "STRING"),
-            bigquery.SchemaField("exe", "STRING"),
-            bigquery.SchemaField("subj", "STRING"),
-            bigquery.SchemaField("key", "STRING"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("event_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("event_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("event_time_timestamp_utc", "TIMESTAMP"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("client_volume_id", "STRING"),
+            Field("type", "STRING"),
+            Field("serial_number", "STRING", description="Extracted serial number from msg field"),
+            Field("syscall", "STRING"),
+            Field("success", "STRING"),
+            Field("args", "STRING", description="Combined arguments from a0, a1, a2, a3"),
+            Field("pid", "STRING"),
+            Field("ppid", "STRING"),
+            Field("auid", "STRING"),
+            Field("uid", "STRING"),
+            Field("gid", "STRING"),
+            Field("euid", "STRING"),
+            Field("suid", "STRING"),
+            Field("fsuid", "STRING"),
+            Field("comm", "STRING"),
+            Field("exe", "STRING"),
+            Field("subj", "STRING"),
+            Field("key", "STRING"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("event_time_epoch_utc", "FLOAT64"),
+            Field("event_time_timestamp", "TIMESTAMP"),
+            Field("event_time_timestamp_utc", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_linux_auth",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id", "process"],
+        "retention_tier": "standard",
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("message", "STRING"),
-            bigquery.SchemaField("process", "STRING"),
-            bigquery.SchemaField("hostname", "STRING"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("event_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("event_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("event_time_timestamp_utc", "TIMESTAMP"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("client_volume_id", "STRING"),
+            Field("message", "STRING"),
+            Field("process", "STRING"),
+            Field("hostname", "STRING"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("event_time_epoch_utc", "FLOAT64"),
+            Field("event_time_timestamp", "TIMESTAMP"),
+            Field("event_time_timestamp_utc", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_linux_cron",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id"],
+        "retention_tier": "standard",
+        "change_key": ["file_path", "command"],
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("schedule", "STRING"),
-            bigquery.SchemaField("command", "STRING"),
-            bigquery.SchemaField("file_path", "STRING"),
-            bigquery.SchemaField("user_name", "STRING"),
-            bigquery.SchemaField("last_modified_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("last_modified_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("last_modified_time_timestamp_utc", "TIMESTAMP"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("client_volume_id", "STRING"),
+            Field("schedule", "STRING"),
+            Field("command", "STRING"),
+            Field("file_path", "STRING"),
+            Field("user_name", "STRING"),
+            Field("last_modified_time_epoch_utc", "FLOAT64"),
+            Field("last_modified_time_timestamp", "TIMESTAMP"),
+            Field("last_modified_time_timestamp_utc", "TIMESTAMP"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_linux_dirlist",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id", "sha256_sum"],
+        "retention_tier": "standard",
+        "dedup_key": ["file_path", "sha256_sum", "last_modified_time_epoch_utc"],
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("file_name", "STRING"),
-            bigquery.SchemaField("file_path", "STRING"),
-            bigquery.SchemaField("md5_sum", "STRING"),
-            bigquery.SchemaField("sha1_sum", "STRING"),
-            bigquery.SchemaField("sha256_sum", "STRING"),
-            bigquery.SchemaField("file_permission", "STRING"),
-            bigquery.SchemaField("size", "INT64"),
-            bigquery.SchemaField("creation_time", "TIMESTAMP"),
-            bigquery.SchemaField("yara_results", "STRING", mode="REPEATED"),
-            bigquery.SchemaField("last_modified_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("last_modified_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("last_modified_time_timestamp_utc", "TIMESTAMP"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("owner", "STRING"),
-            bigquery.SchemaField("group", "STRING"),
-            bigquery.SchemaField("symbolic_link", "STRING"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("client_volume_id", "STRING"),
+            Field("file_name", "STRING"),
+            Field("file_path", "STRING"),
+            Field("md5_sum", "STRING"),
+            Field("sha1_sum", "STRING"),
+            Field("sha256_sum", "STRING"),
+            Field("file_permission", "STRING"),
+            Field("size", "INT64"),
+            Field("creation_time", "TIMESTAMP"),
+            Field("yara_results", "STRING", mode="REPEATED"),
+            Field("last_modified_time_epoch_utc", "FLOAT64"),
+            Field("last_modified_time_timestamp", "TIMESTAMP"),
+            Field("last_modified_time_timestamp_utc", "TIMESTAMP"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("owner", "STRING"),
+            Field("group", "STRING"),
+            Field("symbolic_link", "STRING"),
         ],
     },
     {
         "table_id": "os_linux_history",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id", "user_name"],
+        "retention_tier": "standard",
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("command", "STRING"),
-            bigquery.SchemaField("file_path", "STRING"),
-            bigquery.SchemaField("user_name", "STRING"),
-            bigquery.SchemaField("last_modified_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("last_modified_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("last_modified_time_timestamp_utc", "TIMESTAMP"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("client_volume_id", "STRING"),
+            Field("command", "STRING"),
+            Field("file_path", "STRING"),
+            Field("user_name", "STRING"),
+            Field("last_modified_time_epoch_utc", "FLOAT64"),
+            Field("last_modified_time_timestamp", "TIMESTAMP"),
+            Field("last_modified_time_timestamp_utc", "TIMESTAMP"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_linux_hosts",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id"],
+        "retention_tier": "standard",
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("ip_address", "STRING"),
-            bigquery.SchemaField("hostnames", "STRING", mode="REPEATED"),
-            bigquery.SchemaField("file_path", "STRING"),
-            bigquery.SchemaField("last_modified_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("last_modified_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("last_modified_time_timestamp_utc", "TIMESTAMP"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("client_volume_id", "STRING"),
+            Field("ip_address", "STRING"),
+            Field("hostnames", "STRING", mode="REPEATED"),
+            Field("file_path", "STRING"),
+            Field("last_modified_time_epoch_utc", "FLOAT64"),
+            Field("last_modified_time_timestamp", "TIMESTAMP"),
+            Field("last_modified_time_timestamp_utc", "TIMESTAMP"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_linux_services",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id"],
+        "retention_tier": "standard",
+        "change_key": ["file_path"],
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("creation_time", "TIMESTAMP"),
-            bigquery.SchemaField("unit", "STRING"),
-            bigquery.SchemaField("install", "STRING"),
-            bigquery.SchemaField("service", "STRING"),
-            bigquery.SchemaField("file_name", "STRING"),
-            bigquery.SchemaField("file_path", "STRING"),
-            bigquery.SchemaField("last_modified_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("last_modified_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("last_modified_time_timestamp_utc", "TIMESTAMP"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("client_volume_id", "STRING"),
+            Field("creation_time", "TIMESTAMP"),
+            Field("unit", "STRING"),
+            Field("install", "STRING"),
+            Field("service", "STRING"),
+            Field("file_name", "STRING"),
+            Field("file_path", "STRING"),
+            Field("last_modified_time_epoch_utc", "FLOAT64"),
+            Field("last_modified_time_timestamp", "TIMESTAMP"),
+            Field("last_modified_time_timestamp_utc", "TIMESTAMP"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_linux_users_groups",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id"],
+        "retention_tier": "standard",
+        "change_key": ["file_path", "group_name", "username"],
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("group_name", "STRING"),
-            bigquery.SchemaField("gid", "STRING"),
-            bigquery.SchemaField("members", "STRING", mode="REPEATED"),
-            bigquery.SchemaField("file_path", "STRING"),
-            bigquery.SchemaField("last_modified_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("last_modified_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("last_modified_time_timestamp_utc", "TIMESTAMP"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("runas", "STRING", mode="REPEATED"),
-            bigquery.SchemaField("commands", "STRING", mode="REPEATED"),
-            bigquery.SchemaField("uid", "STRING"),
-            bigquery.SchemaField("username", "STRING"),
-            bigquery.SchemaField("description", "STRING"),
-            bigquery.SchemaField("home_directory", "STRING"),
-            bigquery.SchemaField("shell", "STRING"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("group_name", "STRING"),
+            Field("gid", "STRING"),
+            Field("members", "STRING", mode="REPEATED"),
+            Field("file_path", "STRING"),
+            Field("last_modified_time_epoch_utc", "FLOAT64"),
+            Field("last_modified_time_timestamp", "TIMESTAMP"),
+            Field("last_modified_time_timestamp_utc", "TIMESTAMP"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("runas", "STRING", mode="REPEATED"),
+            Field("commands", "STRING", mode="REPEATED"),
+            Field("uid", "STRING"),
+            Field("username", "STRING"),
+            Field("description", "STRING"),
+            Field("home_directory", "STRING"),
+            Field("shell", "STRING"),
         ],
     },
     {
         "table_id": "os_windows_dirlist",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id", "sha256_sum"],
+        "retention_tier": "standard",
+        "dedup_key": ["file_path", "sha256_sum", "last_modified_time_epoch_utc"],
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("file_name", "STRING"),
-            bigquery.SchemaField("file_path", "STRING"),
-            bigquery.SchemaField("md5_sum", "STRING"),
-            bigquery.SchemaField("sha1_sum", "STRING"),
-            bigquery.SchemaField("sha256_sum", "STRING"),
-            bigquery.SchemaField("file_permission", "STRING"),
-            bigquery.SchemaField("size", "INT64"),
-            bigquery.SchemaField("creation_time", "TIMESTAMP"),
-            bigquery.SchemaField("yara_results", "STRING", mode="REPEATED"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("last_modified_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("last_modified_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("last_modified_time_timestamp_utc", "TIMESTAMP"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("file_name", "STRING"),
+            Field("file_path", "STRING"),
+            Field("md5_sum", "STRING"),
+            Field("sha1_sum", "STRING"),
+            Field("sha256_sum", "STRING"),
+            Field("file_permission", "STRING"),
+            Field("size", "INT64"),
+            Field("creation_time", "TIMESTAMP"),
+            Field("yara_results", "STRING", mode="REPEATED"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("client_volume_id", "STRING"),
+            Field("last_modified_time_epoch_utc", "FLOAT64"),
+            Field("last_modified_time_timestamp", "TIMESTAMP"),
+            Field("last_modified_time_timestamp_utc", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_windows_event_logs",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id", "windows_event_id"],
+        "retention_tier": "standard",
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("file_name", "STRING"),
-            bigquery.SchemaField("event_id", "STRING"),
-            bigquery.SchemaField("windows_event_id", "STRING"),
-            bigquery.SchemaField("event_description", "STRING"),
-            bigquery.SchemaField(
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("file_name", "STRING"),
+            Field("event_id", "STRING"),
+            Field("windows_event_id", "STRING"),
+            Field("event_description", "STRING"),
+            Field(
                 "data",
                 "RECORD",
                 fields=[
-                    bigquery.SchemaField("Provider", "RECORD", fields=[
-                        bigquery.SchemaField("Name", "STRING"),
-                        bigquery.SchemaField("Guid", "STRING"),
+                    Field("Provider", "RECORD", fields=[
+                        Field("Name", "STRING"),
+                        Field("Guid", "STRING"),
                     ]),
-                    bigquery.SchemaField("EventID", "STRING"),
-                    bigquery.SchemaField("Version", "STRING"),
-                    bigquery.SchemaField("Level", "STRING"),
-                    bigquery.SchemaField("Task", "STRING"),
-                    bigquery.SchemaField("Opcode", "STRING"),
-                    bigquery.SchemaField("Keywords", "STRING"),
-                    bigquery.SchemaField("TimeCreated", "RECORD", fields=[
-                        bigquery.SchemaField("SystemTime", "TIMESTAMP"),
+                    Field("EventID", "STRING"),
+                    Field("Version", "STRING"),
+                    Field("Level", "STRING"),
+                    Field("Task", "STRING"),
+                    Field("Opcode", "STRING"),
+                    Field("Keywords", "STRING"),
+                    Field("TimeCreated", "RECORD", fields=[
+                        Field("SystemTime", "TIMESTAMP"),
                     ]),
-                    bigquery.SchemaField("EventRecordID", "STRING"),
-                    bigquery.SchemaField("Correlation", "RECORD", fields=[
-                        bigquery.SchemaField("ActivityID", "STRING"),
-                        bigquery.SchemaField("RelatedActivityID", "STRING"),
+                    Field("EventRecordID", "STRING"),
+                    Field("Correlation", "RECORD", fields=[
+                        Field("ActivityID", "STRING"),
+                        Field("RelatedActivityID", "STRING"),
                     ]),
-                    bigquery.SchemaField("Execution", "RECORD", fields=[
-                        bigquery.SchemaField("ProcessID", "STRING"),
-                        bigquery.SchemaField("ThreadID", "STRING"),
+                    Field("Execution", "RECORD", fields=[
+                        Field("ProcessID", "STRING"),
+                        Field("ThreadID", "STRING"),
                     ]),
-                    bigquery.SchemaField("Channel", "STRING"),
-                    bigquery.SchemaField("Computer", "STRING"),
-                    bigquery.SchemaField("Security", "RECORD", fields=[
-                        bigquery.SchemaField("UserID", "STRING"),
+                    Field("Channel", "STRING"),
+                    Field("Computer", "STRING"),
+                    Field("Security", "RECORD", fields=[
+                        Field("UserID", "STRING"),
                     ]),
-                    bigquery.SchemaField("Data", "STRING"),
+                    Field("Data", "STRING"),
                 ],
             ),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("event_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("event_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("event_time_timestamp_utc", "TIMESTAMP"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("client_volume_id", "STRING"),
+            Field("event_time_epoch_utc", "FLOAT64"),
+            Field("event_time_timestamp", "TIMESTAMP"),
+            Field("event_time_timestamp_utc", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_windows_file_system_autoruns",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id", "sha256_sum"],
+        "retention_tier": "standard",
+        "dedup_key": ["file_path", "sha256_sum", "last_modified_time_epoch_utc"],
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("file_name", "STRING"),
-            bigquery.SchemaField("file_path", "STRING"),
-            bigquery.SchemaField("md5_sum", "STRING"),
-            bigquery.SchemaField("sha1_sum", "STRING"),
-            bigquery.SchemaField("sha256_sum", "STRING"),
-            bigquery.SchemaField("file_owner", "STRING"),
-            bigquery.SchemaField("creation_time", "TIMESTAMP"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("last_modified_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("last_modified_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("last_modified_time_timestamp_utc", "TIMESTAMP"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("file_name", "STRING"),
+            Field("file_path", "STRING"),
+            Field("md5_sum", "STRING"),
+            Field("sha1_sum", "STRING"),
+            Field("sha256_sum", "STRING"),
+            Field("file_owner", "STRING"),
+            Field("creation_time", "TIMESTAMP"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("client_volume_id", "STRING"),
+            Field("last_modified_time_epoch_utc", "FLOAT64"),
+            Field("last_modified_time_timestamp", "TIMESTAMP"),
+            Field("last_modified_time_timestamp_utc", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_windows_hosts",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id"],
+        "retention_tier": "standard",
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("ip_address", "STRING"),
-            bigquery.SchemaField("hostnames", "STRING", mode="REPEATED"),
-            bigquery.SchemaField("file_path", "STRING"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("last_modified_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("last_modified_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("last_modified_time_timestamp_utc", "TIMESTAMP"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("ip_address", "STRING"),
+            Field("hostnames", "STRING", mode="REPEATED"),
+            Field("file_path", "STRING"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("client_volume_id", "STRING"),
+            Field("last_modified_time_epoch_utc", "FLOAT64"),
+            Field("last_modified_time_timestamp", "TIMESTAMP"),
+            Field("last_modified_time_timestamp_utc", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_windows_registry_autoruns",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id", "key_name"],
+        "retention_tier": "standard",
+        "change_key": ["key_fullpath"],
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("key_name", "STRING"),
-            bigquery.SchemaField("key_fullpath", "STRING"),
-            bigquery.SchemaField(
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("key_name", "STRING"),
+            Field("key_fullpath", "STRING"),
+            Field(
                 "key_values",
                 "RECORD",
                 mode="REPEATED",
                 fields=[
-                    bigquery.SchemaField("value_name", "STRING"),
-                    bigquery.SchemaField("value_type", "STRING"),
-                    bigquery.SchemaField("value_data", "STRING"),
+                    Field("value_name", "STRING"),
+                    Field("value_type", "STRING"),
+                    Field("value_data", "STRING"),
                 ],
             ),
-            bigquery.SchemaField("key_subkeys", "STRING", mode="REPEATED"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("last_modified_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("last_modified_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("last_modified_time_timestamp_utc", "TIMESTAMP"),
+            Field("key_subkeys", "STRING", mode="REPEATED"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("client_volume_id", "STRING"),
+            Field("last_modified_time_epoch_utc", "FLOAT64"),
+            Field("last_modified_time_timestamp", "TIMESTAMP"),
+            Field("last_modified_time_timestamp_utc", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_windows_services",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id", "service_name"],
+        "retention_tier": "standard",
+        "change_key": ["service_name"],
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("service_name", "STRING"),
-            bigquery.SchemaField("display_name", "STRING"),
-            bigquery.SchemaField("image_path", "STRING"),
-            bigquery.SchemaField("start", "STRING"),
-            bigquery.SchemaField("type", "STRING"),
-            bigquery.SchemaField("description", "STRING"),
-            bigquery.SchemaField("object_name", "STRING"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("last_modified_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("last_modified_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("last_modified_time_timestamp_utc", "TIMESTAMP"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("service_name", "STRING"),
+            Field("display_name", "STRING"),
+            Field("image_path", "STRING"),
+            Field("start", "STRING"),
+            Field("type", "STRING"),
+            Field("description", "STRING"),
+            Field("object_name", "STRING"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("client_volume_id", "STRING"),
+            Field("last_modified_time_epoch_utc", "FLOAT64"),
+            Field("last_modified_time_timestamp", "TIMESTAMP"),
+            Field("last_modified_time_timestamp_utc", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_windows_task_scheduler_autoruns",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id", "task_name"],
+        "retention_tier": "standard",
+        "change_key": ["task_name"],
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("task_name", "STRING"),
-            bigquery.SchemaField(
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("task_name", "STRING"),
+            Field(
                 "data",
                 "RECORD",
                 fields=[
-                    bigquery.SchemaField("Task", "RECORD", fields=[
-                        bigquery.SchemaField("version", "STRING"),
+                    Field("Task", "RECORD", fields=[
+                        Field("version", "STRING"),
                     ]),
-                    bigquery.SchemaField("Version", "STRING"),
-                    bigquery.SchemaField("Description", "STRING"),
-                    bigquery.SchemaField("URI", "STRING"),
-                    bigquery.SchemaField("Principal", "RECORD", fields=[
-                        bigquery.SchemaField("id", "STRING"),
+                    Field("Version", "STRING"),
+                    Field("Description", "STRING"),
+                    Field("URI", "STRING"),
+                    Field("Principal", "RECORD", fields=[
+                        Field("id", "STRING"),
                     ]),
-                    bigquery.SchemaField("UserId", "STRING"),
-                    bigquery.SchemaField("RunLevel", "STRING"),
-                    bigquery.SchemaField("DisallowStartIfOnBatteries", "STRING"),
-                    bigquery.SchemaField("StopIfGoingOnBatteries", "STRING"),
-                    bigquery.SchemaField("MultipleInstancesPolicy", "STRING"),
-                    bigquery.SchemaField("Priority", "STRING"),
-                    bigquery.SchemaField("StartWhenAvailable", "STRING"),
-                    bigquery.SchemaField("StopOnIdleEnd", "STRING"),
-                    bigquery.SchemaField("RestartOnIdle", "STRING"),
-                    bigquery.SchemaField("StartBoundary", "STRING"),
-                    bigquery.SchemaField("DaysInterval", "STRING"),
-                    bigquery.SchemaField("Actions", "RECORD", fields=[
-                        bigquery.SchemaField("Context", "STRING"),
-                        bigquery.SchemaField("Command", "STRING"),
-                        bigquery.SchemaField("Arguments", "STRING"),
+                    Field("UserId", "STRING"),
+                    Field("RunLevel", "STRING"),
+                    Field("DisallowStartIfOnBatteries", "STRING"),
+                    Field("StopIfGoingOnBatteries", "STRING"),
+                    Field("MultipleInstancesPolicy", "STRING"),
+                    Field("Priority", "STRING"),
+                    Field("StartWhenAvailable", "STRING"),
+                    Field("StopOnIdleEnd", "STRING"),
+                    Field("RestartOnIdle", "STRING"),
+                    Field("StartBoundary", "STRING"),
+                    Field("DaysInterval", "STRING"),
+                    Field("Actions", "RECORD", fields=[
+                        Field("Context", "STRING"),
+                        Field("Command", "STRING"),
+                        Field("Arguments", "STRING"),
                     ]),
                 ],
             ),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("command", "STRING"),
-            bigquery.SchemaField("source_user_name", "STRING"),
-            bigquery.SchemaField("last_modified_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("last_modified_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("last_modified_time_timestamp_utc", "TIMESTAMP"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("client_volume_id", "STRING"),
+            Field("command", "STRING"),
+            Field("source_user_name", "STRING"),
+            Field("last_modified_time_epoch_utc", "FLOAT64"),
+            Field("last_modified_time_timestamp", "TIMESTAMP"),
+            Field("last_modified_time_timestamp_utc", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_windows_users_groups",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id"],
+        "retention_tier": "standard",
+        "change_key": ["identity_type", "name"],
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("identity_type", "STRING"),
-            bigquery.SchemaField("name", "STRING"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("last_modified_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("last_modified_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("last_modified_time_timestamp_utc", "TIMESTAMP"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("identity_type", "STRING"),
+            Field("name", "STRING"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("client_volume_id", "STRING"),
+            Field("last_modified_time_epoch_utc", "FLOAT64"),
+            Field("last_modified_time_timestamp", "TIMESTAMP"),
+            Field("last_modified_time_timestamp_utc", "TIMESTAMP"),
         ],
     },
     {
         "table_id": "os_windows_web_browsers",
         "partition_column": "scan_time_timestamp",
-        "clustering_columns": [],
-        "expiration_ms": 7 * 24 * 60 * 60 * 1000,
+        "partition_type": "DAY",
+        "clustering_columns": ["client_account_id", "client_instance_id", "web_browser"],
+        "retention_tier": "standard",
         "schema": [
-            bigquery.SchemaField("client_instance_id", "STRING"),
-            bigquery.SchemaField("client_account_id", "STRING"),
-            bigquery.SchemaField("web_browser", "STRING"),
-            bigquery.SchemaField("history_type", "STRING"),
-            bigquery.SchemaField("id", "INT64"),
-            bigquery.SchemaField("guid", "STRING"),
-            bigquery.SchemaField("current_path", "STRING"),
-            bigquery.SchemaField("target_path", "STRING"),
-            bigquery.SchemaField("received_bytes", "INT64"),
-            bigquery.SchemaField("total_bytes", "INT64"),
-            bigquery.SchemaField("state", "INT64"),
-            bigquery.SchemaField("danger_type", "INT64"),
-            bigquery.SchemaField("interrupt_reason", "INT64"),
-            bigquery.SchemaField("hash", "STRING"),
-            bigquery.SchemaField("opened", "INT64"),
-            bigquery.SchemaField("transient", "INT64"),
-            bigquery.SchemaField("referrer", "STRING"),
-            bigquery.SchemaField("site_url", "STRING"),
-            bigquery.SchemaField("tab_url", "STRING"),
-            bigquery.SchemaField("tab_referrer_url", "STRING"),
-            bigquery.SchemaField("http_method", "STRING"),
-            bigquery.SchemaField("by_ext_id", "STRING"),
-            bigquery.SchemaField("by_ext_name", "STRING"),
-            bigquery.SchemaField("by_web_app_id", "STRING"),
-            bigquery.SchemaField("etag", "STRING"),
-            bigquery.SchemaField("mime_type", "STRING"),
-            bigquery.SchemaField("original_mime_type", "STRING"),
-            bigquery.SchemaField("scan_time_timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("client_volume_id", "STRING"),
-            bigquery.SchemaField("event_time_epoch_utc", "FLOAT64"),
-            bigquery.SchemaField("event_time_timestamp_utc", "TIMESTAMP"),
-            bigquery.SchemaField("event_time_timestamp", "TIMESTAMP"),
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("web_browser", "STRING"),
+            Field("history_type", "STRING"),
+            Field("id", "INT64"),
+            Field("guid", "STRING"),
+            Field("current_path", "STRING"),
+            Field("target_path", "STRING"),
+            Field("received_bytes", "INT64"),
+            Field("total_bytes", "INT64"),
+            Field("state", "INT64"),
+            Field("danger_type", "INT64"),
+            Field("interrupt_reason", "INT64"),
+            Field("hash", "STRING"),
+            Field("opened", "INT64"),
+            Field("transient", "INT64"),
+            Field("referrer", "STRING"),
+            Field("site_url", "STRING"),
+            Field("tab_url", "STRING"),
+            Field("tab_referrer_url", "STRING"),
+            Field("http_method", "STRING"),
+            Field("by_ext_id", "STRING"),
+            Field("by_ext_name", "STRING"),
+            Field("by_web_app_id", "STRING"),
+            Field("etag", "STRING"),
+            Field("mime_type", "STRING"),
+            Field("original_mime_type", "STRING"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("client_volume_id", "STRING"),
+            Field("event_time_epoch_utc", "FLOAT64"),
+            Field("event_time_timestamp_utc", "TIMESTAMP"),
+            Field("event_time_timestamp", "TIMESTAMP"),
         ],
     },
 
 ]
+
+
+# ---------------------------
+# CHANGE TABLES
+# ---------------------------
+# Each table with a change_key gets a <table_id>_changes table with one row
+# per item added, removed or modified between consecutive scans of an
+# instance, filled in by the ingestion paths (see changes.py).
+CHANGE_TABLE_SUFFIX = "_changes"
+CHANGE_TYPES = ("ADDED", "REMOVED", "MODIFIED")
+
+
+def _change_table_config(table_config: dict) -> dict:
+    return {
+        "table_id": table_config["table_id"] + CHANGE_TABLE_SUFFIX,
+        "partition_column": "scan_time_timestamp",
+        "partition_type": table_config["partition_type"],
+        "clustering_columns": ["client_account_id", "client_instance_id", "change_type"],
+        "retention_tier": table_config["retention_tier"],
+        "schema": [
+            Field("client_instance_id", "STRING"),
+            Field("client_account_id", "STRING"),
+            Field("scan_time_timestamp", "TIMESTAMP"),
+            Field("previous_scan_time_timestamp", "TIMESTAMP"),
+            Field("change_type", "STRING", description=", ".join(CHANGE_TYPES)),
+            Field(
+                "item_key",
+                "STRING",
+                description="JSON array of " + ", ".join(table_config["change_key"]),
+            ),
+            Field("row", "STRING", description="JSON of the item in this scan"),
+            Field("previous_row", "STRING", description="JSON of the item in the previous scan"),
+        ],
+    }
+
+
+_TABLE_DEFINITIONS += [
+    _change_table_config(c) for c in _TABLE_DEFINITIONS if c.get("change_key")
+]
+
+
+# ---------------------------
+# RETENTION
+# ---------------------------
+# Partitions expire after their table's tier length in days; 0 disables
+# expiration. Every table defaults to "standard" (7 days, the expiration
+# tables were created with); "short" and "extended" are opt-in. Each
+# client's deployment can change the tier lengths (RETENTION_TIERS) and the
+# tier of any table (RETENTION_OVERRIDES); an override for a table also
+# applies to its _changes companion unless that has its own.
+DEFAULT_RETENTION_TIERS = {"short": 3, "standard": 7, "extended": 30}
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def retention_policy(tiers: dict, overrides: dict) -> dict:
+    """
+    Resolve the retention tier and length of every table.
+
+    Args:
+        tiers: tier -> days, merged over DEFAULT_RETENTION_TIERS
+        overrides: table_id -> tier
+
+    Returns:
+        Mapping of table_id to (tier, days)
+
+    Raises:
+        ValueError: if either mapping is not a dict, a tier is unknown, a
+            length is not a non-negative whole number of days or an
+            override names an unknown table
+    """
+    if not isinstance(tiers, dict) or not isinstance(overrides, dict):
+        raise ValueError("Retention tiers and overrides must be objects")
+    tiers = {**DEFAULT_RETENTION_TIERS, **tiers}
+    for tier, days in tiers.items():
+        if isinstance(days, bool) or not isinstance(days, int) or days < 0:
+            raise ValueError(f"Retention tier {tier!r} must be a whole number of days >= 0")
+    table_ids = {d["table_id"] for d in _TABLE_DEFINITIONS}
+    unknown = sorted(set(overrides) - table_ids)
+    if unknown:
+        raise ValueError(f"Retention overrides for unknown table(s): {', '.join(unknown)}")
+
+    policy = {}
+    for definition in _TABLE_DEFINITIONS:
+        table_id = definition["table_id"]
+        base_id = table_id.removesuffix(CHANGE_TABLE_SUFFIX)
+        tier = overrides.get(table_id) or overrides.get(base_id) or definition["retention_tier"]
+        if not isinstance(tier, str) or tier not in tiers:
+            raise ValueError(f"Unknown retention tier {tier!r} for {table_id}")
+        policy[table_id] = (tier, tiers[tier])
+    return policy
+
+
+def table_configs_for(tiers: dict | None = None, overrides: dict | None = None) -> list:
+    """TABLE_CONFIGS under the given retention tiers and overrides instead of the env's."""
+    return _resolve_table_configs(
+        json.dumps(tiers or {}, sort_keys=True), json.dumps(overrides or {}, sort_keys=True)
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _resolve_table_configs(tiers_json: str, overrides_json: str) -> list:
+    policy = retention_policy(json.loads(tiers_json or "{}"), json.loads(overrides_json or "{}"))
+    return [
+        {
+            **definition,
+            "retention_tier": policy[definition["table_id"]][0],
+            "expiration_ms": policy[definition["table_id"]][1] * DAY_MS,
+        }
+        for definition in _TABLE_DEFINITIONS
+    ]
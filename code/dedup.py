@@ -0,0 +1,283 @@
+"""
+Ingest-side deduplication for hash-keyed file inventory tables.
+
+Consecutive scans re-send the same file inventory rows. For tables with a
+dedup_key in TABLE_CONFIGS, each row is reduced to a 64-bit hash of its key
+columns and looked up in a per-instance index of the keys already written,
+persisted under DEDUP_INDEX_URI between runs. Rows whose key is in the index
+are dropped before they reach BigQuery.
+
+A dropped row relies on an earlier copy that will itself expire with its
+partition, so the index remembers the partition time each key was last
+written with, and a key is only treated as seen for the first half of
+expiration_ms after it. The next scan after that writes the row again, and
+every unchanged file keeps one live copy in the table at all times. Keys of
+tables whose partitions never expire (expiration_ms 0) are seen for good.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import time
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+import config
+
+INSTANCE_COLUMN = "client_instance_id"
+
+_INDEX_SCHEMA = pa.schema([("key", pa.uint64()), ("partition_time", pa.int64())])
+
+
+def row_keys(batch: pa.RecordBatch, columns) -> pa.Array:
+    """64-bit BLAKE2b hash of each row's key columns."""
+    parts = [pc.fill_null(pc.cast(batch.column(c), pa.string()), "") for c in columns]
+    joined = pc.binary_join_element_wise(*parts, "\x1f")
+    return pa.array(
+        [
+            int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "little")
+            for value in pc.cast(joined, pa.binary()).to_pylist()
+        ],
+        type=pa.uint64(),
+    )
+
+
+# ---------------------------
+# INDEX STORAGE
+# ---------------------------
+# Conflicting writes to one state file before update() gives up.
+UPDATE_ATTEMPTS = 5
+
+
+class IndexStore:
+    """
+    Per-instance state tables as Parquet files under a gs:// or local prefix.
+
+    Several requests for the same instance can run at once, so a GCS object
+    is only replaced if it is still the generation last read; update() merges
+    its changes into whatever another request wrote in between and tries
+    again. Local files (for development) are simply overwritten.
+    """
+
+    def __init__(self, uri: str, schema: pa.Schema = _INDEX_SCHEMA):
+        self.uri = uri.rstrip("/")
+        self.schema = schema
+        self._generations = {}
+
+    def _path(self, table_id: str, instance_id) -> str:
+        return f"{self.uri}/{table_id}/{quote(instance_id or '_null', safe='')}.parquet"
+
+    def _blob(self, path: str):
+        from load import get_storage_client, split_gcs_uri
+
+        bucket, name = split_gcs_uri(path)
+        return get_storage_client().bucket(bucket).blob(name)
+
+    def read(self, table_id: str, instance_id) -> pa.Table:
+        """Return the stored table, or an empty one if there is none yet."""
+        path = self._path(table_id, instance_id)
+        try:
+            if path.startswith("gs://"):
+                from google.api_core.exceptions import NotFound
+
+                blob = self._blob(path)
+                try:
+                    data = blob.download_as_bytes()
+                except NotFound:
+                    # Generation 0 only matches an object that does not exist.
+                    self._generations[path] = 0
+                    return self.schema.empty_table()
+                self._generations[path] = blob.generation
+                return pq.read_table(io.BytesIO(data), schema=self.schema)
+            return pq.read_table(path, schema=self.schema)
+        except FileNotFoundError:
+            return self.schema.empty_table()
+
+    def write(self, table_id: str, instance_id, index: pa.Table) -> None:
+        """
+        Replace the stored table.
+
+        Raises:
+            google.api_core.exceptions.PreconditionFailed: if the GCS object
+                changed since it was last read
+        """
+        path = self._path(table_id, instance_id)
+        if path.startswith("gs://"):
+            sink = io.BytesIO()
+            pq.write_table(index, sink)
+            blob = self._blob(path)
+            blob.upload_from_string(
+                sink.getvalue(),
+                content_type="application/octet-stream",
+                if_generation_match=self._generations.get(path),
+            )
+            self._generations[path] = blob.generation
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(index, path)
+
+    def update(self, table_id: str, instance_id, index: pa.Table, merge) -> pa.Table:
+        """
+        Write index, merging it into the stored table whenever another writer
+        got there first.
+
+        Args:
+            index: Table to store, built from the last read
+            merge: Called with the stored table after a conflicting write;
+                returns the table to store instead
+
+        Returns:
+            The table that was stored
+        """
+        from google.api_core.exceptions import PreconditionFailed
+
+        for attempt in range(1, UPDATE_ATTEMPTS + 1):
+            try:
+                self.write(table_id, instance_id, index)
+                return index
+            except PreconditionFailed:
+                if attempt == UPDATE_ATTEMPTS:
+                    raise
+                logging.info(
+                    "%s/%s changed since it was read, merging (attempt %d)",
+                    table_id,
+                    instance_id,
+                    attempt,
+                )
+                index = merge(self.read(table_id, instance_id))
+
+
+# ---------------------------
+# DEDUPLICATION
+# ---------------------------
+class Deduplicator:
+    """
+    Drops rows already written for one table, one instance index at a time.
+
+    Indexes are loaded on first use and only written back by commit(), which
+    callers invoke once the surviving rows are safely in BigQuery.
+    """
+
+    def __init__(self, table_config: dict, store: IndexStore):
+        self.table_id = table_config["table_id"]
+        self.columns = table_config["dedup_key"]
+        self.partition_column = table_config["partition_column"]
+        self.expiration_s = table_config["expiration_ms"] // 1000
+        self.store = store
+        self._indexes = {}
+        self._written = {}
+
+    def _index(self, instance_id) -> pa.Table:
+        if instance_id not in self._indexes:
+            self._indexes[instance_id] = self.store.read(self.table_id, instance_id)
+        return self._indexes[instance_id]
+
+    def _fresh(self, keys: pa.Array, known: pa.Table, now: int) -> pa.Array:
+        """True for keys in known written within the first half of their expiry."""
+        position = pc.index_in(keys, value_set=known.column("key"))
+        written_at = pc.take(known.column("partition_time"), position)
+        if self.expiration_s:
+            fresh = pc.less(pc.subtract(now, written_at), self.expiration_s // 2)
+        else:
+            fresh = pc.is_valid(written_at)
+        return pc.fill_null(fresh, False)
+
+    def filter(self, batch: pa.RecordBatch) -> tuple:
+        """
+        Drop rows whose key was written within the first half of its expiry,
+        whether by an earlier run or earlier in this one (an earlier batch,
+        or an earlier row of the same batch).
+
+        Returns:
+            (batch of the rows to write, number of rows dropped)
+        """
+        if not batch.num_rows:
+            return batch, 0
+        now = int(time.time())
+        keys = row_keys(batch, self.columns)
+        micros = pc.cast(batch.column(self.partition_column), pa.int64())
+        partition_times = pc.fill_null(pc.divide(micros, 1_000_000), now)
+        instances = batch.column(INSTANCE_COLUMN)
+        positions = pa.array(range(batch.num_rows), type=pa.int64())
+        keep = pa.array([True] * batch.num_rows)
+
+        for instance_id in pc.unique(instances).to_pylist():
+            in_instance = (
+                pc.is_null(instances) if instance_id is None else pc.equal(instances, instance_id)
+            )
+            seen = self._fresh(keys, self._index(instance_id), now)
+            if self._written.get(instance_id):
+                earlier = pa.concat_tables(self._written[instance_id])
+                seen = pc.or_(seen, self._fresh(keys, earlier, now))
+            candidate = pc.and_(in_instance, pc.invert(seen))
+
+            # Of rows repeating a key within the batch, only the first is written.
+            candidates = pa.table(
+                {"key": pc.filter(keys, candidate), "row": pc.filter(positions, candidate)}
+            )
+            first = (
+                candidates.group_by("key")
+                .aggregate([("row", "min")])
+                .column("row_min")
+            )
+            written = pc.is_in(positions, value_set=first)
+            keep = pc.and_(keep, pc.or_(pc.invert(in_instance), written))
+
+            self._written.setdefault(instance_id, []).append(
+                pa.table(
+                    [pc.filter(keys, written), pc.filter(partition_times, written)],
+                    schema=_INDEX_SCHEMA,
+                )
+            )
+
+        dropped = batch.num_rows - pc.sum(keep).as_py()
+        return (batch.filter(keep) if dropped else batch), dropped
+
+    def _merge(self, index: pa.Table, written: list, cutoff) -> pa.Table:
+        """index with the written keys added, keeping each key's latest time."""
+        latest = (
+            pa.concat_tables([index, *written])
+            .group_by("key")
+            .aggregate([("partition_time", "max")])
+        )
+        merged = pa.table(
+            [latest.column("key"), latest.column("partition_time_max")],
+            schema=_INDEX_SCHEMA,
+        )
+        # Keys whose rows have expired from the table are forgotten.
+        if cutoff is not None:
+            merged = merged.filter(pc.greater(merged.column("partition_time"), cutoff))
+        return merged
+
+    def commit(self) -> None:
+        """
+        Merge the keys written by this run into the stored indexes, including
+        keys another run stored since they were read.
+        """
+        cutoff = int(time.time()) - self.expiration_s if self.expiration_s else None
+        for instance_id, written in self._written.items():
+            merged = self.store.update(
+                self.table_id,
+                instance_id,
+                self._merge(self._index(instance_id), written, cutoff),
+                lambda stored, written=written: self._merge(stored, written, cutoff),
+            )
+            self._indexes[instance_id] = merged
+            logging.info(
+                "Dedup index for %s/%s holds %d key(s)",
+                self.table_id,
+                instance_id,
+                merged.num_rows,
+            )
+        self._written = {}
+
+
+def get_deduplicator(table_config: dict):
+    """Return a Deduplicator for the table, or None if dedup does not apply."""
+    if not table_config.get("dedup_key") or not config.DEDUP_INDEX_URI:
+        return None
+    return Deduplicator(table_config, IndexStore(config.DEDUP_INDEX_URI))
@@ -0,0 +1,302 @@
+"""
+Fleet mode: provisioning the tables of many client datasets in one call.
+
+Each target names a project and dataset (plus the dataset's location, and
+optionally the client's own retention tiers). Targets are provisioned
+concurrently, at most FLEET_MAX_TARGETS at a time and at most
+FLEET_PROJECT_CONCURRENCY per project so one project's quotas are not
+exhausted by its own datasets. A target whose tables failed with retryable
+errors is retried, backing off between attempts, for only the tables that
+failed; the others are already labelled with their config hash and would
+be skipped anyway. A target already being provisioned, with the same
+options, by a concurrent request on this instance is not provisioned twice:
+the later request waits for and reports the running pass.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import telemetry
+from cache import SingleFlight
+from provisioner import (
+    ensure_dataset,
+    get_client,
+    plan_tables,
+    provision_tables,
+    summarize_plans,
+)
+from throttle import is_retryable
+
+# First retry waits about this long (seconds); each further one doubles it.
+RETRY_BASE_DELAY = 2.0
+
+_project_slots = {}
+_project_slots_lock = threading.Lock()
+_target_runs = SingleFlight()
+
+
+def _project_slot(project: str) -> threading.BoundedSemaphore:
+    with _project_slots_lock:
+        if project not in _project_slots:
+            _project_slots[project] = threading.BoundedSemaphore(
+                max(1, config.FLEET_PROJECT_CONCURRENCY)
+            )
+        return _project_slots[project]
+
+
+def parse_targets(payload) -> list:
+    """
+    Validate the targets of a fleet request.
+
+    Accepts a list of targets or {"targets": [...]}. Each target is a
+    mapping with "project" and "dataset_id" (or "dataset"), and optionally
+    "location", "retention_tiers" and "retention_overrides".
+
+    Returns:
+        Normalised targets, duplicates removed
+
+    Raises:
+        ValueError: if the payload or any target is malformed
+    """
+    if isinstance(payload, dict):
+        payload = payload.get("targets")
+    if not isinstance(payload, list) or not payload:
+        raise ValueError("Expected a non-empty list of targets")
+
+    targets, seen = [], set()
+    for index, target in enumerate(payload):
+        if not isinstance(target, dict):
+            raise ValueError(f"Target {index} is not an object")
+        project = target.get("project")
+        dataset_id = target.get("dataset_id") or target.get("dataset")
+        if not project or not dataset_id:
+            raise ValueError(f"Target {index} needs a project and dataset_id")
+        if not isinstance(project, str) or not isinstance(dataset_id, str):
+            raise ValueError(f"Target {index} project and dataset_id must be strings")
+        for field in ("retention_tiers", "retention_overrides"):
+            if not isinstance(target.get(field) or {}, dict):
+                raise ValueError(f"Target {index} {field} must be an object")
+        if (project, dataset_id) in seen:
+            continue
+        seen.add((project, dataset_id))
+        targets.append(
+            {
+                "project": project,
+                "dataset_id": dataset_id,
+                "location": target.get("location") or "",
+                # Resolved here so a bad policy is rejected before any work.
+                "table_configs": config.table_configs_for(
+                    target.get("retention_tiers"), target.get("retention_overrides")
+                ),
+            }
+        )
+    return targets
+
+
+def provision_target(
+    target: dict,
+    force: bool = False,
+    recluster: bool = False,
+    create_datasets: bool = False,
+) -> dict:
+    """
+    Provision one target's tables, retrying tables that failed transiently.
+
+    Returns:
+        Target result with status, attempts, counts per table outcome,
+        timing, the tables that still failed and whether the pass was
+        shared with a concurrent request
+    """
+    # Targets differ in table configs only by their retention policy.
+    policy = tuple((c["table_id"], c["expiration_ms"]) for c in target["table_configs"])
+    key = (target["project"], target["dataset_id"], force, recluster, create_datasets, policy)
+    result, coalesced = _target_runs.do(
+        key, lambda: _provision_target(target, force, recluster, create_datasets)
+    )
+    return {**result, "coalesced": coalesced}
+
+
+def _provision_target(target: dict, force: bool, recluster: bool, create_datasets: bool) -> dict:
+    started = time.perf_counter()
+    project, dataset_id = target["project"], target["dataset_id"]
+    result = {
+        "project": project,
+        "dataset_id": dataset_id,
+        "location": target["location"],
+        "status": "success",
+        "attempts": 0,
+    }
+    max_attempts = max(1, config.FLEET_MAX_ATTEMPTS)
+    pending = target["table_configs"]
+    tables = {}
+    dataset_ready = not create_datasets
+
+    with _project_slot(project):
+        client = get_client(project)
+        while pending:
+            result["attempts"] += 1
+            try:
+                if not dataset_ready:
+                    ensure_dataset(client, dataset_id, target["location"] or config.LOCATION)
+                    dataset_ready = True
+                for table_result in provision_tables(
+                    client, dataset_id, pending, force=force, recluster=recluster
+                ):
+                    tables[table_result["table_id"]] = table_result
+                failed = [r for r in tables.values() if r["status"] != "success"]
+                retry = bool(failed) and all(r.get("retryable") for r in failed)
+                pending = [
+                    c for c in pending if tables[c["table_id"]]["status"] != "success"
+                ]
+            except Exception as e:
+                logging.error("Failed to provision %s.%s: %s", project, dataset_id, e)
+                retry = is_retryable(e)
+                result["error"] = str(e)
+            else:
+                result.pop("error", None)
+
+            if not pending or not retry or result["attempts"] >= max_attempts:
+                break
+            delay = RETRY_BASE_DELAY * 2 ** (result["attempts"] - 1)
+            delay *= random.uniform(0.5, 1.5)
+            logging.warning(
+                "Retrying %s.%s in %.1f s (%d table(s) pending)",
+                project,
+                dataset_id,
+                delay,
+                len(pending),
+            )
+            time.sleep(delay)
+
+    failed = [r for r in tables.values() if r["status"] != "success"]
+    if failed or "error" in result:
+        result["status"] = "error"
+    result["actions"] = dict(
+        Counter(r["action"] for r in tables.values() if r["status"] == "success")
+    )
+    result["failed_tables"] = failed
+    result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def provision_fleet(
+    targets: list,
+    force: bool = False,
+    recluster: bool = False,
+    create_datasets: bool = False,
+    max_targets: int | None = None,
+) -> dict:
+    """
+    Provision every target concurrently and aggregate the outcome.
+
+    Args:
+        targets: output of parse_targets
+        force: Re-check every table even if its config hash label is current
+        recluster: Migrate existing tables to the configured clustering
+        create_datasets: Create missing datasets (in the target's location)
+        max_targets: targets provisioned at once; FLEET_MAX_TARGETS if unset
+
+    Returns:
+        Aggregate report with per-outcome table counts, failed target count
+        and one result per target, in the order given
+    """
+    started = time.perf_counter()
+    if max_targets is None:
+        max_targets = config.FLEET_MAX_TARGETS
+    logging.info("Provisioning %d target(s), %d at a time", len(targets), max_targets)
+
+    def run(target):
+        with telemetry.span(
+            "target", project=target["project"], dataset_id=target["dataset_id"]
+        ) as span:
+            result = provision_target(target, force, recluster, create_datasets)
+            span.set(
+                status=result["status"],
+                attempts=result["attempts"],
+                coalesced=result["coalesced"],
+            )
+            result["timings"] = span.breakdown()
+            return result
+
+    with ThreadPoolExecutor(max_workers=max(1, max_targets)) as executor:
+        results = list(executor.map(telemetry.propagate(run), targets))
+
+    actions = Counter()
+    for result in results:
+        actions.update(result["actions"])
+    failed = [r for r in results if r["status"] != "success"]
+    report = {
+        "targets": len(results),
+        "failed_targets": len(failed),
+        "tables": dict(actions),
+        "failed_tables": sum(len(r["failed_tables"]) for r in results),
+        "retried_targets": sum(r["attempts"] > 1 for r in results),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "results": results,
+    }
+    logging.info(
+        "Provisioned %d target(s) in %.1f ms (%d failed)",
+        report["targets"],
+        report["duration_ms"],
+        report["failed_targets"],
+    )
+    return report
+
+
+def plan_fleet(
+    targets: list,
+    force: bool = False,
+    recluster: bool = False,
+    max_targets: int | None = None,
+) -> dict:
+    """
+    Plan every target concurrently without changing anything.
+
+    Returns:
+        Report with the number of targets with pending changes or errors,
+        planned actions summed over the fleet and each target's per-table
+        plans, in the order given
+    """
+    started = time.perf_counter()
+    if max_targets is None:
+        max_targets = config.FLEET_MAX_TARGETS
+
+    def run(target):
+        result = {"project": target["project"], "dataset_id": target["dataset_id"]}
+        with telemetry.span("target", **result), _project_slot(target["project"]):
+            try:
+                plans = plan_tables(
+                    get_client(target["project"]),
+                    target["dataset_id"],
+                    target["table_configs"],
+                    force=force,
+                    recluster=recluster,
+                )
+            except Exception as e:
+                logging.error(
+                    "Failed to plan %s.%s: %s", target["project"], target["dataset_id"], e
+                )
+                return {**result, "status": "error", "error": str(e)}
+        summary = summarize_plans(plans)
+        status = "error" if summary["errors"] else "success"
+        return {**result, "status": status, **summary, "tables": plans}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_targets)) as executor:
+        results = list(executor.map(telemetry.propagate(run), targets))
+
+    actions = Counter()
+    for result in results:
+        actions.update(result.get("actions", {}))
+    return {
+        "targets": len(results),
+        "failed_targets": sum(r["status"] != "success" for r in results),
+        "changes_pending": sum(bool(r.get("changes_pending")) for r in results),
+        "actions": dict(actions),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "results": results,
+    }
@@ -0,0 +1,270 @@
+"""
+Bulk ingestion of newline-delimited JSON rows into the provisioned tables.
+
+Rows are collected into large batches, converted column by column into Arrow
+record batches by the table's Validator (see validator.py) and appended to
+the table's default stream through the BigQuery Storage Write API. At most
+INGEST_MAX_IN_FLIGHT appends are outstanding at any time; further batches
+wait for the oldest one to be acknowledged, so a fast producer cannot outrun
+the stream.
+"""
+
+import functools
+import json
+import logging
+import threading
+from collections import deque
+
+import pyarrow as pa
+
+import config
+from changes import get_change_tracker
+from dedup import get_deduplicator
+from validator import Validator
+
+# AppendRows requests are limited to 10 MB; leave headroom for framing.
+MAX_REQUEST_BYTES = 8 * 1024 * 1024
+
+# Rejected rows reported back to the caller; the rest are only counted.
+MAX_REPORTED_REJECTIONS = 100
+
+_write_client = None
+_write_client_lock = threading.Lock()
+
+
+class UnknownTableError(ValueError):
+    """Raised when rows are sent for a table that is not in TABLE_CONFIGS."""
+
+
+def get_table_config(table_id: str) -> dict:
+    """Return the TABLE_CONFIGS entry for table_id."""
+    for table_config in config.TABLE_CONFIGS:
+        if table_config["table_id"] == table_id:
+            return table_config
+    raise UnknownTableError(f"Unknown table_id: {table_id}")
+
+
+def get_write_client():
+    """Return the process-wide Storage Write API client, creating it on first use."""
+    global _write_client
+    if _write_client is None:
+        with _write_client_lock:
+            if _write_client is None:
+                from google.cloud import bigquery_storage_v1
+
+                _write_client = bigquery_storage_v1.BigQueryWriteClient()
+    return _write_client
+
+
+# ---------------------------
+# VALIDATION
+# ---------------------------
+@functools.lru_cache(maxsize=None)
+def get_validator(table_id: str) -> Validator:
+    """Return the Validator for table_id, compiling it on first use."""
+    return Validator(get_table_config(table_id))
+
+
+def parse_ndjson(body):
+    """
+    Yield (line number, line size, parsed object or None, error or None) for
+    each non-empty line of a newline-delimited JSON payload.
+
+    body is the whole payload (bytes or str) or an iterable of lines such as
+    an open text file, which is read lazily.
+    """
+    if isinstance(body, bytes):
+        body = body.decode("utf-8")
+    lines = body.splitlines() if isinstance(body, str) else body
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, len(line), None, f"invalid JSON: {e.msg}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, len(line), None, "expected a JSON object"
+            continue
+        yield line_number, len(line), row, None
+
+
+# ---------------------------
+# WRITE PATH
+# ---------------------------
+class _DefaultStreamWriter:
+    """Appends Arrow record batches to a table's default write stream."""
+
+    def __init__(
+        self, project: str, dataset_id: str, table_id: str, schema: pa.Schema
+    ):
+        from google.cloud.bigquery_storage_v1 import types, writer
+
+        self._types = types
+        self._in_flight = deque()
+        self._max_in_flight = max(1, config.INGEST_MAX_IN_FLIGHT)
+        table_path = f"projects/{project}/datasets/{dataset_id}/tables/{table_id}"
+        template = types.AppendRowsRequest(
+            write_stream=f"{table_path}/streams/_default",
+            arrow_rows=types.AppendRowsRequest.ArrowData(
+                writer_schema=types.ArrowSchema(
+                    serialized_schema=schema.serialize().to_pybytes()
+                )
+            ),
+        )
+        self._stream = writer.AppendRowsStream(get_write_client(), template)
+        self.row_errors = []
+
+    def append(self, batch: pa.RecordBatch) -> None:
+        """Send a batch, first waiting on the oldest append if at the in-flight cap."""
+        while len(self._in_flight) >= self._max_in_flight:
+            self._collect(self._in_flight.popleft())
+        request = self._types.AppendRowsRequest(
+            arrow_rows=self._types.AppendRowsRequest.ArrowData(
+                rows=self._types.ArrowRecordBatch(
+                    serialized_record_batch=batch.serialize().to_pybytes()
+                )
+            )
+        )
+        self._in_flight.append(self._stream.send(request))
+
+    def _collect(self, future) -> None:
+        response = future.result()
+        self.row_errors.extend(str(error.message) for error in response.row_errors)
+
+    def close(self) -> None:
+        """Wait for every outstanding append and close the stream."""
+        try:
+            while self._in_flight:
+                self._collect(self._in_flight.popleft())
+        finally:
+            self._stream.close()
+
+
+def append_rows(project: str, dataset_id: str, table_id: str, rows: list) -> int:
+    """
+    Convert rows built by this service and append them to a table.
+
+    Returns:
+        Number of rows appended
+    """
+    validator = get_validator(table_id)
+    batch, errors = validator.convert(rows)
+    for index, reason in sorted(errors.items())[:MAX_REPORTED_REJECTIONS]:
+        logging.error("Dropped row %d for %s: %s", index, table_id, reason)
+    if not batch.num_rows:
+        return 0
+
+    # Keep each append under the request size limit.
+    step = max(1, batch.num_rows * MAX_REQUEST_BYTES // max(1, batch.nbytes))
+    stream = _DefaultStreamWriter(project, dataset_id, table_id, validator.schema)
+    try:
+        for offset in range(0, batch.num_rows, step):
+            stream.append(batch.slice(offset, step))
+    finally:
+        stream.close()
+    if stream.row_errors:
+        raise RuntimeError(f"{table_id} rejected rows: {stream.row_errors[0]}")
+    return batch.num_rows
+
+
+def write_changes(tracker, project: str, dataset_id: str) -> int:
+    """Append a ChangeTracker's change rows, then store its snapshots."""
+    changes = tracker.finish()
+    written = append_rows(project, dataset_id, tracker.change_table_id, changes) if changes else 0
+    tracker.commit()
+    return written
+
+
+def ingest_ndjson(body, table_id: str, project: str, dataset_id: str) -> dict:
+    """
+    Validate an NDJSON payload and append the valid rows to a table.
+
+    Returns:
+        Summary with received/written/rejected counts (plus dropped duplicates
+        for tables with a dedup_key and change rows for tables with a
+        change_key), the number of append requests, and up to
+        MAX_REPORTED_REJECTIONS rejected rows with reasons
+
+    Raises:
+        UnknownTableError: if table_id is not in TABLE_CONFIGS
+    """
+    validator = get_validator(table_id)
+    table_config = get_table_config(table_id)
+    dedup = get_deduplicator(table_config)
+    tracker = get_change_tracker(table_config)
+    batch_rows = max(1, config.INGEST_BATCH_ROWS)
+
+    summary = {"table_id": table_id, "received": 0, "written": 0, "rejected_count": 0}
+    if dedup is not None:
+        summary["duplicates"] = 0
+    if tracker is not None:
+        summary["changes"] = 0
+    rejected = []
+    pending, pending_lines, pending_bytes, batches = [], [], 0, 0
+    stream = None
+
+    def reject(line_number, reason):
+        summary["rejected_count"] += 1
+        if len(rejected) < MAX_REPORTED_REJECTIONS:
+            rejected.append({"line": line_number, "reason": reason})
+
+    def flush():
+        nonlocal stream, pending, pending_lines, pending_bytes, batches
+        if not pending:
+            return
+        batch, errors = validator.convert(pending)
+        for index, reason in sorted(errors.items()):
+            reject(pending_lines[index], reason)
+        if tracker is not None:
+            tracker.observe(batch)
+        if dedup is not None:
+            batch, duplicates = dedup.filter(batch)
+            summary["duplicates"] += duplicates
+        if batch.num_rows:
+            if stream is None:
+                stream = _DefaultStreamWriter(
+                    project, dataset_id, table_id, validator.schema
+                )
+            stream.append(batch)
+            summary["written"] += batch.num_rows
+            batches += 1
+        pending, pending_lines, pending_bytes = [], [], 0
+
+    try:
+        for line_number, size, row, error in parse_ndjson(body):
+            summary["received"] += 1
+            if error is not None:
+                reject(line_number, error)
+                continue
+            pending.append(row)
+            pending_lines.append(line_number)
+            pending_bytes += size
+            if len(pending) >= batch_rows or pending_bytes >= MAX_REQUEST_BYTES:
+                flush()
+        flush()
+    finally:
+        if stream is not None:
+            stream.close()
+
+    rejected.sort(key=lambda entry: entry["line"])
+    summary["batches"] = batches
+    summary["rejected"] = rejected
+    if stream is not None and stream.row_errors:
+        summary["row_errors"] = stream.row_errors[:MAX_REPORTED_REJECTIONS]
+    else:
+        # Only remember what was written once every append has been acknowledged.
+        if dedup is not None:
+            dedup.commit()
+        if tracker is not None:
+            summary["changes"] = write_changes(tracker, project, dataset_id)
+    logging.info(
+        "Ingested %d/%d row(s) into %s in %d append(s), %d rejected",
+        summary["written"],
+        summary["received"],
+        table_id,
+        batches,
+        summary["rejected_count"],
+    )
+    return summary
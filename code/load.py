@@ -0,0 +1,293 @@
+"""
+Batch loading of large scanner dumps through BigQuery load jobs.
+
+A newline-delimited JSON file, local or staged in Cloud Storage, is read a
+batch at a time, converted by the table's Validator and written out as
+Parquet row groups, one file per partition of the target table. Each file is
+then loaded by a single load job into its partition (table$YYYYMMDD), which
+costs nothing, unlike streaming the same rows through the Storage Write API.
+
+Only one batch of rows per open partition is held in memory, whatever the
+size of the file. Parquet files are streamed to LOAD_STAGING_URI when it is
+set (Cloud Functions' /tmp is backed by memory) and to local temporary files
+otherwise; either way they are deleted once their load job has finished.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import uuid
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+import config
+from changes import get_change_tracker
+from dedup import get_deduplicator
+from ingest import (
+    MAX_REPORTED_REJECTIONS,
+    get_table_config,
+    get_validator,
+    parse_ndjson,
+    write_changes,
+)
+from schema import build_schema
+
+_PARTITION_FORMATS = {"DAY": "%Y%m%d", "HOUR": "%Y%m%d%H"}
+
+_storage_client = None
+_storage_client_lock = threading.Lock()
+
+
+def get_storage_client():
+    """Return the process-wide Cloud Storage client, creating it on first use."""
+    global _storage_client
+    if _storage_client is None:
+        with _storage_client_lock:
+            if _storage_client is None:
+                from google.cloud import storage
+
+                _storage_client = storage.Client()
+    return _storage_client
+
+
+def split_gcs_uri(uri: str) -> tuple:
+    """Split gs://bucket/name into (bucket, name)."""
+    bucket, _, name = uri.removeprefix("gs://").partition("/")
+    return bucket, name
+
+
+def open_source(source: str):
+    """Open a local path or gs:// URI for streaming reads, as text."""
+    if source.startswith("gs://"):
+        bucket, name = split_gcs_uri(source)
+        blob = get_storage_client().bucket(bucket).blob(name)
+        return blob.open("r", encoding="utf-8")
+    return open(source, encoding="utf-8")
+
+
+def partition_keys(batch: pa.RecordBatch, table_config: dict) -> pa.Array:
+    """Partition decorator (YYYYMMDD or YYYYMMDDHH) of every row; NULL if unset."""
+    column = batch.column(table_config["partition_column"])
+    return pc.strftime(column, format=_PARTITION_FORMATS[table_config["partition_type"]])
+
+
+# ---------------------------
+# PARQUET STAGING
+# ---------------------------
+class _PartitionFiles:
+    """One Parquet writer per partition, each fed a row group at a time."""
+
+    def __init__(self, table_id: str, schema: pa.Schema, row_group_rows: int):
+        self._schema = schema
+        self._row_group_rows = row_group_rows
+        self._staging = config.LOAD_STAGING_URI.rstrip("/")
+        self._prefix = f"{table_id}/{uuid.uuid4().hex}"
+        self._writers = {}
+        self._pending = {}
+        self.files = {}
+
+    def _open(self, key):
+        name = f"{key or 'null'}.parquet"
+        if self._staging:
+            uri = f"{self._staging}/{self._prefix}/{name}"
+            bucket, blob_name = split_gcs_uri(uri)
+            sink = get_storage_client().bucket(bucket).blob(blob_name).open("wb")
+        else:
+            fd, uri = tempfile.mkstemp(prefix="load-", suffix=f"-{name}")
+            sink = os.fdopen(fd, "wb")
+        self.files[key] = {"uri": uri, "rows": 0}
+        return sink, pq.ParquetWriter(sink, self._schema)
+
+    def write(self, key, batch: pa.RecordBatch) -> None:
+        """Buffer batch for its partition, writing a row group when full."""
+        pending = self._pending.setdefault(key, [])
+        pending.append(batch)
+        if sum(b.num_rows for b in pending) >= self._row_group_rows:
+            self._flush(key)
+
+    def _flush(self, key) -> None:
+        pending = self._pending.pop(key, None)
+        if not pending:
+            return
+        if key not in self._writers:
+            self._writers[key] = self._open(key)
+        table = pa.Table.from_batches(pending, schema=self._schema)
+        self._writers[key][1].write_table(table, row_group_size=table.num_rows)
+        self.files[key]["rows"] += table.num_rows
+
+    def close(self) -> dict:
+        """Flush and close every file; returns partition key -> {uri, rows}."""
+        try:
+            for key in list(self._pending):
+                self._flush(key)
+        finally:
+            for sink, writer in self._writers.values():
+                writer.close()
+                sink.close()
+        return self.files
+
+
+def _delete_staged(uri: str) -> None:
+    try:
+        if uri.startswith("gs://"):
+            bucket, name = split_gcs_uri(uri)
+            get_storage_client().bucket(bucket).blob(name).delete()
+        else:
+            os.remove(uri)
+    except Exception as e:
+        logging.warning("Could not delete staged file %s: %s", uri, e)
+
+
+# ---------------------------
+# LOAD JOBS
+# ---------------------------
+def _job_config(table_config: dict):
+    from google.cloud import bigquery
+
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.PARQUET,
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        schema=build_schema(table_config["schema"]),
+    )
+    parquet_options = bigquery.ParquetOptions()
+    parquet_options.enable_list_inference = True
+    job_config.parquet_options = parquet_options
+    return job_config
+
+
+def _start_load(client, destination: str, uri: str, job_config):
+    if uri.startswith("gs://"):
+        return client.load_table_from_uri(uri, destination, job_config=job_config)
+    with open(uri, "rb") as f:
+        return client.load_table_from_file(f, destination, job_config=job_config)
+
+
+def load_file(client, source: str, table_id: str, dataset_id: str) -> dict:
+    """
+    Load a newline-delimited JSON file into a table, one load job per partition.
+
+    Args:
+        client: BigQuery client for the destination project
+        source: local path or gs:// URI of the file
+        table_id: one of TABLE_CONFIGS
+        dataset_id: destination dataset
+
+    Returns:
+        Summary with received/written/rejected counts (plus dropped
+        duplicates for tables with a dedup_key and change rows for tables
+        with a change_key), up to
+        MAX_REPORTED_REJECTIONS rejected rows with reasons, and per-partition
+        job results
+
+    Raises:
+        UnknownTableError: if table_id is not in TABLE_CONFIGS
+    """
+    table_config = get_table_config(table_id)
+    validator = get_validator(table_id)
+    dedup = get_deduplicator(table_config)
+    tracker = get_change_tracker(table_config)
+    batch_rows = max(1, config.INGEST_BATCH_ROWS)
+
+    summary = {
+        "table_id": table_id,
+        "source": source,
+        "received": 0,
+        "written": 0,
+        "rejected_count": 0,
+    }
+    if dedup is not None:
+        summary["duplicates"] = 0
+    if tracker is not None:
+        summary["changes"] = 0
+    rejected = []
+    files = _PartitionFiles(table_id, validator.schema, batch_rows)
+    pending, pending_lines = [], []
+
+    def reject(line_number, reason):
+        summary["rejected_count"] += 1
+        if len(rejected) < MAX_REPORTED_REJECTIONS:
+            rejected.append({"line": line_number, "reason": reason})
+
+    def flush():
+        nonlocal pending, pending_lines
+        if not pending:
+            return
+        batch, errors = validator.convert(pending)
+        for index, reason in sorted(errors.items()):
+            reject(pending_lines[index], reason)
+        if tracker is not None:
+            tracker.observe(batch)
+        if dedup is not None:
+            batch, duplicates = dedup.filter(batch)
+            summary["duplicates"] += duplicates
+        keys = partition_keys(batch, table_config)
+        for key in pc.unique(keys).to_pylist():
+            mask = pc.is_null(keys) if key is None else pc.equal(keys, key)
+            files.write(key, batch.filter(mask))
+        pending, pending_lines = [], []
+
+    try:
+        with open_source(source) as lines:
+            for line_number, _, row, error in parse_ndjson(lines):
+                summary["received"] += 1
+                if error is not None:
+                    reject(line_number, error)
+                    continue
+                pending.append(row)
+                pending_lines.append(line_number)
+                if len(pending) >= batch_rows:
+                    flush()
+            flush()
+    finally:
+        staged = files.close()
+
+    job_config = _job_config(table_config)
+    table_ref = f"{client.project}.{dataset_id}.{table_id}"
+    jobs = {}
+    try:
+        for key, staged_file in staged.items():
+            # Rows without a partition value go to the table's NULL partition.
+            destination = f"{table_ref}${key}" if key else table_ref
+            jobs[key] = _start_load(client, destination, staged_file["uri"], job_config)
+
+        partitions = []
+        for key, job in jobs.items():
+            result = {
+                "partition": key,
+                "rows": staged[key]["rows"],
+                "job_id": job.job_id,
+                "status": "loaded",
+            }
+            try:
+                job.result()
+                summary["written"] += result["rows"]
+            except Exception as e:
+                result.update(status="failed", error=str(e))
+                logging.error("Load job %s for %s$%s failed: %s", job.job_id, table_id, key, e)
+            partitions.append(result)
+    finally:
+        for staged_file in staged.values():
+            _delete_staged(staged_file["uri"])
+
+    if all(p["status"] == "loaded" for p in partitions):
+        if dedup is not None:
+            dedup.commit()
+        if tracker is not None:
+            summary["changes"] = write_changes(tracker, client.project, dataset_id)
+
+    rejected.sort(key=lambda entry: entry["line"])
+    summary["rejected"] = rejected
+    summary["partitions"] = sorted(partitions, key=lambda p: p["partition"] or "")
+    logging.info(
+        "Loaded %d/%d row(s) from %s into %s in %d load job(s), %d rejected",
+        summary["written"],
+        summary["received"],
+        source,
+        table_id,
+        len(jobs),
+        summary["rejected_count"],
+    )
+    return summary
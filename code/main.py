@@ -4,14 +4,34 @@ BigQuery Dataset/Table creation for multiple tables with partitioning, clusterin
 Cloud Function HTTP entry point included.
 """
 
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import contextlib
 import logging
 import json
+import sys
 import functions_framework
-from google.cloud import bigquery
-from google.api_core.exceptions import Conflict
 
-# Import project/table configs
-from config import PROJECT_ID, DATASET_ID, TABLE_CONFIGS, LOCATION
+# Import project/table configs. Settings are read from the environment on
+# first access and google.cloud.bigquery is only imported once a request
+# needs it, so registering the HTTP handler stays cheap.
+import config
+import telemetry
+from cache import SingleFlight
+from provisioner import get_client, plan_tables, provision_tables, summarize_plans
+
+_IMPORT_ENDED = time.perf_counter()
+
+
+class TableProvisioningError(RuntimeError):
+    """Raised when one or more tables could not be provisioned."""
+
+    def __init__(self, failed: list, results: list):
+        super().__init__(f"{len(failed)} table(s) failed: {', '.join(failed)}")
+        self.failed = failed
+        self.results = results
 
 
 # ---------------------------
@@ -23,61 +43,93 @@ logging.basicConfig(
 )
 
 
-def ensure_dataset(client, dataset_id: str, location: str):
-    """Create dataset if it does not exist."""
-    dataset_ref = f"{PROJECT_ID}.{dataset_id}"
-    dataset = bigquery.Dataset(dataset_ref)
-    dataset.location = location
-    dataset = client.create_dataset(dataset, exists_ok=True)
-    logging.info("Dataset ready: %s", dataset.dataset_id)
-
-
-def ensure_table(client, dataset_id: str, table_config: dict):
-    """Create table if it does not exist, with schema, partitioning, clustering, and partition expiration."""
-    table_ref = f"{PROJECT_ID}.{dataset_id}.{table_config['table_id']}"
-    table = bigquery.Table(table_ref, schema=table_config["schema"])
+# ---------------------------
+# WARM-INSTANCE STATE
+# ---------------------------
+# Clients and verified table metadata are pooled in provisioner.py.
+_cold_start = True
+# Concurrent requests for the same run (an instance serves several at once)
+# share one provisioning or planning pass instead of racing each other.
+_runs = SingleFlight()
 
-    # Partitioning
-    table.time_partitioning = bigquery.TimePartitioning(
-        type_=bigquery.TimePartitioningType.DAY,
-        field=table_config["partition_column"],
-        expiration_ms=table_config["expiration_ms"]
-        if table_config["expiration_ms"] > 0
-        else None,
-    )
 
-    # Clustering
-    if table_config["clustering_columns"]:
-        table.clustering_fields = table_config["clustering_columns"]
+def main(force: bool = False, use_cache: bool = True, recluster: bool = False) -> list:
+    """
+    Main function to create BigQuery datasets and tables.
 
-    try:
-        table = client.create_table(table)
-        logging.info(
-            "Created new table: %s (Partition: %s, Clustering: %s, Expiration: %s days)",
-            table.table_id,
-            table_config["partition_column"] or "None",
-            table_config["clustering_columns"] or "None",
-            table_config["expiration_ms"] / (24 * 60 * 60 * 1000)
-            if table_config["expiration_ms"]
-            else "None",
-        )
-    except Conflict:
-        logging.info("Table already exists: %s", table_config["table_id"])
+    Args:
+        force: Re-check every table even if its config hash label is current
+        use_cache: Reuse table metadata verified by a recent invocation
+        recluster: Migrate existing tables to the configured clustering
 
+    Returns:
+        Per-table provisioning results
 
-def main():
-    """Main function to create BigQuery datasets and tables."""
+    Raises:
+        TableProvisioningError: if any table failed to provision
+    """
     logging.info("Starting BigQuery loader script.")
-    client = bigquery.Client(project=PROJECT_ID)
+    started = time.perf_counter()
+    client = get_client()
 
     # Ensure dataset
-    #ensure_dataset(client, DATASET_ID, LOCATION)
+    #ensure_dataset(client, config.DATASET_ID, config.LOCATION)
 
     # Ensure tables
-    for table_config in TABLE_CONFIGS:
-        ensure_table(client, DATASET_ID, table_config)
+    results = provision_tables(
+        client,
+        config.DATASET_ID,
+        config.TABLE_CONFIGS,
+        force=force,
+        use_cache=use_cache,
+        recluster=recluster,
+    )
+
+    failed = [r["table_id"] for r in results if r["status"] != "success"]
+    logging.info(
+        "Provisioned %d table(s) in %.1f ms (%d failed)",
+        len(results),
+        (time.perf_counter() - started) * 1000,
+        len(failed),
+    )
+    if failed:
+        raise TableProvisioningError(failed, results)
 
     logging.info("Script completed successfully.")
+    return results
+
+
+def _is_true(value) -> bool:
+    """Interpret a query parameter or env var value as a boolean flag."""
+    return str(value or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+@contextlib.contextmanager
+def _traced_invocation(name: str, request):
+    """
+    Root span of one invocation, joined to the caller's trace when the
+    request carries one. The first invocation of an instance is flagged as
+    a cold start and also records how long importing this module took.
+    """
+    global _cold_start
+    cold_start, _cold_start = _cold_start, False
+    trace_id = telemetry.trace_id_from_header(
+        request.headers.get("traceparent") or request.headers.get("X-Cloud-Trace-Context")
+    )
+    with telemetry.span(name, trace_id=trace_id, cold_start=cold_start) as span:
+        if cold_start:
+            telemetry.record("import", _IMPORT_STARTED, _IMPORT_ENDED)
+        yield span
+
+
+def _timing(span) -> dict:
+    """Timing summary of an invocation for its response."""
+    return {
+        "trace_id": span.trace_id,
+        "cold_start": span.attributes["cold_start"],
+        "elapsed_ms": round(span.elapsed_ms(), 1),
+        **span.breakdown(),
+    }
 
 
 @functions_framework.http
@@ -86,32 +138,378 @@ def http_trigger(request):
     HTTP Cloud Function entry point.
     
     Calls the BigQuery loader to ensure datasets and tables are created.
+    Pass ?force=true to ignore the config hash labels and re-check every table,
+    or ?nocache=true to bypass metadata cached by a recent invocation.
+    ?recluster=true migrates existing tables to the configured clustering.
+    ?plan=true only reports what would be done to each table (honouring
+    force and recluster) without changing anything.
+
+    Requests arriving while an identical one is running wait for it and
+    return its results, with "coalesced": true.
     
     Returns:
-        JSON response with status and message
+        JSON response with status and message, per-table results (or plans)
+        with their timing breakdown and the invocation's timing
     """
     logging.info("Cloud Function triggered via HTTP")
-    
+
+    with _traced_invocation("http_trigger", request) as span:
+        try:
+            force = _is_true(request.args.get("force"))
+            recluster = _is_true(request.args.get("recluster"))
+            if _is_true(request.args.get("plan")):
+                plans, coalesced = _runs.do(
+                    ("plan", config.PROJECT_ID, config.DATASET_ID, force, recluster),
+                    lambda: plan_tables(
+                        get_client(),
+                        config.DATASET_ID,
+                        config.TABLE_CONFIGS,
+                        force=force,
+                        recluster=recluster,
+                    ),
+                )
+                span.set(coalesced=coalesced)
+                summary = summarize_plans(plans)
+                response = {
+                    "status": "error" if summary["errors"] else "success",
+                    "mode": "plan",
+                    "project": config.PROJECT_ID,
+                    "dataset_id": config.DATASET_ID,
+                    **summary,
+                    "tables": plans,
+                    "coalesced": coalesced,
+                    "timing": _timing(span),
+                }
+                code = 500 if summary["errors"] else 200
+                return json.dumps(response), code, {"Content-Type": "application/json"}
+
+            # Call the main BigQuery loader function, or wait for the
+            # identical call another request already started.
+            use_cache = not _is_true(request.args.get("nocache"))
+            results, coalesced = _runs.do(
+                ("provision", config.PROJECT_ID, config.DATASET_ID, force, use_cache, recluster),
+                lambda: main(force=force, use_cache=use_cache, recluster=recluster),
+            )
+            span.set(coalesced=coalesced)
+
+            response = {
+                "status": "success",
+                "message": "BigQuery tables created/verified successfully",
+                "tables": results,
+                "coalesced": coalesced,
+                "timing": _timing(span),
+            }
+            logging.info("Function completed successfully")
+            return json.dumps(response), 200, {"Content-Type": "application/json"}
+
+        except TableProvisioningError as e:
+            logging.error(f"Function failed: {str(e)}")
+
+            error_response = {
+                "status": "error",
+                "message": f"Failed to create/verify BigQuery tables: {str(e)}",
+                "tables": e.results,
+                "timing": _timing(span),
+            }
+            return json.dumps(error_response), 500, {"Content-Type": "application/json"}
+
+        except Exception as e:
+            logging.error(f"Function failed: {str(e)}")
+
+            error_response = {
+                "status": "error",
+                "message": f"Failed to create/verify BigQuery tables: {str(e)}",
+                "timing": _timing(span),
+            }
+            return json.dumps(error_response), 500, {"Content-Type": "application/json"}
+
+
+@functions_framework.http
+def metrics_trigger(request):
+    """
+    HTTP Cloud Function entry point reporting this instance's span statistics.
+
+    Returns:
+        JSON response with count, errors, total, mean and max milliseconds
+        per span name (and per span name and table) since the instance started
+    """
+    response = {"status": "success", "cold_start": _cold_start, **telemetry.METRICS.snapshot()}
+    return json.dumps(response), 200, {"Content-Type": "application/json"}
+
+
+@functions_framework.http
+def fleet_trigger(request):
+    """
+    HTTP Cloud Function entry point for provisioning many datasets at once.
+
+    Expects a POST body with a JSON list of targets (or {"targets": [...]}),
+    each with project, dataset_id and optionally location and the client's
+    retention_tiers / retention_overrides. Accepts the same force and
+    recluster parameters as http_trigger; ?create_datasets=true also creates
+    missing datasets and ?max_targets=N overrides FLEET_MAX_TARGETS.
+    ?plan=true returns every target's per-table plan instead of applying it.
+
+    Returns:
+        JSON response with status and the aggregate fleet report
+    """
+    from fleet import parse_targets, plan_fleet, provision_fleet
+
     try:
-        # Call the main BigQuery loader function
-        main()
-        
-        response = {
-            "status": "success",
-            "message": "BigQuery tables created/verified successfully"
+        targets = parse_targets(request.get_json(silent=True))
+        max_targets = request.args.get("max_targets")
+        max_targets = int(max_targets) if max_targets else None
+    except ValueError as e:
+        error_response = {"status": "error", "message": str(e)}
+        return json.dumps(error_response), 400, {"Content-Type": "application/json"}
+    logging.info("Fleet provisioning triggered via HTTP for %d target(s)", len(targets))
+
+    with _traced_invocation("fleet_trigger", request) as span:
+        try:
+            if _is_true(request.args.get("plan")):
+                report = plan_fleet(
+                    targets,
+                    force=_is_true(request.args.get("force")),
+                    recluster=_is_true(request.args.get("recluster")),
+                    max_targets=max_targets,
+                )
+                status = "success" if not report["failed_targets"] else "error"
+                response = {
+                    "status": status,
+                    "mode": "plan",
+                    **report,
+                    "timing": _timing(span),
+                }
+                code = 200 if status == "success" else 500
+                return json.dumps(response), code, {"Content-Type": "application/json"}
+
+            report = provision_fleet(
+                targets,
+                force=_is_true(request.args.get("force")),
+                recluster=_is_true(request.args.get("recluster")),
+                create_datasets=_is_true(request.args.get("create_datasets")),
+                max_targets=max_targets,
+            )
+            status = "success" if not report["failed_targets"] else "error"
+            response = {"status": status, **report, "timing": _timing(span)}
+            code = 200 if status == "success" else 500
+            return json.dumps(response), code, {"Content-Type": "application/json"}
+
+        except Exception as e:
+            logging.error(f"Fleet provisioning failed: {str(e)}")
+
+            error_response = {
+                "status": "error",
+                "message": f"Failed to provision fleet: {str(e)}",
+                "timing": _timing(span),
+            }
+            return json.dumps(error_response), 500, {"Content-Type": "application/json"}
+
+
+@functions_framework.http
+def ingest_trigger(request):
+    """
+    HTTP Cloud Function entry point for bulk row ingestion.
+
+    Expects a POST body of newline-delimited JSON rows and a table_id query
+    parameter naming one of TABLE_CONFIGS. Valid rows are appended through
+    the BigQuery Storage Write API; invalid rows are reported with reasons.
+
+    Returns:
+        JSON response with status and the ingestion summary
+    """
+    from ingest import UnknownTableError, ingest_ndjson
+
+    table_id = request.args.get("table_id")
+    logging.info("Ingestion triggered via HTTP for table %s", table_id)
+
+    try:
+        summary = ingest_ndjson(
+            request.get_data(),
+            table_id,
+            config.PROJECT_ID,
+            config.DATASET_ID,
+        )
+        status = "success" if not summary["rejected_count"] else "partial"
+        response = {"status": status, **summary}
+        return json.dumps(response), 200, {"Content-Type": "application/json"}
+
+    except UnknownTableError as e:
+        error_response = {"status": "error", "message": str(e)}
+        return json.dumps(error_response), 400, {"Content-Type": "application/json"}
+
+    except Exception as e:
+        logging.error(f"Ingestion failed: {str(e)}")
+
+        error_response = {
+            "status": "error",
+            "message": f"Failed to ingest rows into {table_id}: {str(e)}",
+        }
+        return json.dumps(error_response), 500, {"Content-Type": "application/json"}
+
+
+@functions_framework.http
+def load_trigger(request):
+    """
+    HTTP Cloud Function entry point for batch loading a staged scanner dump.
+
+    Expects table_id and source (gs:// URI of a newline-delimited JSON file)
+    query parameters. The file is converted to Parquet and loaded with one
+    load job per partition; invalid rows are reported with reasons.
+
+    Returns:
+        JSON response with status and the load summary
+    """
+    from ingest import UnknownTableError
+    from load import load_file
+
+    table_id = request.args.get("table_id")
+    source = request.args.get("source", "")
+    logging.info("Batch load of %s triggered via HTTP for table %s", source, table_id)
+
+    if not source.startswith("gs://"):
+        error_response = {"status": "error", "message": "source must be a gs:// URI"}
+        return json.dumps(error_response), 400, {"Content-Type": "application/json"}
+
+    try:
+        summary = load_file(get_client(), source, table_id, config.DATASET_ID)
+        if any(p["status"] == "failed" for p in summary["partitions"]):
+            response = {"status": "error", **summary}
+            return json.dumps(response), 500, {"Content-Type": "application/json"}
+        status = "success" if not summary["rejected_count"] else "partial"
+        response = {"status": status, **summary}
+        return json.dumps(response), 200, {"Content-Type": "application/json"}
+
+    except UnknownTableError as e:
+        error_response = {"status": "error", "message": str(e)}
+        return json.dumps(error_response), 400, {"Content-Type": "application/json"}
+
+    except Exception as e:
+        logging.error(f"Batch load failed: {str(e)}")
+
+        error_response = {
+            "status": "error",
+            "message": f"Failed to load {source} into {table_id}: {str(e)}",
         }
-        logging.info("Function completed successfully")
+        return json.dumps(error_response), 500, {"Content-Type": "application/json"}
+
+
+@functions_framework.http
+def retention_trigger(request):
+    """
+    HTTP Cloud Function entry point for partition retention.
+
+    Reports per-table storage under the configured retention tiers and, when
+    RETENTION_ARCHIVE_URI is set, exports partitions expiring within the
+    next horizon_hours (query parameter, default 24) to it as Parquet.
+    Pass ?archive=false to only report. Meant to be called on a schedule at
+    most horizon_hours apart.
+
+    Returns:
+        JSON response with status and the retention report
+    """
+    from retention import apply_retention
+
+    archive_uri = config.RETENTION_ARCHIVE_URI
+    if request.args.get("archive") is not None and not _is_true(request.args.get("archive")):
+        archive_uri = ""
+    logging.info("Retention triggered via HTTP (archive: %s)", archive_uri or "off")
+
+    try:
+        horizon_hours = float(request.args.get("horizon_hours", 24))
+    except ValueError:
+        error_response = {"status": "error", "message": "horizon_hours must be a number"}
+        return json.dumps(error_response), 400, {"Content-Type": "application/json"}
+
+    try:
+        report = apply_retention(
+            get_client(),
+            config.DATASET_ID,
+            config.TABLE_CONFIGS,
+            archive_uri=archive_uri,
+            horizon_hours=horizon_hours,
+        )
+        if report["totals"]["archive_failed"]:
+            response = {"status": "error", **report}
+            return json.dumps(response), 500, {"Content-Type": "application/json"}
+        response = {"status": "success", **report}
         return json.dumps(response), 200, {"Content-Type": "application/json"}
-        
+
     except Exception as e:
-        logging.error(f"Function failed: {str(e)}")
-        
+        logging.error(f"Retention failed: {str(e)}")
+
         error_response = {
-            "status": "error", 
-            "message": f"Failed to create/verify BigQuery tables: {str(e)}"
+            "status": "error",
+            "message": f"Failed to apply retention: {str(e)}",
         }
         return json.dumps(error_response), 500, {"Content-Type": "application/json"}
 
 
+def _cli(argv=None) -> int:
+    """
+    Command-line entry point: provision, or with --plan only plan, the
+    configured dataset (PROJECT_ID / DATASET_ID) or every target in a fleet
+    targets file, printing the result as JSON.
+
+    Returns:
+        Exit status: 0 when done (or, with --plan, when nothing would
+        change), 2 when --plan found pending changes, 1 on any failure
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--plan", action="store_true", help="Only report what would change, as JSON"
+    )
+    parser.add_argument(
+        "--targets",
+        metavar="FILE",
+        help="JSON file of fleet targets to use instead of PROJECT_ID / DATASET_ID",
+    )
+    parser.add_argument("--force", action="store_true", help="Ignore config hash labels")
+    parser.add_argument(
+        "--recluster", action="store_true", help="Migrate clustering of existing tables"
+    )
+    parser.add_argument(
+        "--trace", action="store_true", help="Also write span logs (to stderr)"
+    )
+    args = parser.parse_args(argv)
+    telemetry.set_exporters([telemetry.LogExporter(sys.stderr)] if args.trace else [])
+
+    if args.targets:
+        from fleet import parse_targets, plan_fleet, provision_fleet
+
+        with open(args.targets, encoding="utf-8") as f:
+            targets = parse_targets(json.load(f))
+        if args.plan:
+            report = plan_fleet(targets, force=args.force, recluster=args.recluster)
+        else:
+            report = provision_fleet(targets, force=args.force, recluster=args.recluster)
+        print(json.dumps(report, indent=2))
+        if report["failed_targets"]:
+            return 1
+        return 2 if args.plan and report["changes_pending"] else 0
+
+    if args.plan:
+        plans = plan_tables(
+            get_client(),
+            config.DATASET_ID,
+            config.TABLE_CONFIGS,
+            force=args.force,
+            recluster=args.recluster,
+        )
+        summary = summarize_plans(plans)
+        print(json.dumps({**summary, "tables": plans}, indent=2))
+        if summary["errors"]:
+            return 1
+        return 2 if summary["changes_pending"] else 0
+
+    try:
+        results = main(force=args.force, use_cache=False, recluster=args.recluster)
+    except TableProvisioningError as e:
+        results = e.results
+    print(json.dumps(results, indent=2))
+    return 1 if any(r["status"] != "success" for r in results) else 0
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(_cli())
\ No newline at end of file
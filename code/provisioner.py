@@ -0,0 +1,544 @@
+"""
+Provisioning of one dataset's tables: the pooled BigQuery clients, the
+bulk metadata fetch, per-table planning and the create/patch/stamp calls.
+
+Shared by the HTTP entry points and CLI in main.py and by fleet mode in
+fleet.py, so both use the same warm clients and metadata cache.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import telemetry
+import throttle
+from cache import TTLCache
+from schema import (
+    HASH_LABEL,
+    build_schema,
+    definition_hash,
+    diff_descriptions,
+    diff_schema,
+    diff_table_options,
+    merge_schema,
+)
+
+
+# ---------------------------
+# WARM-INSTANCE STATE
+# ---------------------------
+# Clients (and their keep-alive HTTP sessions) and verified table metadata
+# live at module level so warm invocations skip credential discovery,
+# connection setup and re-listing datasets that were checked moments ago.
+_clients = {}
+_clients_lock = threading.Lock()
+_metadata_cache = TTLCache()
+
+
+def get_client(project: str | None = None):
+    """
+    Return the pooled BigQuery client for a project, creating it on first use.
+
+    The client's HTTP session keeps up to MAX_WORKERS connections alive so
+    concurrent table calls reuse them instead of reconnecting.
+    """
+    project = project or config.PROJECT_ID
+    client = _clients.get(project)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(project)
+            if client is None:
+                with telemetry.span("client_init", project=project):
+                    from google.cloud import bigquery
+                    from requests.adapters import HTTPAdapter
+
+                    client = bigquery.Client(project=project)
+                    pool_size = max(10, config.MAX_WORKERS)
+                    client._http.mount(
+                        "https://",
+                        HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size),
+                    )
+                _clients[project] = client
+    return client
+
+
+def ensure_dataset(client, dataset_id: str, location: str):
+    """Create dataset if it does not exist."""
+    from google.cloud import bigquery
+
+    dataset_ref = f"{client.project}.{dataset_id}"
+    dataset = bigquery.Dataset(dataset_ref)
+    dataset.location = location
+    dataset = throttle.call(
+        "dataset", dataset_ref, client.create_dataset, dataset, exists_ok=True
+    )
+    logging.info("Dataset ready: %s", dataset.dataset_id)
+
+
+def _table_ref(client, dataset_id: str, table_config: dict) -> str:
+    return f"{client.project}.{dataset_id}.{table_config['table_id']}"
+
+
+def _list_tables(client, dataset_ref: str, retry=None) -> list:
+    """list_tables with every page fetched, so retries cover the whole listing."""
+    return list(client.list_tables(dataset_ref, retry=retry))
+
+
+def _hash_matches(table_config: dict, live_table, force: bool) -> bool:
+    """True when the live table is labelled with the hash of the current config."""
+    labels = live_table.labels or {}
+    return not force and labels.get(HASH_LABEL) == definition_hash(table_config)
+
+
+def fetch_live_tables(
+    client, dataset_id: str, table_configs: list, executor, force: bool = False
+) -> dict:
+    """
+    Fetch live metadata for the configured tables that already exist.
+
+    Issues a single list_tables call for the dataset. Tables whose config hash
+    label matches the current definition are returned as their list item and
+    need nothing else; full metadata (schema included) is fetched only for the
+    remaining existing tables, fanned out over the provided executor. A table
+    whose metadata cannot be read does not stop the others.
+
+    Returns:
+        Mapping of table_id to bigquery.Table or bigquery.table.TableListItem
+        for existing tables, or to the exception raised reading its metadata
+    """
+    from google.api_core.exceptions import NotFound
+
+    try:
+        items = {
+            item.table_id: item
+            for item in throttle.call(
+                "read", client.project, _list_tables, client, f"{client.project}.{dataset_id}"
+            )
+        }
+    except NotFound:
+        logging.warning("Dataset not found: %s", dataset_id)
+        return {}
+
+    live_tables = {}
+    stale_ids = []
+    for table_config in table_configs:
+        item = items.get(table_config["table_id"])
+        if item is None:
+            continue
+        if _hash_matches(table_config, item, force):
+            live_tables[item.table_id] = item
+        else:
+            stale_ids.append(item.table_id)
+
+    def fetch_table(table_id: str):
+        try:
+            return throttle.call(
+                "read",
+                client.project,
+                client.get_table,
+                f"{client.project}.{dataset_id}.{table_id}",
+            )
+        except Exception as e:
+            logging.error("Failed to read table %s: %s", table_id, e)
+            return e
+
+    tables = executor.map(telemetry.propagate(fetch_table), stale_ids)
+    live_tables.update(zip(stale_ids, tables))
+    return live_tables
+
+
+def plan_table(
+    table_config: dict, live_table=None, force: bool = False, recluster: bool = False
+) -> dict:
+    """
+    Decide what needs to happen for one table without touching BigQuery.
+
+    Partition expiration differences on existing partitioned tables are
+    always planned as a patch, so retention policy changes reach live
+    tables. Clustering differences are only planned as a patch in migration
+    mode (recluster); otherwise they are reported as deferred, and do not
+    keep the table from being stamped. Migration mode ignores the config
+    hash label, so tables stamped with deferred clustering are re-checked.
+
+    Returns:
+        Dictionary with the planned action ("create", "patch", "stamp" or
+        "noop"), the config hash, the missing field paths, the field paths
+        whose declared description is not on the live table, the table options
+        to patch with their live and desired values, the options deferred
+        to migration mode and any differences that are not applied
+    """
+    plan = {
+        "config_hash": definition_hash(table_config),
+        "missing_fields": [],
+        "described_fields": [],
+        "patched_options": [],
+        "option_changes": {},
+        "deferred_options": {},
+        "incompatible_fields": [],
+    }
+    if live_table is None:
+        return {**plan, "action": "create"}
+    if _hash_matches(table_config, live_table, force or recluster):
+        return {**plan, "action": "noop"}
+
+    missing, incompatible = diff_schema(table_config["schema"], live_table.schema)
+    described = diff_descriptions(table_config["schema"], live_table.schema)
+    option_drift = diff_table_options(table_config, live_table)
+    patched_options = []
+    option_changes = {}
+    deferred_options = {}
+    if live_table.time_partitioning is not None and "expiration_ms" in option_drift:
+        option_changes["expiration_ms"] = option_drift.pop("expiration_ms")
+        patched_options.append("time_partitioning")
+    if recluster and "clustering_columns" in option_drift:
+        option_changes["clustering_columns"] = option_drift.pop("clustering_columns")
+        patched_options.append("clustering_fields")
+    elif "clustering_columns" in option_drift:
+        deferred_options["clustering_columns"] = option_drift.pop("clustering_columns")
+        logging.info("Run with recluster to migrate %s", table_config["table_id"])
+    incompatible.extend(
+        f"{option}: {live} != {desired}"
+        for option, (live, desired) in option_drift.items()
+    )
+    plan.update(
+        missing_fields=missing,
+        described_fields=described,
+        patched_options=patched_options,
+        option_changes={
+            option: {"live": live, "desired": desired}
+            for option, (live, desired) in option_changes.items()
+        },
+        deferred_options={
+            option: {"live": live, "desired": desired}
+            for option, (live, desired) in deferred_options.items()
+        },
+        incompatible_fields=incompatible,
+    )
+
+    if missing or described or patched_options:
+        return {**plan, "action": "patch"}
+    # Only record the hash once everything it covers matches or is deferred
+    # to migration mode, so tables with unresolved drift keep being
+    # re-checked and reported.
+    if not incompatible and not _hash_matches(table_config, live_table, False):
+        return {**plan, "action": "stamp"}
+    return {**plan, "action": "noop"}
+
+
+def ensure_table(
+    client,
+    dataset_id: str,
+    table_config: dict,
+    live_table=None,
+    force: bool = False,
+    recluster: bool = False,
+) -> dict:
+    """
+    Create table if it does not exist, with schema, partitioning, clustering, and partition expiration.
+
+    If the live table is supplied, its schema is compared to the config instead
+    and missing columns are added, and declared column descriptions written,
+    with a single update_table call. In
+    migration mode (recluster) the table's clustering specification is
+    updated to the configured columns in the same call; BigQuery clusters
+    data written from then on by the new columns. A changed partition
+    expiration is applied the same way and takes effect on existing
+    partitions too. Tables labelled with the
+    hash of their current config are skipped without any API call unless
+    force is set; tables whose schema already matches cause at most one
+    label update to record the hash.
+
+    Returns:
+        The plan for the table with "action" replaced by the outcome:
+        "created", "exists", "patched", "stamped" or "unchanged"
+    """
+    from google.cloud import bigquery
+    from google.api_core.exceptions import Conflict
+
+    with telemetry.span("plan", table_id=table_config["table_id"]):
+        plan = plan_table(table_config, live_table, force, recluster)
+    hash_labels = {HASH_LABEL: plan["config_hash"]}
+    for issue in plan["incompatible_fields"]:
+        logging.warning(
+            "Schema drift in %s cannot be patched: %s", table_config["table_id"], issue
+        )
+
+    if plan["action"] == "noop":
+        logging.info("Table up to date: %s", table_config["table_id"])
+        return {**plan, "action": "unchanged"}
+
+    if plan["action"] == "stamp":
+        live_table.labels = {**(live_table.labels or {}), **hash_labels}
+        throttle.call(
+            "update",
+            _table_ref(client, dataset_id, table_config),
+            client.update_table,
+            live_table,
+            ["labels"],
+        )
+        logging.info("Table up to date, recorded config hash: %s", table_config["table_id"])
+        return {**plan, "action": "stamped"}
+
+    if plan["action"] == "patch":
+        fields = list(plan["patched_options"])
+        if plan["missing_fields"] or plan["described_fields"]:
+            live_table.schema = merge_schema(table_config["schema"], live_table.schema)
+            fields.append("schema")
+        if "time_partitioning" in fields:
+            partitioning = live_table.time_partitioning
+            partitioning.expiration_ms = table_config["expiration_ms"] or None
+            live_table.time_partitioning = partitioning
+        if "clustering_fields" in fields:
+            live_table.clustering_fields = table_config["clustering_columns"] or None
+        if not plan["incompatible_fields"]:
+            live_table.labels = {**(live_table.labels or {}), **hash_labels}
+            fields.append("labels")
+        throttle.call(
+            "update",
+            _table_ref(client, dataset_id, table_config),
+            client.update_table,
+            live_table,
+            fields,
+        )
+        logging.info(
+            "Patched table: %s (Added: %s, Descriptions: %s, Options: %s)",
+            table_config["table_id"],
+            ", ".join(plan["missing_fields"]) or "None",
+            ", ".join(plan["described_fields"]) or "None",
+            ", ".join(plan["patched_options"]) or "None",
+        )
+        return {**plan, "action": "patched"}
+
+    table = bigquery.Table(
+        _table_ref(client, dataset_id, table_config),
+        schema=build_schema(table_config["schema"]),
+    )
+    table.labels = hash_labels
+
+    # Partitioning
+    table.time_partitioning = bigquery.TimePartitioning(
+        type_=table_config.get("partition_type", bigquery.TimePartitioningType.DAY),
+        field=table_config["partition_column"],
+        expiration_ms=table_config["expiration_ms"]
+        if table_config["expiration_ms"] > 0
+        else None,
+    )
+
+    # Clustering
+    if table_config["clustering_columns"]:
+        table.clustering_fields = table_config["clustering_columns"]
+
+    try:
+        table = throttle.call("create", client.project, client.create_table, table)
+        logging.info(
+            "Created new table: %s (Partition: %s, Clustering: %s, Expiration: %s days)",
+            table.table_id,
+            table_config["partition_column"] or "None",
+            table_config["clustering_columns"] or "None",
+            table_config["expiration_ms"] / (24 * 60 * 60 * 1000)
+            if table_config["expiration_ms"]
+            else "None",
+        )
+        return {**plan, "action": "created"}
+    except Conflict:
+        logging.info("Table already exists: %s", table_config["table_id"])
+        return {**plan, "action": "exists"}
+
+
+def provision_table(
+    client,
+    dataset_id: str,
+    table_config: dict,
+    live_table=None,
+    force: bool = False,
+    recluster: bool = False,
+) -> dict:
+    """
+    Run ensure_table for one table and capture its outcome and timing, with
+    a per-phase breakdown (planning, each kind of BigQuery call, throttling
+    and retry backoff) under "timings".
+
+    If the table changed between reading its metadata and updating it (for
+    example a retried update that had in fact gone through, or another
+    caller), its metadata is read again and the table re-planned once, so
+    an interrupted run resumes where it stopped.
+
+    live_table may be the exception raised reading the table's metadata, which
+    is reported as the table's error.
+    """
+    from google.api_core.exceptions import PreconditionFailed
+
+    started = time.perf_counter()
+    result = {"table_id": table_config["table_id"], "status": "success"}
+    with telemetry.span("table", table_id=table_config["table_id"]) as span:
+        try:
+            if isinstance(live_table, Exception):
+                raise live_table
+            try:
+                outcome = ensure_table(
+                    client, dataset_id, table_config, live_table, force, recluster
+                )
+            except PreconditionFailed:
+                logging.info(
+                    "Table changed while patching, re-reading: %s", table_config["table_id"]
+                )
+                live_table = throttle.call(
+                    "read",
+                    client.project,
+                    client.get_table,
+                    _table_ref(client, dataset_id, table_config),
+                )
+                outcome = ensure_table(
+                    client, dataset_id, table_config, live_table, force, recluster
+                )
+            result.update(outcome)
+        except Exception as e:
+            logging.error("Failed to provision table %s: %s", table_config["table_id"], e)
+            result["status"] = "error"
+            result["error"] = str(e)
+            result["retryable"] = throttle.is_retryable(e)
+        span.set(action=result.get("action"), status=result["status"])
+        result["timings"] = span.breakdown()
+    result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def provision_tables(
+    client,
+    dataset_id: str,
+    table_configs: list,
+    max_workers: int | None = None,
+    force: bool = False,
+    use_cache: bool = True,
+    recluster: bool = False,
+) -> list:
+    """
+    Provision all tables on a bounded thread pool sharing one client.
+
+    Live metadata is fetched in bulk first so that only missing tables are
+    created and only drifted tables are patched. With force, the config hash
+    labels are ignored and every existing table is re-checked. With
+    recluster, every existing table is re-checked as well, and those whose
+    clustering differs from the config get their clustering specification
+    updated.
+
+    Metadata for a dataset whose tables were all verified unchanged is kept
+    for METADATA_CACHE_TTL seconds, together with the config hashes it was
+    verified against; repeat calls within that window with the same configs
+    make no API calls, while calls with other configs (e.g. another
+    retention policy) fetch metadata afresh. Any write or failure drops the
+    cached entry. use_cache=False (or force, or recluster) bypasses the cache.
+
+    Returns:
+        Per-table result dictionaries, in the same order as table_configs
+    """
+    if max_workers is None:
+        max_workers = config.MAX_WORKERS
+    cache_key = (client.project, dataset_id)
+    config_hashes = tuple(definition_hash(c) for c in table_configs)
+    live_tables = None
+    if use_cache and not (force or recluster):
+        # Cached list items carry no schema, so they are only usable for the
+        # configs they were verified against.
+        cached = _metadata_cache.get(cache_key)
+        if cached is not None and cached[0] == config_hashes:
+            live_tables = cached[1]
+    cache_hit = live_tables is not None
+    logging.info(
+        "Table metadata cache %s for %s", "hit" if cache_hit else "miss", dataset_id
+    )
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        if not cache_hit:
+            with telemetry.span("fetch_live_tables", dataset_id=dataset_id):
+                live_tables = fetch_live_tables(
+                    client, dataset_id, table_configs, executor, force or recluster
+                )
+        provision = telemetry.propagate(
+            lambda table_config: provision_table(
+                client,
+                dataset_id,
+                table_config,
+                live_tables.get(table_config["table_id"]),
+                force,
+                recluster,
+            )
+        )
+        results = list(executor.map(provision, table_configs))
+
+    verified = all(
+        r["status"] == "success" and r["action"] == "unchanged" for r in results
+    )
+    if not verified:
+        _metadata_cache.invalidate(cache_key)
+    elif not cache_hit:
+        _metadata_cache.set(
+            cache_key, (config_hashes, live_tables), config.METADATA_CACHE_TTL
+        )
+    return results
+
+
+def plan_tables(
+    client,
+    dataset_id: str,
+    table_configs: list,
+    max_workers: int | None = None,
+    force: bool = False,
+    recluster: bool = False,
+) -> list:
+    """
+    Plan every table of a dataset without changing anything.
+
+    Live metadata is fetched in bulk exactly as provision_tables does (one
+    list_tables call, then get_table only for tables whose config hash label
+    is stale), bypassing the metadata cache, and each table is run through
+    plan_table.
+
+    Returns:
+        Per-table plans ("table_id" plus plan_table's output), in the same
+        order as table_configs; a table whose metadata could not be read gets
+        action "error" with the error and whether it is retryable instead
+    """
+    if max_workers is None:
+        max_workers = config.MAX_WORKERS
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        with telemetry.span("fetch_live_tables", dataset_id=dataset_id):
+            live_tables = fetch_live_tables(
+                client, dataset_id, table_configs, executor, force or recluster
+            )
+    plans = []
+    for table_config in table_configs:
+        live_table = live_tables.get(table_config["table_id"])
+        if isinstance(live_table, Exception):
+            plans.append(
+                {
+                    "table_id": table_config["table_id"],
+                    "action": "error",
+                    "error": str(live_table),
+                    "retryable": throttle.is_retryable(live_table),
+                }
+            )
+            continue
+        with telemetry.span("plan", table_id=table_config["table_id"]):
+            plan = plan_table(table_config, live_table, force, recluster)
+        plans.append({"table_id": table_config["table_id"], **plan})
+    return plans
+
+
+def summarize_plans(plans: list) -> dict:
+    """
+    Number of tables per planned action, whether any change is pending and
+    how many tables could not be planned.
+    """
+    actions = {}
+    for plan in plans:
+        actions[plan["action"]] = actions.get(plan["action"], 0) + 1
+    return {
+        "actions": actions,
+        "changes_pending": any(plan["action"] not in ("noop", "error") for plan in plans),
+        "incompatible": sum(bool(plan.get("incompatible_fields")) for plan in plans),
+        "deferred": sum(bool(plan.get("deferred_options")) for plan in plans),
+        "errors": actions.get("error", 0),
+    }
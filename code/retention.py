@@ -0,0 +1,248 @@
+"""
+Partition retention: archiving partitions before they expire and reporting
+what each table's retention tier costs in storage.
+
+Partition expiration itself is part of every table's definition
+(expiration_ms, resolved from its retention tier in config.py) and applied
+by ensure_table. This module reads the dataset's INFORMATION_SCHEMA.PARTITIONS
+once, exports the partitions that will expire within the next horizon_hours
+to RETENTION_ARCHIVE_URI as Parquet (one extract job per partition, which
+BigQuery does not charge for), and estimates each table's steady-state
+storage under its tier against the previous flat 7-day retention.
+"""
+
+import datetime
+import logging
+
+import config
+from load import get_storage_client, split_gcs_uri
+
+# Retention every table had before tiers; savings are reported against it.
+BASELINE_RETENTION_DAYS = 7
+
+# Active logical storage list price (US multi-region), for the estimates only.
+STORAGE_USD_PER_GIB_MONTH = 0.02
+
+_PARTITION_FORMATS = {"DAY": "%Y%m%d", "HOUR": "%Y%m%d%H"}
+
+_PARTITIONS_QUERY = """
+SELECT table_name, partition_id, total_rows, total_logical_bytes
+FROM `{project}.{dataset_id}.INFORMATION_SCHEMA.PARTITIONS`
+WHERE table_name IN UNNEST(@table_ids)
+"""
+
+
+def fetch_partitions(client, dataset_id: str, table_ids: list) -> dict:
+    """
+    List the partitions of the given tables with one INFORMATION_SCHEMA query.
+
+    Returns:
+        Mapping of table_id to a list of {partition_id, rows, bytes}
+    """
+    from google.cloud import bigquery
+
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ArrayQueryParameter("table_ids", "STRING", table_ids)]
+    )
+    query = _PARTITIONS_QUERY.format(project=client.project, dataset_id=dataset_id)
+    partitions = {table_id: [] for table_id in table_ids}
+    for row in client.query(query, job_config=job_config, location=config.LOCATION).result():
+        partitions[row["table_name"]].append(
+            {
+                "partition_id": row["partition_id"],
+                "rows": row["total_rows"] or 0,
+                "bytes": row["total_logical_bytes"] or 0,
+            }
+        )
+    return partitions
+
+
+def partition_start(partition_id: str, partition_type: str):
+    """Start of a time partition in UTC, or None for __NULL__ and the like."""
+    try:
+        start = datetime.datetime.strptime(partition_id, _PARTITION_FORMATS[partition_type])
+    except (KeyError, ValueError):
+        return None
+    return start.replace(tzinfo=datetime.timezone.utc)
+
+
+def expiring_partitions(
+    table_config: dict, partitions: list, now: datetime.datetime, horizon_hours: float
+) -> list:
+    """Partitions of a table that expire before now + horizon_hours, oldest first."""
+    if not table_config["expiration_ms"]:
+        return []
+    expiration = datetime.timedelta(milliseconds=table_config["expiration_ms"])
+    cutoff = now + datetime.timedelta(hours=horizon_hours)
+    expiring = [
+        p
+        for p in partitions
+        if (start := partition_start(p["partition_id"], table_config["partition_type"]))
+        and start + expiration <= cutoff
+    ]
+    return sorted(expiring, key=lambda p: p["partition_id"])
+
+
+# ---------------------------
+# ARCHIVING
+# ---------------------------
+def _is_archived(prefix: str) -> bool:
+    bucket, name = split_gcs_uri(prefix)
+    blobs = get_storage_client().list_blobs(bucket, prefix=name, max_results=1)
+    return any(True for _ in blobs)
+
+
+def archive_partitions(
+    client, dataset_id: str, table_id: str, partitions: list, archive_uri: str
+) -> list:
+    """
+    Export partitions to <archive_uri>/<dataset>/<table>/<partition_id>/ as Parquet.
+
+    Partitions that already have files under their prefix are skipped, so a
+    partition is exported once however often this runs before it expires.
+    Extract jobs are started together and then awaited.
+
+    Returns:
+        One result per partition with its status ("archived", "skipped" or
+        "failed"), destination and job id
+    """
+    from google.cloud import bigquery
+
+    job_config = bigquery.ExtractJobConfig(
+        destination_format=bigquery.DestinationFormat.PARQUET,
+        compression=bigquery.Compression.SNAPPY,
+    )
+    table_ref = f"{client.project}.{dataset_id}.{table_id}"
+    results, jobs = [], []
+    for partition in partitions:
+        prefix = f"{archive_uri.rstrip('/')}/{dataset_id}/{table_id}/{partition['partition_id']}/"
+        result = {"partition": partition["partition_id"], "uri": prefix, "status": "skipped"}
+        results.append(result)
+        if _is_archived(prefix):
+            continue
+        job = client.extract_table(
+            f"{table_ref}${partition['partition_id']}",
+            f"{prefix}*.parquet",
+            job_config=job_config,
+            location=config.LOCATION,
+        )
+        result["job_id"] = job.job_id
+        jobs.append((result, job))
+
+    for result, job in jobs:
+        try:
+            job.result()
+            result["status"] = "archived"
+        except Exception as e:
+            result.update(status="failed", error=str(e))
+            logging.error(
+                "Archive of %s$%s failed: %s", table_id, result["partition"], e
+            )
+    return results
+
+
+# ---------------------------
+# SAVINGS REPORT
+# ---------------------------
+def _monthly_usd(size_bytes: float) -> float:
+    return round(size_bytes / 2**30 * STORAGE_USD_PER_GIB_MONTH, 4)
+
+
+def table_report(table_config: dict, partitions: list, expiring: list) -> dict:
+    """
+    Storage of one table now and at steady state under its retention tier.
+
+    Daily volume is the table's current logical bytes over the number of
+    days it has partitions for. A tier of 0 days keeps data forever, so no
+    steady state (or saving) is reported for it.
+    """
+    retention_days = table_config["expiration_ms"] // config.DAY_MS
+    current_bytes = sum(p["bytes"] for p in partitions)
+    days = {
+        p["partition_id"][:8]
+        for p in partitions
+        if partition_start(p["partition_id"], table_config["partition_type"])
+    }
+    daily_bytes = current_bytes / len(days) if days else 0
+    baseline_bytes = daily_bytes * BASELINE_RETENTION_DAYS
+    projected_bytes = daily_bytes * retention_days if retention_days else None
+    savings_bytes = baseline_bytes - projected_bytes if projected_bytes is not None else None
+    return {
+        "table_id": table_config["table_id"],
+        "retention_tier": table_config["retention_tier"],
+        "retention_days": retention_days,
+        "partitions": len(partitions),
+        "rows": sum(p["rows"] for p in partitions),
+        "current_bytes": current_bytes,
+        "daily_bytes": round(daily_bytes),
+        "baseline_bytes": round(baseline_bytes),
+        "projected_bytes": round(projected_bytes) if projected_bytes is not None else None,
+        "savings_bytes": round(savings_bytes) if savings_bytes is not None else None,
+        "savings_usd_month": _monthly_usd(savings_bytes) if savings_bytes is not None else None,
+        "expiring_partitions": len(expiring),
+        "expiring_bytes": sum(p["bytes"] for p in expiring),
+    }
+
+
+def apply_retention(
+    client,
+    dataset_id: str,
+    table_configs: list,
+    archive_uri: str = "",
+    horizon_hours: float = 24,
+    now: datetime.datetime | None = None,
+) -> dict:
+    """
+    Archive partitions about to expire and report per-table storage savings.
+
+    Args:
+        client: BigQuery client for the dataset's project
+        dataset_id: dataset holding the tables
+        table_configs: entries of TABLE_CONFIGS to cover
+        archive_uri: gs:// prefix to export expiring partitions to; empty
+            to only report
+        horizon_hours: how far ahead a partition counts as expiring; at
+            least the interval this runs at, so nothing expires unarchived
+        now: reference time, defaults to the current time
+
+    Returns:
+        Per-table reports (with archive results when archiving) and totals
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    partitions = fetch_partitions(client, dataset_id, [c["table_id"] for c in table_configs])
+
+    tables = []
+    for table_config in table_configs:
+        table_partitions = partitions[table_config["table_id"]]
+        expiring = expiring_partitions(table_config, table_partitions, now, horizon_hours)
+        report = table_report(table_config, table_partitions, expiring)
+        if archive_uri:
+            report["archive"] = archive_partitions(
+                client, dataset_id, table_config["table_id"], expiring, archive_uri
+            )
+        tables.append(report)
+
+    savings = sum(t["savings_bytes"] or 0 for t in tables)
+    totals = {
+        "current_bytes": sum(t["current_bytes"] for t in tables),
+        "baseline_bytes": sum(t["baseline_bytes"] for t in tables),
+        "savings_bytes": savings,
+        "savings_usd_month": _monthly_usd(savings),
+        "archived": sum(
+            r["status"] == "archived" for t in tables for r in t.get("archive", [])
+        ),
+        "archive_failed": sum(
+            r["status"] == "failed" for t in tables for r in t.get("archive", [])
+        ),
+    }
+    logging.info(
+        "Retention report for %s: %d table(s), %d byte(s) saved vs %d-day baseline, "
+        "%d partition(s) archived, %d failed",
+        dataset_id,
+        len(tables),
+        savings,
+        BASELINE_RETENTION_DAYS,
+        totals["archived"],
+        totals["archive_failed"],
+    )
+    return {"dataset_id": dataset_id, "tables": tables, "totals": totals}
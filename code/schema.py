@@ -0,0 +1,253 @@
+"""
+Compact schema declarations for config.py, and structural comparison between
+those declarations and the live schemas returned by BigQuery.
+
+Table schemas are declared with the lightweight Field class so importing the
+table catalog does not require google.cloud.bigquery; SchemaField objects are
+only built, per table, when a table is actually created or patched.
+
+Only additive changes are ever applied: missing columns (including missing
+sub-fields of RECORD columns) are appended and declared column descriptions
+are written; type or mode mismatches are reported but left untouched since
+BigQuery cannot change them in place.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+
+# Table label holding the definition_hash() of the config last applied to it
+HASH_LABEL = "cyngular_config_hash"
+
+@dataclass(frozen=True, slots=True)
+class Field:
+    """Declarative column definition mirroring bigquery.SchemaField's arguments."""
+
+    name: str
+    field_type: str
+    mode: str = "NULLABLE"
+    description: str | None = None
+    fields: tuple = ()
+
+    def __post_init__(self):
+        object.__setattr__(self, "fields", tuple(self.fields))
+
+    def to_api_repr(self) -> dict:
+        """Return the REST API representation of the column."""
+        resource = {"name": self.name, "type": self.field_type, "mode": self.mode}
+        if self.description is not None:
+            resource["description"] = self.description
+        if self.fields:
+            resource["fields"] = [f.to_api_repr() for f in self.fields]
+        return resource
+
+
+def build_schema(fields) -> list:
+    """Build the bigquery.SchemaField list for a table's declared fields."""
+    from google.cloud import bigquery
+
+    return [bigquery.SchemaField.from_api_repr(f.to_api_repr()) for f in fields]
+
+
+# Legacy SQL and Standard SQL spell some types differently; the API returns the
+# legacy names regardless of which one the table was created with.
+_TYPE_ALIASES = {
+    "INT64": "INTEGER",
+    "FLOAT64": "FLOAT",
+    "BOOL": "BOOLEAN",
+    "STRUCT": "RECORD",
+}
+
+
+def normalize_type(field_type: str) -> str:
+    """Return the canonical (legacy SQL) spelling of a BigQuery column type."""
+    field_type = (field_type or "STRING").upper()
+    return _TYPE_ALIASES.get(field_type, field_type)
+
+
+def normalize_mode(mode: str) -> str:
+    """Return the canonical column mode, defaulting to NULLABLE."""
+    return (mode or "NULLABLE").upper()
+
+
+def diff_schema(desired, live, prefix: str = "") -> tuple[list, list]:
+    """
+    Compare a desired schema against a live one, recursing into RECORD fields.
+
+    Args:
+        desired: Sequence of schema fields from TABLE_CONFIGS
+        live: Sequence of bigquery.SchemaField from the live table
+        prefix: Dotted path of the enclosing RECORD (used in recursion)
+
+    Returns:
+        (missing, incompatible) where missing is a list of dotted field paths
+        that can be added, and incompatible is a list of human-readable
+        descriptions of differences that cannot be patched additively
+    """
+    live_by_name = {field.name.lower(): field for field in live}
+    missing = []
+    incompatible = []
+
+    for field in desired:
+        path = f"{prefix}{field.name}"
+        live_field = live_by_name.get(field.name.lower())
+
+        if live_field is None:
+            if normalize_mode(field.mode) == "REQUIRED":
+                incompatible.append(f"{path}: REQUIRED column cannot be added")
+            else:
+                missing.append(path)
+            continue
+
+        desired_type = normalize_type(field.field_type)
+        live_type = normalize_type(live_field.field_type)
+        if desired_type != live_type:
+            incompatible.append(f"{path}: type {live_type} != {desired_type}")
+            continue
+
+        desired_mode = normalize_mode(field.mode)
+        live_mode = normalize_mode(live_field.mode)
+        if desired_mode != live_mode:
+            incompatible.append(f"{path}: mode {live_mode} != {desired_mode}")
+
+        if desired_type == "RECORD":
+            sub_missing, sub_incompatible = diff_schema(
+                field.fields, live_field.fields, prefix=f"{path}."
+            )
+            missing.extend(sub_missing)
+            incompatible.extend(sub_incompatible)
+
+    return missing, incompatible
+
+
+def diff_descriptions(desired, live, prefix: str = "") -> list:
+    """
+    List the existing columns whose description differs from the declared one.
+
+    Columns declared without a description are left alone, so descriptions
+    set outside config.py are kept.
+
+    Returns:
+        Dotted paths of the columns (at any level of nesting) to update
+    """
+    live_by_name = {field.name.lower(): field for field in live}
+    changed = []
+
+    for field in desired:
+        path = f"{prefix}{field.name}"
+        live_field = live_by_name.get(field.name.lower())
+        if live_field is None:
+            continue
+        if field.description and field.description != live_field.description:
+            changed.append(path)
+        if normalize_type(field.field_type) == "RECORD":
+            changed.extend(
+                diff_descriptions(field.fields, live_field.fields, prefix=f"{path}.")
+            )
+
+    return changed
+
+
+def _merge_api_repr(desired, live_fields: list) -> list:
+    """
+    Append missing desired fields to a list of live field API representations,
+    and write the declared descriptions of the existing ones.
+    """
+    by_name = {field["name"].lower(): field for field in live_fields}
+
+    for field in desired:
+        live_field = by_name.get(field.name.lower())
+        if live_field is None:
+            if normalize_mode(field.mode) != "REQUIRED":
+                live_fields.append(field.to_api_repr())
+            continue
+        if field.description:
+            live_field["description"] = field.description
+
+        if (
+            normalize_type(field.field_type) == "RECORD"
+            and normalize_type(live_field.get("type")) == "RECORD"
+        ):
+            live_field["fields"] = _merge_api_repr(
+                field.fields, live_field.get("fields", [])
+            )
+
+    return live_fields
+
+
+def merge_schema(desired, live) -> list:
+    """
+    Build the patched schema for a live table.
+
+    Keeps every live column (and its policy tags, etc.) in its current
+    position, appends the desired columns that are missing and sets the
+    descriptions declared for the existing ones, at every level of nesting.
+
+    Returns:
+        List of bigquery.SchemaField suitable for Table.schema
+    """
+    from google.cloud import bigquery
+
+    merged = _merge_api_repr(desired, [field.to_api_repr() for field in live])
+    return [bigquery.SchemaField.from_api_repr(field) for field in merged]
+
+
+def _field_definition(field) -> dict:
+    """Canonical, alias-free representation of one schema field for hashing."""
+    definition = {
+        "name": field.name,
+        "type": normalize_type(field.field_type),
+        "mode": normalize_mode(field.mode),
+        "description": field.description or None,
+    }
+    if field.fields:
+        definition["fields"] = [_field_definition(f) for f in field.fields]
+    return definition
+
+
+def definition_hash(table_config: dict) -> str:
+    """
+    Compute a stable hash of everything ensure_table applies for a table.
+
+    Covers the schema, partition column and type, clustering columns and
+    partition expiration. The digest is truncated so it fits in a BigQuery label value
+    (max 63 characters).
+    """
+    definition = {
+        "schema": [_field_definition(f) for f in table_config["schema"]],
+        "partition_column": table_config["partition_column"],
+        "partition_type": table_config.get("partition_type", "DAY"),
+        "clustering_columns": list(table_config["clustering_columns"]),
+        "expiration_ms": table_config["expiration_ms"],
+    }
+    payload = json.dumps(definition, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:40]
+
+
+def diff_table_options(table_config: dict, live_table) -> dict:
+    """
+    Compare partitioning, expiration and clustering between a config entry
+    and a live table.
+
+    Returns:
+        Mapping of option name to (live value, desired value) for every
+        option that differs; empty when the options match
+    """
+    partitioning = live_table.time_partitioning
+    live = {
+        "partition_column": partitioning.field if partitioning else None,
+        "partition_type": partitioning.type_ if partitioning else None,
+        "expiration_ms": (partitioning.expiration_ms if partitioning else None) or None,
+        "clustering_columns": list(live_table.clustering_fields or []),
+    }
+    desired = {
+        "partition_column": table_config["partition_column"],
+        "partition_type": table_config.get("partition_type", "DAY"),
+        "expiration_ms": table_config["expiration_ms"] or None,
+        "clustering_columns": list(table_config["clustering_columns"]),
+    }
+    return {
+        option: (live[option], desired[option])
+        for option in desired
+        if live[option] != desired[option]
+    }
@@ -0,0 +1,331 @@
+"""
+Lightweight tracing for the provisioner: timed spans, structured logs and
+OpenTelemetry-compatible traces.
+
+A span times one phase (an invocation, a client being created, one table,
+one BigQuery call) and nests under whichever span is current in the calling
+thread; use propagate() to carry the current span into worker threads.
+Every span adds its duration, under its name, to the timings of all its
+ancestors, so the span for a table ends up with a per-phase breakdown of the
+calls made for it, and add_time() records time spent inside a span that is
+not a span of its own (throttling, backoff).
+
+Finished spans are handed to the exporters named in TELEMETRY_EXPORTERS:
+  log   one JSON object per span on stdout, which Cloud Logging ingests as a
+        structured entry correlated with the request's trace
+  otel  mirrored to OpenTelemetry through whatever tracer provider the
+        runtime configured (requires opentelemetry-api)
+Per-name statistics since the instance started are always kept in METRICS.
+Tests and benchmarks can swap the exporters for an InMemoryExporter.
+"""
+
+import contextlib
+import contextvars
+import datetime
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import config
+
+_current = contextvars.ContextVar("telemetry_span", default=None)
+_timings_lock = threading.Lock()
+
+
+class Span:
+    """One timed phase; use through span()."""
+
+    def __init__(self, name: str, parent=None, trace_id: str | None = None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.trace_id = trace_id or (parent.trace_id if parent else os.urandom(16).hex())
+        self.span_id = os.urandom(8).hex()
+        self.attributes = attributes
+        self.timings = {}
+        self.start_time = time.time()
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+        self.otel_span = None
+
+    def set(self, **attributes) -> None:
+        """Add or replace attributes of the span."""
+        self.attributes.update(attributes)
+
+    def add_time(self, key: str, ms: float) -> None:
+        """Count ms under key in this span's timings and those of its ancestors."""
+        with _timings_lock:
+            node = self
+            while node is not None:
+                node.timings[key] = node.timings.get(key, 0.0) + ms
+                node = node.parent
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the span started."""
+        return (time.perf_counter() - self.started) * 1000
+
+    def breakdown(self) -> dict:
+        """Milliseconds per phase within the span, rounded for responses."""
+        with _timings_lock:
+            return {f"{key}_ms": round(ms, 1) for key, ms in sorted(self.timings.items())}
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent.span_id if self.parent else None,
+            "start_time": datetime.datetime.fromtimestamp(
+                self.start_time, datetime.timezone.utc
+            ).isoformat(),
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "attributes": self.attributes,
+            "timings": {key: round(ms, 3) for key, ms in self.timings.items()},
+            "error": self.error,
+        }
+
+
+def _finish(finished: Span) -> None:
+    if finished.parent is not None:
+        finished.parent.add_time(finished.name, finished.duration_ms)
+    for exporter in get_exporters():
+        try:
+            exporter.on_end(finished)
+        except Exception as e:
+            logging.warning("Telemetry exporter %s failed: %s", type(exporter).__name__, e)
+
+
+@contextlib.contextmanager
+def span(name: str, trace_id: str | None = None, **attributes):
+    """
+    Time a phase as a child of the current span.
+
+    Args:
+        name: phase name, also the key its duration is added under in the
+            ancestors' timings
+        trace_id: trace to join (e.g. from the request's trace header);
+            root spans start a new trace otherwise
+        **attributes: recorded with the span
+
+    Yields:
+        The open Span
+    """
+    current = Span(name, _current.get(), trace_id, **attributes)
+    token = _current.set(current)
+    for exporter in get_exporters():
+        exporter.on_start(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        current.duration_ms = current.elapsed_ms()
+        _finish(current)
+
+
+def record(name: str, started: float, ended: float, **attributes) -> Span:
+    """Record a phase measured with perf_counter before tracing was set up."""
+    finished = Span(name, _current.get(), **attributes)
+    finished.start_time = time.time() - (time.perf_counter() - started)
+    finished.started = started
+    for exporter in get_exporters():
+        exporter.on_start(finished)
+    finished.duration_ms = (ended - started) * 1000
+    _finish(finished)
+    return finished
+
+
+def current_span():
+    """The span open in this thread, or None."""
+    return _current.get()
+
+
+def propagate(fn):
+    """Wrap fn so that, run in another thread, its spans nest under the current one."""
+    parent = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    return run
+
+
+def trace_id_from_header(value: str | None) -> str | None:
+    """Trace id from an X-Cloud-Trace-Context or traceparent header value."""
+    if not value:
+        return None
+    if value.startswith("00-"):
+        parts = value.split("-")
+        return parts[1] if len(parts) > 2 and len(parts[1]) == 32 else None
+    trace_id = value.split("/", 1)[0]
+    return trace_id if len(trace_id) == 32 else None
+
+
+# ---------------------------
+# EXPORTERS
+# ---------------------------
+class InMemoryExporter:
+    """Keeps finished spans in a list; a stand-in for real exporters in tests."""
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def named(self, name: str) -> list:
+        """Finished spans with the given name."""
+        with self._lock:
+            return [s for s in self.spans if s.name == name]
+
+
+class LogExporter:
+    """Writes every finished span as a single-line JSON structured log entry."""
+
+    def __init__(self, stream=None):
+        self._stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        entry = {
+            "severity": "ERROR" if span.error else "INFO",
+            "message": f"span {span.name} {span.duration_ms:.1f} ms",
+            "span": span.to_dict(),
+            "logging.googleapis.com/spanId": span.span_id,
+        }
+        project = os.environ.get("PROJECT_ID")
+        if project:
+            entry["logging.googleapis.com/trace"] = f"projects/{project}/traces/{span.trace_id}"
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+
+class OTelExporter:
+    """Mirrors spans to the OpenTelemetry tracer provider configured by the runtime."""
+
+    def __init__(self):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self._tracer = trace.get_tracer("cyngular.provisioner")
+
+    def on_start(self, span: Span) -> None:
+        parent = span.parent.otel_span if span.parent is not None else None
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        span.otel_span = self._tracer.start_span(
+            span.name,
+            context=context,
+            start_time=int(span.start_time * 1e9),
+        )
+
+    def on_end(self, span: Span) -> None:
+        otel_span = span.otel_span
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(key, value)
+        for key, ms in span.timings.items():
+            otel_span.set_attribute(f"timing.{key}_ms", ms)
+        if span.error:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int((span.start_time + span.duration_ms / 1000) * 1e9))
+
+
+class MetricsExporter:
+    """Per-span-name (and per-table) duration statistics since the instance started."""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        keys = [span.name]
+        if "table_id" in span.attributes:
+            keys.append(f"{span.name}:{span.attributes['table_id']}")
+        with self._lock:
+            for key in keys:
+                stats = self._stats.setdefault(
+                    key, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+                )
+                stats["count"] += 1
+                stats["errors"] += span.error is not None
+                stats["total_ms"] += span.duration_ms
+                stats["max_ms"] = max(stats["max_ms"], span.duration_ms)
+
+    def snapshot(self) -> dict:
+        """Statistics per span name, with mean durations, as JSON-ready data."""
+        with self._lock:
+            return {
+                "since": datetime.datetime.fromtimestamp(
+                    self.started, datetime.timezone.utc
+                ).isoformat(),
+                "spans": {
+                    key: {
+                        **{k: round(v, 1) if isinstance(v, float) else v for k, v in s.items()},
+                        "mean_ms": round(s["total_ms"] / s["count"], 1),
+                    }
+                    for key, s in sorted(self._stats.items())
+                },
+            }
+
+
+METRICS = MetricsExporter()
+
+_exporters = None
+_exporters_lock = threading.Lock()
+
+
+def _build_exporters(names: str) -> list:
+    exporters = [METRICS]
+    for name in filter(None, (n.strip() for n in names.split(","))):
+        if name == "log":
+            exporters.append(LogExporter())
+        elif name == "otel":
+            try:
+                exporters.append(OTelExporter())
+            except ImportError:
+                logging.warning("opentelemetry-api is not installed, otel exporter disabled")
+        else:
+            logging.warning("Unknown telemetry exporter: %s", name)
+    return exporters
+
+
+def get_exporters() -> list:
+    """Exporters named in TELEMETRY_EXPORTERS, built on first use."""
+    global _exporters
+    if _exporters is None:
+        with _exporters_lock:
+            if _exporters is None:
+                _exporters = _build_exporters(config.TELEMETRY_EXPORTERS)
+    return _exporters
+
+
+def set_exporters(exporters: list) -> None:
+    """Replace the exporters (METRICS is kept), e.g. with an InMemoryExporter."""
+    global _exporters
+    with _exporters_lock:
+        _exporters = [METRICS, *exporters]
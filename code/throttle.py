@@ -0,0 +1,157 @@
+"""
+Quota-aware throttling and retries for BigQuery admin calls.
+
+Every table and dataset call made by the provisioner goes through call(),
+which first takes a token from the bucket for the call's kind and scope and
+then retries retryable failures (rate limits, 5xx, dropped connections)
+with exponential backoff and full jitter. Buckets are sized to BigQuery's
+documented limits, scaled by THROTTLE_QUOTA_FRACTION to leave headroom for
+other callers, so a large batch settles at the highest rate the quotas
+sustain instead of failing on them. The client library's own retry is
+turned off for these calls so only one retry policy applies.
+
+Buckets live at module level and are shared by all threads of an instance;
+several instances provisioning the same project each get the full rate.
+"""
+
+import logging
+import random
+import threading
+import time
+
+import config
+import telemetry
+
+# kind -> (operations per second, burst). Limits are per project for
+# reads and table creation, per table for table updates and per dataset
+# for dataset updates.
+QUOTAS = {
+    "read": (100.0, 100),
+    "create": (10.0, 10),
+    "update": (0.5, 5),
+    "dataset": (0.5, 5),
+}
+
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 32.0
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for errors that may succeed on a later attempt (rate limits, 5xx, network)."""
+    from google.api_core import exceptions
+
+    if isinstance(
+        error,
+        (
+            exceptions.TooManyRequests,
+            exceptions.InternalServerError,
+            exceptions.BadGateway,
+            exceptions.ServiceUnavailable,
+            exceptions.GatewayTimeout,
+            ConnectionError,
+            TimeoutError,
+        ),
+    ):
+        return True
+    if isinstance(error, exceptions.Forbidden):
+        reasons = {e.get("reason") for e in getattr(error, "errors", None) or []}
+        return "rateLimitExceeded" in reasons
+    return False
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate tokens per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, returning how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            # A negative balance is a queue of reserved tokens; wait our turn.
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self) -> float:
+        """Block until a token is available; returns the seconds waited."""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(kind: str, scope: str) -> TokenBucket:
+    """Return the shared bucket for a kind of call on one project, table or dataset."""
+    key = (kind, scope)
+    bucket = _buckets.get(key)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(key)
+            if bucket is None:
+                rate, burst = QUOTAS[kind]
+                fraction = min(1.0, max(0.01, config.THROTTLE_QUOTA_FRACTION))
+                bucket = TokenBucket(rate * fraction, max(1.0, burst * fraction))
+                _buckets[key] = bucket
+    return bucket
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number attempt (1-based)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+def call(kind: str, scope: str, fn, *args, **kwargs):
+    """
+    Run a BigQuery admin call under its quota, retrying retryable failures.
+
+    Args:
+        kind: one of QUOTAS
+        scope: what the quota applies to (project, table or dataset reference)
+        fn: the client method; called with retry=None plus args and kwargs
+
+    Returns:
+        Whatever fn returns
+
+    Raises:
+        The last error once THROTTLE_MAX_ATTEMPTS attempts have failed, or
+        the first error that is not retryable
+    """
+    bucket = get_bucket(kind, scope)
+    max_attempts = max(1, config.THROTTLE_MAX_ATTEMPTS)
+    name = "bigquery." + fn.__name__.lstrip("_")
+    with telemetry.span(name, kind=kind, scope=scope) as span:
+        attempt = 0
+        while True:
+            attempt += 1
+            span.set(attempts=attempt)
+            waited = bucket.acquire()
+            if waited:
+                span.add_time("throttle_wait", waited * 1000)
+            try:
+                return fn(*args, retry=None, **kwargs)
+            except Exception as e:
+                if attempt >= max_attempts or not is_retryable(e):
+                    raise
+                delay = backoff_delay(attempt)
+                logging.warning(
+                    "%s call on %s failed (%s), retry %d/%d in %.1f s",
+                    kind,
+                    scope,
+                    e,
+                    attempt,
+                    max_attempts - 1,
+                    delay,
+                )
+                span.add_time("retry_backoff", delay * 1000)
+                time.sleep(delay)
@@ -0,0 +1,389 @@
+"""
+Columnar validation and coercion of ingested rows.
+
+A Validator is compiled once per table from its TABLE_CONFIGS entry and turns
+a batch of parsed JSON objects into a typed Arrow record batch. Each declared
+column is converted as a whole: values are gathered into one list and handed
+to Arrow, with numeric strings, epoch seconds and ISO 8601 strings cast to the
+declared type by Arrow compute kernels. Only the values a kernel could not
+convert are retried one at a time in Python, which is also where rejected
+rows get their reason. A column mixing Python types (say epoch numbers and
+ISO strings) is converted one same-typed group at a time.
+
+Rows that fail are dropped from the batch and reported separately, keyed by
+their position in the input, together with the reason for the first failure.
+"""
+
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+_ARROW_TYPES = {
+    "STRING": pa.string(),
+    "INT64": pa.int64(),
+    "INTEGER": pa.int64(),
+    "FLOAT64": pa.float64(),
+    "FLOAT": pa.float64(),
+    "BOOL": pa.bool_(),
+    "BOOLEAN": pa.bool_(),
+    "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+}
+
+# Python ints beyond 64 bits make Arrow's inference raise OverflowError.
+_CAST_ERRORS = (
+    pa.ArrowInvalid,
+    pa.ArrowTypeError,
+    pa.ArrowNotImplementedError,
+    OverflowError,
+)
+
+_INT64_MIN, _INT64_MAX = -(2**63), 2**63 - 1
+
+# String shapes handed to Arrow's cast kernels; other strings are left to the
+# per-value path.
+_INTEGER_PATTERN = r"^[+-]?\d+$"
+_NUMBER_PATTERN = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"
+_ISO_PATTERN = r"^\d{4}-\d{2}-\d{2}([T ]\d{2}(:\d{2}(:\d{2}(\.\d+)?)?)?)?"
+_ZONE_PATTERN = r"(Z|[+-]\d{2}(:?\d{2})?)$"
+
+
+def arrow_type(field) -> pa.DataType:
+    """Map a config Field to the Arrow type the Storage Write API expects."""
+    if field.field_type in ("RECORD", "STRUCT"):
+        value_type = pa.struct(
+            [pa.field(f.name, arrow_type(f)) for f in field.fields]
+        )
+    else:
+        value_type = _ARROW_TYPES[field.field_type]
+    return pa.list_(value_type) if field.mode == "REPEATED" else value_type
+
+
+def arrow_schema(fields) -> pa.Schema:
+    """Build the Arrow schema for a table's declared fields."""
+    return pa.schema([pa.field(f.name, arrow_type(f)) for f in fields])
+
+
+# ---------------------------
+# SCALAR COLUMNS
+# ---------------------------
+def _where(mask: pa.Array, values: pa.Array) -> pa.Array:
+    return pc.if_else(mask, values, pa.scalar(None, values.type))
+
+
+def _is_number(array: pa.Array) -> bool:
+    return pa.types.is_integer(array.type) or pa.types.is_floating(array.type)
+
+
+def _epoch_to_timestamp(seconds: pa.Array) -> pa.Array:
+    micros = pc.round(pc.multiply(pc.cast(seconds, pa.float64()), 1_000_000))
+    return pc.cast(pc.cast(micros, pa.int64()), _ARROW_TYPES["TIMESTAMP"])
+
+
+# Each cast takes the array Arrow inferred for a column and returns it in the
+# declared type, with NULL wherever a value could not be converted.
+def _cast_string(inferred: pa.Array) -> pa.Array:
+    if _is_number(inferred):
+        return pc.cast(inferred, pa.string())
+    return pa.nulls(len(inferred), pa.string())
+
+
+def _cast_number(target: pa.DataType):
+    def cast(inferred: pa.Array) -> pa.Array:
+        if pa.types.is_string(inferred.type):
+            pattern = _INTEGER_PATTERN if pa.types.is_integer(target) else _NUMBER_PATTERN
+            return pc.cast(_where(pc.match_substring_regex(inferred, pattern), inferred), target)
+        if pa.types.is_floating(inferred.type) and pa.types.is_integer(target):
+            whole = pc.equal(pc.floor(inferred), inferred)
+            return pc.cast(_where(whole, inferred), target)
+        if _is_number(inferred):
+            return pc.cast(inferred, target)
+        return pa.nulls(len(inferred), target)
+
+    return cast
+
+
+def _cast_boolean(inferred: pa.Array) -> pa.Array:
+    return pa.nulls(len(inferred), pa.bool_())
+
+
+def _cast_timestamp(inferred: pa.Array) -> pa.Array:
+    target = _ARROW_TYPES["TIMESTAMP"]
+    if _is_number(inferred):
+        return _epoch_to_timestamp(inferred)
+    if not pa.types.is_string(inferred.type):
+        return pa.nulls(len(inferred), target)
+    # Arrow parses at most microseconds; Windows writes 100ns fractions.
+    text = pc.replace_substring_regex(inferred, r"(\.\d{6})\d+", r"\1")
+    zoned = pc.match_substring_regex(text, _ISO_PATTERN + _ZONE_PATTERN)
+    naive = pc.match_substring_regex(text, _ISO_PATTERN + "$")
+    epoch = pc.match_substring_regex(text, _NUMBER_PATTERN)
+    return pc.coalesce(
+        pc.cast(_where(zoned, text), target),
+        # Offset-less ISO strings are taken to be UTC.
+        pc.cast(pc.cast(_where(naive, text), pa.timestamp("us")), target),
+        _epoch_to_timestamp(pc.cast(_where(epoch, text), pa.float64())),
+    )
+
+
+_CASTS = {
+    "STRING": _cast_string,
+    "INT64": _cast_number(pa.int64()),
+    "INTEGER": _cast_number(pa.int64()),
+    "FLOAT64": _cast_number(pa.float64()),
+    "FLOAT": _cast_number(pa.float64()),
+    "BOOL": _cast_boolean,
+    "BOOLEAN": _cast_boolean,
+    "TIMESTAMP": _cast_timestamp,
+}
+
+
+def _coerce_timestamp(value) -> datetime:
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    raise ValueError(f"expected timestamp, got {type(value).__name__}")
+
+
+def _coerce_scalar(value, field_type: str):
+    if field_type == "STRING":
+        if isinstance(value, (dict, list, bool)):
+            raise ValueError(f"expected string, got {type(value).__name__}")
+        return value if isinstance(value, str) else str(value)
+    if field_type in ("INT64", "INTEGER"):
+        if isinstance(value, (bool, dict, list)) or (
+            isinstance(value, float) and not value.is_integer()
+        ):
+            raise ValueError(f"expected integer, got {value!r}")
+        number = int(value)
+        if not _INT64_MIN <= number <= _INT64_MAX:
+            raise ValueError(f"integer out of INT64 range: {value!r}")
+        return number
+    if field_type in ("FLOAT64", "FLOAT"):
+        if isinstance(value, (bool, dict, list)):
+            raise ValueError(f"expected float, got {value!r}")
+        return float(value)
+    if field_type in ("BOOL", "BOOLEAN"):
+        if isinstance(value, bool):
+            return value
+        if str(value).lower() in ("true", "false"):
+            return str(value).lower() == "true"
+        raise ValueError(f"expected boolean, got {value!r}")
+    if field_type == "TIMESTAMP":
+        return _coerce_timestamp(value)
+    raise ValueError(f"unsupported type {field_type}")
+
+
+def _retry_values(field, values: list, indices, converted: pa.Array, path: str):
+    """Convert values[indices] one at a time and patch them into converted."""
+    errors, fixed, patched = {}, [], []
+    for i in indices:
+        value = values[i]
+        if value is None:
+            continue
+        try:
+            patched.append(_coerce_scalar(value, field.field_type))
+            fixed.append(i)
+        except (TypeError, ValueError, OverflowError, OSError) as e:
+            errors[i] = f"{path}: {e}"
+    if fixed:
+        mask = [False] * len(values)
+        for i in fixed:
+            mask[i] = True
+        converted = pc.replace_with_mask(
+            converted, pa.array(mask, type=pa.bool_()), pa.array(patched, type=converted.type)
+        )
+    return converted, errors
+
+
+def _convert_mixed(field, values: list, path: str):
+    """Convert a column mixing Python types one same-typed group at a time."""
+    target = _ARROW_TYPES[field.field_type]
+    groups = {}
+    for i, value in enumerate(values):
+        if value is not None:
+            groups.setdefault(type(value), []).append(i)
+    if len(groups) <= 1:
+        return _retry_values(
+            field, values, range(len(values)), pa.nulls(len(values), target), path
+        )
+
+    # Arrays are concatenated group after group, followed by a single NULL
+    # that missing values point at, and put back in row order with take().
+    present = sum(len(indices) for indices in groups.values())
+    parts, errors, positions, offset = [], {}, [present] * len(values), 0
+    for indices in groups.values():
+        part, part_errors = _convert_scalar(field, [values[i] for i in indices], path)
+        parts.append(part)
+        for j, reason in part_errors.items():
+            errors[indices[j]] = reason
+        for j, i in enumerate(indices, start=offset):
+            positions[i] = j
+        offset += len(indices)
+    parts.append(pa.nulls(1, target))
+    return pc.take(pa.concat_arrays(parts), pa.array(positions, type=pa.int64())), errors
+
+
+def _convert_scalar(field, values: list, path: str):
+    target = _ARROW_TYPES[field.field_type]
+    try:
+        inferred = pa.array(values)
+        if inferred.type == target:
+            return inferred, {}
+        if pa.types.is_null(inferred.type):
+            return pa.nulls(len(values), target), {}
+        converted = _CASTS[field.field_type](inferred)
+    except _CAST_ERRORS:
+        return _convert_mixed(field, values, path)
+
+    # Values the cast left NULL get a second chance in Python, which accepts a
+    # few more spellings and produces the rejection reason for the rest.
+    leftover = pc.and_(pc.is_valid(inferred), pc.is_null(converted))
+    if not pc.any(leftover).as_py():
+        return converted, {}
+    indices = pc.indices_nonzero(leftover).to_pylist()
+    return _retry_values(field, values, indices, converted, path)
+
+
+# ---------------------------
+# NESTED COLUMNS
+# ---------------------------
+def _convert_record(field, values: list, path: str):
+    errors, missing = {}, []
+    known = {f.name for f in field.fields}
+    for i, value in enumerate(values):
+        if value is None:
+            missing.append(True)
+        elif not isinstance(value, dict):
+            errors[i] = f"{path}: expected object"
+            missing.append(True)
+        else:
+            missing.append(False)
+            if not known.issuperset(value):
+                unknown = ", ".join(f"{path}.{n}" for n in value if n not in known)
+                errors[i] = f"unknown field(s): {unknown}"
+
+    children = []
+    for child in field.fields:
+        child_values = [
+            value.get(child.name) if isinstance(value, dict) else None
+            for value in values
+        ]
+        array, child_errors = _convert(child, child_values, f"{path}.{child.name}")
+        children.append(array)
+        for i, reason in child_errors.items():
+            errors.setdefault(i, reason)
+    array = pa.StructArray.from_arrays(
+        children,
+        fields=[pa.field(f.name, arrow_type(f)) for f in field.fields],
+        mask=pa.array(missing, type=pa.bool_()),
+    )
+    return array, errors
+
+
+def _convert_single(field, values: list, path: str):
+    if field.field_type in ("RECORD", "STRUCT"):
+        return _convert_record(field, values, path)
+    return _convert_scalar(field, values, path)
+
+
+def _convert_repeated(field, values: list, path: str):
+    errors, offsets, flat, owners = {}, [0], [], []
+    for i, value in enumerate(values):
+        if isinstance(value, list):
+            flat.extend(value)
+            owners.extend([i] * len(value))
+        elif value is not None:
+            errors[i] = f"{path}: expected array"
+        offsets.append(len(flat))
+    items, item_errors = _convert_single(field, flat, f"{path}[]")
+    for j, reason in item_errors.items():
+        errors.setdefault(owners[j], reason)
+    # Missing arrays are written as empty ones; REPEATED columns are never NULL.
+    array = pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), items)
+    return array, errors
+
+
+def _convert(field, values: list, path: str):
+    if field.mode == "REPEATED":
+        return _convert_repeated(field, values, path)
+    return _convert_single(field, values, path)
+
+
+# ---------------------------
+# VALIDATOR
+# ---------------------------
+class Validator:
+    """
+    Converts batches of JSON objects into Arrow record batches for one table.
+
+    combine_columns in the table config names source keys that are joined,
+    space separated and skipping nulls, into a declared STRING column (e.g.
+    auditd's a0..a3 into args). Source keys are accepted on input and not
+    written.
+    """
+
+    def __init__(self, table_config: dict):
+        self.table_id = table_config["table_id"]
+        self.fields = list(table_config["schema"])
+        self.schema = arrow_schema(self.fields)
+        self.combine_columns = {
+            target: list(sources)
+            for target, sources in table_config.get("combine_columns", {}).items()
+        }
+        self._known = {f.name for f in self.fields}.union(
+            *self.combine_columns.values()
+        )
+
+    def convert(self, rows: list) -> tuple:
+        """
+        Convert parsed rows into a record batch.
+
+        Args:
+            rows: JSON objects, one per row
+
+        Returns:
+            (record batch of the accepted rows in input order,
+             dict of input index -> rejection reason)
+        """
+        rejected = {}
+        keys = set().union(*rows) if rows else set()
+        if not self._known.issuperset(keys):
+            for i, row in enumerate(rows):
+                if not self._known.issuperset(row):
+                    unknown = ", ".join(n for n in row if n not in self._known)
+                    rejected[i] = f"unknown field(s): {unknown}"
+
+        columns = []
+        for field in self.fields:
+            values = [row.get(field.name) for row in rows]
+            array, errors = _convert(field, values, field.name)
+            if field.name in self.combine_columns:
+                array = self._combine(field, array, rows, rejected)
+            columns.append(array)
+            for i, reason in errors.items():
+                rejected.setdefault(i, reason)
+
+        batch = pa.RecordBatch.from_arrays(columns, schema=self.schema)
+        if rejected:
+            keep = [i not in rejected for i in range(len(rows))]
+            batch = batch.filter(pa.array(keep, type=pa.bool_()))
+        return batch, rejected
+
+    def _combine(self, field, declared: pa.Array, rows: list, rejected: dict) -> pa.Array:
+        """Fill rows without a value for field from its combine_columns sources."""
+        joined = pa.nulls(len(rows), pa.string())
+        for source in self.combine_columns[field.name]:
+            values = [row.get(source) for row in rows]
+            part, errors = _convert_scalar(field, values, source)
+            for i, reason in errors.items():
+                rejected.setdefault(i, reason)
+            both = pc.binary_join_element_wise(joined, part, " ")
+            joined = pc.coalesce(both, joined, part)
+        return pc.coalesce(declared, joined)
+
@@ -22,6 +22,7 @@ locals {
 
   enabled_apis = [
     "bigquery.googleapis.com",
+    "bigquerystorage.googleapis.com",
     "cloudbuild.googleapis.com",
     "cloudasset.googleapis.com",
     "admin.googleapis.com",
@@ -26,6 +26,8 @@ module "cyngular_func" {
 
   cyngular_project_id = local.cyngular_project_id
 
+  retention = var.retention
+
   depends_on = [
     google_project_service.project,
   ]
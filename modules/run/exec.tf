@@ -20,8 +20,12 @@ resource "terraform_data" "wait_for_build_sa_permissions" {
 }
 
 resource "terraform_data" "call_cloud_function" {
+  # re-run when the function's settings (e.g. retention tiers) change so live tables are updated;
+  # recluster also migrates existing tables to the configured clustering (non-destructive)
+  triggers_replace = [local.cloud_function.env_vars]
+
   provisioner "local-exec" {
-    command = "sleep 60 && curl -H \"Authorization: Bearer $(gcloud auth print-identity-token)\" ${module.cloud_function.function_uri}"
+    command = "sleep 60 && curl -H \"Authorization: Bearer $(gcloud auth print-identity-token)\" \"${module.cloud_function.function_uri}?recluster=true\""
   }
 
   depends_on = [
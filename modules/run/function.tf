@@ -21,9 +21,14 @@ module "cloud_function" {
     generation = null
   }
   service_config = {
-    max_instance_count    = 1
-    service_account_email = module.cloud_function_sa.email
-    runtime_env_variables = local.cloud_function.env_vars
+    max_instance_count = 1
+    # One instance serves concurrent callers; identical requests share a
+    # single provisioning pass. More than one request per instance needs a
+    # whole vCPU.
+    max_instance_request_concurrency = local.cloud_function.request_concurrency
+    available_cpu                    = "1"
+    service_account_email            = module.cloud_function_sa.email
+    runtime_env_variables            = local.cloud_function.env_vars
   }
 
   depends_on = [
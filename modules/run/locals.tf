@@ -2,10 +2,15 @@ locals {
   cloud_function = {
     name = "cyngular-function"
 
+    request_concurrency = 8
+
     env_vars = {
       "LOCATION"   = var.bq_dataset_location
       "PROJECT_ID" = var.bq_dataset_project_id
       "DATASET_ID" = var.bq_dataset_name
+
+      "RETENTION_TIERS"     = jsonencode(var.retention.tiers)
+      "RETENTION_OVERRIDES" = jsonencode(var.retention.table_tiers)
     }
 
     project_permissions = [
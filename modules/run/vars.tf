@@ -34,3 +34,12 @@ variable "bq_dataset_project_id" {
   type        = string
   description = "The project ID for the BigQuery dataset"
 }
+
+# -----
+variable "retention" {
+  type = object({
+    tiers       = map(number)
+    table_tiers = map(string)
+  })
+  description = "Retention tier lengths (days) and per-table tier overrides"
+}
@@ -0,0 +1,156 @@
+#!/usr/bin/env -S uv run --quiet --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "functions-framework==3.*",
+#     "google-cloud-bigquery==3.*",
+# ]
+# ///
+"""
+Cloud Function Cold Start Benchmark
+
+Measures how long the Cloud Function source in code/ takes to import, using
+`python -X importtime` in fresh interpreters, and how long it takes to build
+the bigquery.SchemaField objects for the table catalog on demand.
+
+The Functions Framework is already loaded by the runtime before it imports
+main.py, so import_main_ms is measured with functions_framework preloaded and
+covers only what main.py itself pulls in.
+
+Usage:
+    # Default: 5 fresh interpreters per measurement
+    uv run scripts/bench_cold_start.py
+
+    # More repetitions, machine-readable output
+    uv run scripts/bench_cold_start.py --runs 20 --output-json
+
+    # Fail (exit 1) if importing main.py exceeds the startup budget, e.g. in CI
+    uv run scripts/bench_cold_start.py --budget-ms 100
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+CODE_DIR = Path(__file__).resolve().parent.parent / "code"
+
+# Dummy values; nothing here talks to GCP
+FUNCTION_ENV = {
+    "PROJECT_ID": "bench-project",
+    "DATASET_ID": "bench_dataset",
+    "LOCATION": "US",
+}
+
+BUILD_SCHEMAS = """
+import time
+import config
+from google.cloud import bigquery
+from schema import build_schema
+started = time.perf_counter()
+for table_config in config.TABLE_CONFIGS:
+    build_schema(table_config["schema"])
+print((time.perf_counter() - started) * 1e6)
+"""
+
+
+def _run(code: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    """Run a snippet in a fresh interpreter with the function source on sys.path."""
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", code]
+    return subprocess.run(
+        command,
+        cwd=CODE_DIR,
+        env={**os.environ, **FUNCTION_ENV, "PYTHONDONTWRITEBYTECODE": "1"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_time_us(module: str, preload: str | None = None) -> int:
+    """
+    Import a module in a fresh interpreter and return its cumulative import
+    time in microseconds, as reported by -X importtime.
+
+    Args:
+        module: Module to measure
+        preload: Module imported first, whose cost is excluded
+    """
+    code = f"import {module}"
+    if preload is not None:
+        code = f"import {preload}; {code}"
+    stderr = _run(code, importtime=True).stderr
+    for line in reversed(stderr.splitlines()):
+        # Format: "import time: <self us> | <cumulative us> | <indented name>"
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2][1:] == module:
+            return int(parts[1])
+    raise RuntimeError(f"No importtime entry found for {module}")
+
+
+def schema_build_time_us() -> float:
+    """
+    Return the time to build SchemaField lists for every table, in
+    microseconds, excluding the google.cloud.bigquery import itself.
+    """
+    return float(_run(BUILD_SCHEMAS).stdout.strip())
+
+
+def measure(runs: int) -> dict:
+    """Collect the median of each measurement over several fresh interpreters."""
+    samples = {
+        "import_config_ms": [import_time_us("config") / 1000 for _ in range(runs)],
+        "import_main_ms": [
+            import_time_us("main", preload="functions_framework") / 1000
+            for _ in range(runs)
+        ],
+        "build_all_schemas_ms": [schema_build_time_us() / 1000 for _ in range(runs)],
+    }
+    return {name: round(statistics.median(values), 2) for name, values in samples.items()}
+
+
+def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="Fresh interpreters per measurement"
+    )
+    parser.add_argument(
+        "--output-json", action="store_true", help="Output results as JSON"
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        help="Exit with status 1 if import_main_ms exceeds this budget",
+    )
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+
+    if args.output_json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"Cold start (median of {args.runs} runs)")
+        for name, value in results.items():
+            print(f"  {name:<24} {value:>10.2f}")
+
+    if args.budget_ms is not None and results["import_main_ms"] > args.budget_ms:
+        print(
+            f"import_main_ms {results['import_main_ms']:.2f} exceeds budget "
+            f"{args.budget_ms:.2f}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env -S uv run --quiet --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "google-cloud-logging>=3.11.4",
+#     "google-cloud-bigquery>=3.26.0",
+#     "google-cloud-resource-manager>=1.13.1",
+# ]
+# ///
+"""
+Offline Log Sink Discovery Benchmark
+
+Runs GCPResourceDiscovery.search_cloudaudit_sinks from scripts/utils.py
+against the fake logging and BigQuery clients in scripts/fake_discovery.py
+and scripts/fake_bigquery.py, for organizations with several numbers of
+CloudAudit sinks, and compares it with enriching every sink serially (one
+get_dataset call per sink, as before datasets were fetched in parallel).
+
+Sinks are spread over --datasets-per-sink * sinks distinct datasets, so
+with the default 0.5 every dataset is the destination of two sinks.
+
+It also walks a fake resource hierarchy with iter_hierarchy_log_sinks:
+--orgs organizations, each with --fanout folders per level down to --depth
+levels, --projects-per-folder projects in every organization and folder,
+and one CloudAudit sink on every organization and folder and one
+Cloud Logging sink on every project. With one worker the walk is serial.
+
+Usage:
+    # Default: 10, 50 and 200 sinks and a 2-org hierarchy; 1, 8 and 32 workers
+    uv run scripts/bench_discovery.py
+
+    # Only the hierarchy walk, a larger enterprise
+    uv run scripts/bench_discovery.py --modes traverse --orgs 3 --fanout 5 --depth 3
+
+    # Higher latency, machine-readable output
+    uv run scripts/bench_discovery.py --sinks 50 --latency-ms 300 --output-json
+"""
+
+import argparse
+import json
+import time
+
+from fake_bigquery import FakeBigQueryClient
+from fake_discovery import (
+    FakeConfigServiceClient,
+    FakeFoldersClient,
+    FakeOrganizationsClient,
+    FakeProjectsClient,
+    audit_sink,
+)
+from google.cloud.logging_v2.types import LogSink
+from utils import GCPResourceDiscovery
+
+MODES = ("enrich", "traverse")
+ORG_ID = "123456789012"
+
+
+def build_clients(sinks: int, datasets_per_sink: float, args) -> tuple:
+    """Fake clients for an organization with sinks CloudAudit sinks."""
+    datasets = max(1, round(sinks * datasets_per_sink))
+    parent = f"organizations/{ORG_ID}"
+    logging_client = FakeConfigServiceClient(
+        {
+            parent: [
+                audit_sink(parent, f"audit-sink-{i:04d}", "audit-project", f"audit_{i % datasets:04d}")
+                for i in range(sinks)
+            ]
+        },
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        seed=args.seed,
+    )
+    bq_client = FakeBigQueryClient(
+        project="audit-project",
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        seed=args.seed,
+    )
+    bq_client.datasets = {f"audit_{i:04d}": {"location": "US"} for i in range(datasets)}
+    return logging_client, bq_client
+
+
+def serial_search(discovery: GCPResourceDiscovery) -> list:
+    """search_cloudaudit_sinks as it was: one get_dataset per sink, in turn."""
+    sinks = []
+    for sink in discovery.get_org_log_sinks(ORG_ID):
+        info = discovery.get_bq_dataset_info(sink["bq_project_id"], sink["bq_dataset_id"])
+        if info:
+            sink["bq_dataset_info"] = info
+        sinks.append(sink)
+    return sinks
+
+
+def dataset_for(parent: str) -> str:
+    """The dataset the CloudAudit sink of a fake org or folder exports to."""
+    return "audit_" + parent.replace("/", "_").replace("-", "_")
+
+
+def build_hierarchy(args) -> tuple:
+    """Children per parent and sinks per parent of a fake enterprise."""
+    children, sinks = {}, {}
+    queue = [(f"organizations/{100000000000 + i}", 0) for i in range(args.orgs)]
+    while queue:
+        parent, level = queue.pop()
+        slug = parent.replace("/", "-")
+        sinks[parent] = [audit_sink(parent, f"{slug}-audit", "audit-project", dataset_for(parent))]
+        folders = [f"folders/{slug}-{i}" for i in range(args.fanout)] if level < args.depth else []
+        projects = [f"projects/{slug}-p{i}" for i in range(args.projects_per_folder)]
+        children[parent] = folders + projects
+        queue.extend((folder, level + 1) for folder in folders)
+        for project in projects:
+            sinks[project] = [
+                LogSink(
+                    name="_Default",
+                    destination=f"logging.googleapis.com/{project}/locations/global/buckets/_Default",
+                )
+            ]
+    return children, sinks
+
+
+def run_traverse(workers: int, args) -> dict:
+    """Walk the fake hierarchy once with workers concurrent calls."""
+    children, sinks = build_hierarchy(args)
+    fake = {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "seed": args.seed}
+    logging_client = FakeConfigServiceClient(sinks, **fake)
+    folders_client = FakeFoldersClient(children, **fake)
+    projects_client = FakeProjectsClient(children, **fake)
+    bq_client = FakeBigQueryClient(project="audit-project", **fake)
+    bq_client.datasets = {dataset_for(parent): {"location": "US"} for parent in children}
+    discovery = GCPResourceDiscovery(
+        max_workers=workers,
+        logging_client=logging_client,
+        bq_client=bq_client,
+        org_client=FakeOrganizationsClient(),
+        folders_client=folders_client,
+        projects_client=projects_client,
+    )
+    org_ids = [parent.split("/")[1] for parent in children if parent.startswith("organizations/")]
+
+    started = time.perf_counter()
+    first = None
+    found = 0
+    for _ in discovery.iter_hierarchy_log_sinks(org_ids, cloudaudit_only=True):
+        if first is None:
+            first = time.perf_counter() - started
+        found += 1
+    seconds = time.perf_counter() - started
+
+    return {
+        "mode": "traverse",
+        "parents": len(sinks),
+        "workers": workers,
+        "seconds": round(seconds, 3),
+        "first_sink_seconds": round(first or 0.0, 3),
+        "cloudaudit_sinks": found,
+        "api_calls": sum(
+            sum(c.calls.values())
+            for c in (logging_client, folders_client, projects_client, bq_client)
+        ),
+        "max_in_flight": max(
+            c.max_in_flight for c in (logging_client, folders_client, projects_client, bq_client)
+        ),
+    }
+
+
+def run(sinks: int, workers: int | None, args) -> dict:
+    """Search the fake organization once; workers=None runs the serial baseline."""
+    logging_client, bq_client = build_clients(sinks, args.datasets_per_sink, args)
+    discovery = GCPResourceDiscovery(
+        max_workers=workers or 1,
+        logging_client=logging_client,
+        bq_client=bq_client,
+        org_client=FakeOrganizationsClient(),
+        folders_client=FakeFoldersClient(),
+        projects_client=FakeProjectsClient(),
+    )
+
+    started = time.perf_counter()
+    if workers is None:
+        found = serial_search(discovery)
+    else:
+        found = discovery.search_cloudaudit_sinks(ORG_ID)
+    seconds = time.perf_counter() - started
+
+    return {
+        "sinks": sinks,
+        "mode": "serial" if workers is None else "parallel",
+        "workers": workers or 1,
+        "seconds": round(seconds, 3),
+        "enriched": sum("bq_dataset_info" in s for s in found),
+        "get_dataset_calls": bq_client.calls["get_dataset"],
+        "max_in_flight": bq_client.max_in_flight,
+    }
+
+
+def print_report(results: list) -> None:
+    """Print results as fixed-width tables, with the speedup over serial."""
+    enrich = [r for r in results if r["mode"] != "traverse"]
+    traverse = [r for r in results if r["mode"] == "traverse"]
+    if enrich:
+        print_enrich_report(enrich)
+    if enrich and traverse:
+        print()
+    if traverse:
+        print(
+            f"{'parents':>7} {'workers':>7} {'seconds':>8} {'speedup':>8} "
+            f"{'first s':>8} {'audit sinks':>11} {'calls':>6}"
+        )
+        baseline = traverse[0]["seconds"]
+        for r in traverse:
+            print(
+                f"{r['parents']:>7} {r['workers']:>7} {r['seconds']:>8.3f} "
+                f"{baseline / max(r['seconds'], 1e-9):>7.1f}x {r['first_sink_seconds']:>8.3f} "
+                f"{r['cloudaudit_sinks']:>11} {r['api_calls']:>6}"
+            )
+
+
+def print_enrich_report(results: list) -> None:
+    """Print search_cloudaudit_sinks results, with the speedup over serial."""
+    print(
+        f"{'sinks':>6} {'mode':<8} {'workers':>7} {'seconds':>8} {'speedup':>8} "
+        f"{'enriched':>8} {'get_dataset':>11}"
+    )
+    baseline = {}
+    for r in results:
+        if r["mode"] == "serial":
+            baseline[r["sinks"]] = r["seconds"]
+        speedup = baseline.get(r["sinks"], r["seconds"]) / max(r["seconds"], 1e-9)
+        print(
+            f"{r['sinks']:>6} {r['mode']:<8} {r['workers']:>7} {r['seconds']:>8.3f} "
+            f"{speedup:>7.1f}x {r['enriched']:>8} {r['get_dataset_calls']:>11}"
+        )
+
+
+def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument(
+        "--sinks", type=int, nargs="+", default=[10, 50, 200], help="CloudAudit sinks in the org"
+    )
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 8, 32], help="max_workers values"
+    )
+    parser.add_argument(
+        "--datasets-per-sink",
+        type=float,
+        default=0.5,
+        help="Distinct destination datasets, as a share of sinks",
+    )
+    parser.add_argument("--orgs", type=int, default=2, help="Organizations to walk")
+    parser.add_argument("--fanout", type=int, default=4, help="Folders per org or folder")
+    parser.add_argument("--depth", type=int, default=2, help="Levels of folders")
+    parser.add_argument(
+        "--projects-per-folder", type=int, default=5, help="Projects per org or folder"
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=100.0, help="Simulated latency of every call"
+    )
+    parser.add_argument(
+        "--jitter-ms", type=float, default=50.0, help="Uniform extra latency, up to this"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for jitter")
+    parser.add_argument(
+        "--output-json", action="store_true", help="Output results as JSON"
+    )
+    args = parser.parse_args()
+
+    results = []
+    if "enrich" in args.modes:
+        for sinks in args.sinks:
+            results.append(run(sinks, None, args))
+            for workers in args.workers:
+                results.append(run(sinks, workers, args))
+    if "traverse" in args.modes:
+        for workers in args.workers:
+            results.append(run_traverse(workers, args))
+
+    if args.output_json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()
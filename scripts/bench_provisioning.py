@@ -0,0 +1,225 @@
+#!/usr/bin/env -S uv run --quiet --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "google-cloud-bigquery==3.*",
+#     "pyarrow>=17",
+# ]
+# ///
+"""
+Offline Provisioning Throughput Benchmark
+
+Runs the provisioner in code/provisioner.py (provision_tables, with its throttle,
+retries and bulk metadata fetch) against FakeBigQueryClient from
+scripts/fake_bigquery.py, for datasets of several sizes and thread pool
+sizes, so performance changes to the provisioner can be checked without GCP.
+
+Datasets larger than the catalog in code/config.py repeat its tables under
+suffixed IDs. Scenarios:
+    create   empty dataset, every table is created
+    noop     every table exists and carries its config hash label
+    patch    every table exists without its last column and hash label
+
+--time-scale shrinks the fake's latency and quota windows and the
+provisioner's throttle rates and backoff alike, so a run takes time_scale
+of what it would against BigQuery; simulated_seconds scales it back.
+
+Usage:
+    # Default: 18, 200 and 2000 tables; 1, 8 and 32 workers; all scenarios
+    uv run scripts/bench_provisioning.py
+
+    # Injected faults, machine-readable output
+    uv run scripts/bench_provisioning.py --tables 200 --workers 8 \\
+        --error-rate 0.02 --rate-limit-rate 0.02 --conflict-rate 0.05 --output-json
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "code"))
+
+# Dummy values; nothing here talks to GCP
+os.environ.setdefault("PROJECT_ID", "bench-project")
+os.environ.setdefault("DATASET_ID", "bench_dataset")
+os.environ.setdefault("LOCATION", "US")
+os.environ.setdefault("TELEMETRY_EXPORTERS", "")
+
+import config  # noqa: E402
+import provisioner  # noqa: E402
+import throttle  # noqa: E402
+from fake_bigquery import FakeBigQueryClient  # noqa: E402
+
+SCENARIOS = ("create", "noop", "patch")
+DATASET_ID = "bench_dataset"
+
+
+def table_configs(count: int) -> list:
+    """count table configs, repeating the catalog under suffixed IDs if needed."""
+    catalog = config.TABLE_CONFIGS
+    if count <= len(catalog):
+        return catalog[:count]
+    return [
+        {**catalog[i % len(catalog)], "table_id": f"{catalog[i % len(catalog)]['table_id']}_{i:05d}"}
+        for i in range(count)
+    ]
+
+
+def scale_throttle(time_scale: float) -> None:
+    """Speed the provisioner's quotas and backoff up by 1 / time_scale."""
+    throttle.QUOTAS = {
+        kind: (rate / time_scale, burst) for kind, (rate, burst) in throttle.QUOTAS.items()
+    }
+    throttle.BACKOFF_BASE *= time_scale
+    throttle.BACKOFF_MAX *= time_scale
+
+
+def seed_catalog(configs: list, scenario: str) -> dict:
+    """Table resources a scenario starts from, built by provisioning them once."""
+    if scenario == "create":
+        return {}
+    client = FakeBigQueryClient(project=f"seed-{len(configs)}-{scenario}")
+    with client.faults_disabled():
+        provisioner.provision_tables(client, DATASET_ID, configs, max_workers=32, use_cache=False)
+    if scenario == "patch":
+        for resource in client.tables.values():
+            resource["schema"]["fields"].pop()
+            resource.get("labels", {}).pop(provisioner.HASH_LABEL, None)
+    return client.tables
+
+
+def run(configs: list, workers: int, scenario: str, catalog: dict, args) -> dict:
+    """Provision configs once against a fresh fake seeded with catalog."""
+    client = FakeBigQueryClient(
+        # A project of its own gives every run fresh throttle buckets.
+        project=f"bench-{len(configs)}-{workers}-{scenario}",
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        conflict_rate=args.conflict_rate,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        enforce_update_quota=not args.no_update_quota,
+        time_scale=args.time_scale,
+        seed=args.seed,
+    )
+    client.tables = copy.deepcopy(catalog)
+
+    started = time.perf_counter()
+    results = provisioner.provision_tables(
+        client, DATASET_ID, configs, max_workers=workers, use_cache=False
+    )
+    seconds = time.perf_counter() - started
+
+    durations = sorted(r["duration_ms"] for r in results)
+    actions = {}
+    for r in results:
+        key = r.get("action", "error")
+        actions[key] = actions.get(key, 0) + 1
+    return {
+        "tables": len(configs),
+        "workers": workers,
+        "scenario": scenario,
+        "seconds": round(seconds, 3),
+        "simulated_seconds": round(seconds / args.time_scale, 1),
+        "tables_per_second": round(len(configs) / seconds, 1),
+        "simulated_tables_per_second": round(len(configs) / seconds * args.time_scale, 2),
+        "actions": actions,
+        "failed": sum(r["status"] != "success" for r in results),
+        "api_calls": dict(client.calls),
+        "injected_errors": dict(client.injected),
+        "max_in_flight": client.max_in_flight,
+        "table_ms_p50": round(statistics.median(durations), 1),
+        "table_ms_p95": round(durations[int(0.95 * (len(durations) - 1))], 1),
+    }
+
+
+def print_report(results: list) -> None:
+    """Print results as a fixed-width table."""
+    print(
+        f"{'tables':>6} {'workers':>7} {'scenario':<8} {'seconds':>8} {'sim s':>8} "
+        f"{'tables/s':>9} {'calls':>6} {'faults':>6} {'failed':>6} {'p95 ms':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['tables']:>6} {r['workers']:>7} {r['scenario']:<8} {r['seconds']:>8.2f} "
+            f"{r['simulated_seconds']:>8.1f} {r['tables_per_second']:>9.1f} "
+            f"{sum(r['api_calls'].values()):>6} {sum(r['injected_errors'].values()):>6} "
+            f"{r['failed']:>6} {r['table_ms_p95']:>8.1f}"
+        )
+
+
+def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--tables", type=int, nargs="+", default=[18, 200, 2000], help="Dataset sizes"
+    )
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 8, 32], help="MAX_WORKERS values"
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=150.0, help="Simulated latency of every call"
+    )
+    parser.add_argument(
+        "--jitter-ms", type=float, default=50.0, help="Uniform extra latency, up to this"
+    )
+    parser.add_argument(
+        "--conflict-rate", type=float, default=0.0, help="Share of creates answering 409"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Share of calls answering 503"
+    )
+    parser.add_argument(
+        "--rate-limit-rate",
+        type=float,
+        default=0.0,
+        help="Share of calls answering 403 rateLimitExceeded",
+    )
+    parser.add_argument(
+        "--no-update-quota",
+        action="store_true",
+        help="Do not enforce 5 metadata updates per table per 10 s",
+    )
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=0.02,
+        help="Factor applied to every simulated delay, quota window and backoff",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for faults")
+    parser.add_argument(
+        "--output-json", action="store_true", help="Output results as JSON"
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    scale_throttle(args.time_scale)
+
+    results = []
+    for count in args.tables:
+        configs = table_configs(count)
+        for scenario in args.scenarios:
+            catalog = seed_catalog(configs, scenario)
+            for workers in args.workers:
+                results.append(run(configs, workers, scenario, catalog, args))
+
+    if args.output_json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+#!/usr/bin/env -S uv run --quiet --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "duckdb>=1.1",
+#     "pyarrow>=17",
+# ]
+# ///
+"""
+Offline Query Cost Estimator
+
+Generates synthetic rows for the tables in code/config.py (REPEATED and nested
+RECORD columns included), lays them out as Parquet under several storage
+strategies and runs a canonical set of analyst queries against each layout
+with DuckDB as a local stand-in for BigQuery.
+
+Strategies:
+    unpartitioned  one file, rows in arrival order
+    partitioned    one directory per partition (DAY or HOUR, as configured)
+    clustered      partitioned, rows sorted by the configured clustering columns
+
+For every query the report shows:
+    bytes_scanned  uncompressed bytes of the referenced columns in the row
+                   groups that survive partition and min/max pruning, which is
+                   how BigQuery prunes storage blocks for billing
+    rows_touched   rows in those surviving row groups
+    latency_ms     DuckDB wall-clock time for the query (median of --repeat)
+
+Usage:
+    # All tables, 100k rows each
+    uv run scripts/bench_query_cost.py
+
+    # Selected tables, bigger volume, machine-readable output
+    uv run scripts/bench_query_cost.py --tables os_linux_dirlist os_linux_auditd \\
+        --rows 1000000 --output-json
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import duckdb
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "code"))
+
+from config import TABLE_CONFIGS  # noqa: E402
+from validator import arrow_schema  # noqa: E402
+
+STRATEGIES = ("unpartitioned", "partitioned", "clustered")
+
+# Columns with realistic, table-independent cardinality. Everything else gets
+# a small per-column vocabulary.
+_HEX_COLUMNS = {"md5_sum": 16, "sha1_sum": 20, "sha256_sum": 32, "hash": 32}
+
+
+# ---------------------------
+# SYNTHETIC DATA
+# ---------------------------
+class RowGenerator:
+    """Deterministic synthetic column generator for one table."""
+
+    def __init__(self, table_config: dict, args: argparse.Namespace) -> None:
+        self.config = table_config
+        self.rng = random.Random(f"{args.seed}:{table_config['table_id']}")
+        self.rows = args.rows
+        self.accounts = [f"account-{i:04d}" for i in range(args.accounts)]
+        self.instances = [f"i-{i:012x}" for i in range(args.instances)]
+        self.end = datetime(2026, 1, 8, tzinfo=timezone.utc)
+        self.span_s = args.days * 24 * 60 * 60
+        # Row i belongs to instance instance_of[i]; accounts own a fixed slice
+        # of instances, like real client orgs.
+        self.instance_of = [
+            self.rng.randrange(args.instances) for _ in range(self.rows)
+        ]
+
+    def _hex(self, nbytes: int, distinct: int) -> list:
+        pool = [self.rng.randbytes(nbytes).hex() for _ in range(distinct)]
+        return [self.rng.choice(pool) for _ in range(self.rows)]
+
+    def _scalar(self, field, count: int, top_level: bool) -> list:
+        name, field_type = field.name, field.field_type
+        if top_level and name == "client_instance_id":
+            return [self.instances[i] for i in self.instance_of]
+        if top_level and name == "client_account_id":
+            return [self.accounts[i % len(self.accounts)] for i in self.instance_of]
+        if top_level and name in _HEX_COLUMNS:
+            return self._hex(_HEX_COLUMNS[name], max(1, self.rows // 4))
+        if field_type == "TIMESTAMP":
+            return [
+                self.end - timedelta(seconds=self.rng.randrange(self.span_s))
+                for _ in range(count)
+            ]
+        if field_type in ("INT64", "INTEGER"):
+            return [self.rng.randrange(1 << 20) for _ in range(count)]
+        if field_type in ("FLOAT64", "FLOAT"):
+            return [self.rng.random() * 1.7e9 for _ in range(count)]
+        if field_type in ("BOOL", "BOOLEAN"):
+            return [self.rng.random() < 0.5 for _ in range(count)]
+        vocabulary = [f"{name}-{i}" for i in range(50)]
+        return [self.rng.choice(vocabulary) for _ in range(count)]
+
+    def _column(self, field, count: int, top_level: bool = False) -> list:
+        if field.mode == "REPEATED":
+            lengths = [self.rng.randrange(4) for _ in range(count)]
+            flat = self._value_column(field, sum(lengths), top_level=False)
+            values, offset = [], 0
+            for length in lengths:
+                values.append(flat[offset : offset + length])
+                offset += length
+            return values
+        return self._value_column(field, count, top_level)
+
+    def _value_column(self, field, count: int, top_level: bool) -> list:
+        if field.field_type in ("RECORD", "STRUCT"):
+            columns = {f.name: self._column(f, count) for f in field.fields}
+            return [{k: v[i] for k, v in columns.items()} for i in range(count)]
+        return self._scalar(field, count, top_level)
+
+    def table(self) -> pa.Table:
+        """Generate the synthetic Arrow table."""
+        fields = self.config["schema"]
+        schema = arrow_schema(fields)
+        columns = [self._column(f, self.rows, top_level=True) for f in fields]
+        return pa.Table.from_arrays(
+            [pa.array(c, type=schema.field(i).type) for i, c in enumerate(columns)],
+            schema=schema,
+        )
+
+
+# ---------------------------
+# STORAGE LAYOUTS
+# ---------------------------
+def _partition_format(table_config: dict) -> tuple[str, timedelta]:
+    """Return the partition directory name format and partition width."""
+    if table_config.get("partition_type") == "HOUR":
+        return "%Y%m%d%H", timedelta(hours=1)
+    return "%Y%m%d", timedelta(days=1)
+
+
+def write_layout(
+    table: pa.Table,
+    table_config: dict,
+    strategy: str,
+    root: Path,
+    row_group_size: int,
+) -> Path:
+    """Write the table under root using one of STRATEGIES and return its directory."""
+    directory = root / table_config["table_id"] / strategy
+    directory.mkdir(parents=True)
+
+    if strategy == "unpartitioned":
+        pq.write_table(table, directory / "data.parquet", row_group_size=row_group_size)
+        return directory
+
+    fmt, _ = _partition_format(table_config)
+    keys = [
+        value.strftime(fmt) if value else "null"
+        for value in table[table_config["partition_column"]].to_pylist()
+    ]
+    table = table.append_column("_partition", pa.array(keys))
+    sort_keys = [("_partition", "ascending")]
+    if strategy == "clustered":
+        sort_keys += [(c, "ascending") for c in table_config["clustering_columns"]]
+    table = table.sort_by(sort_keys)
+
+    for key in sorted(set(keys)):
+        part = table.filter(pc.equal(table["_partition"], key))
+        (directory / f"p={key}").mkdir()
+        pq.write_table(
+            part.drop_columns(["_partition"]),
+            directory / f"p={key}" / "data.parquet",
+            row_group_size=row_group_size,
+        )
+    return directory
+
+
+# ---------------------------
+# QUERIES
+# ---------------------------
+def canonical_queries(table: pa.Table, table_config: dict) -> list:
+    """
+    Build the analyst queries that apply to a table.
+
+    Each query is a dict with a name, the referenced top-level columns (None
+    meaning all columns), equality filters, and the time window in days.
+    """
+    names = {f.name for f in table_config["schema"]}
+    sample = table.slice(len(table) // 2, 1).to_pylist()[0]
+    queries = []
+
+    if "client_instance_id" in names:
+        queries.append(
+            {
+                "name": "instance_lookup_1d",
+                "columns": None,
+                "filters": {"client_instance_id": sample["client_instance_id"]},
+                "days": 1,
+            }
+        )
+    if "client_account_id" in names:
+        queries.append(
+            {
+                "name": "account_summary_7d",
+                "columns": ["client_account_id", "client_instance_id"],
+                "filters": {"client_account_id": sample["client_account_id"]},
+                "days": 7,
+            }
+        )
+    if "sha256_sum" in names:
+        queries.append(
+            {
+                "name": "hash_lookup_7d",
+                "columns": ["client_instance_id", "file_path", "sha256_sum"],
+                "filters": {"sha256_sum": sample["sha256_sum"]},
+                "days": 7,
+            }
+        )
+    return queries
+
+
+def estimate_scan(
+    directory: Path, table_config: dict, query: dict, since: datetime
+) -> tuple[int, int]:
+    """
+    Estimate bytes scanned and rows touched the way BigQuery prunes storage.
+
+    Partitions outside the window are skipped, then row groups whose min/max
+    statistics exclude an equality filter or the time window are skipped;
+    only the referenced columns of the remaining row groups count.
+    """
+    fmt, width = _partition_format(table_config)
+    partition_column = table_config["partition_column"]
+    bytes_scanned = rows_touched = 0
+
+    for path in directory.rglob("*.parquet"):
+        partition = path.parent.name
+        if partition.startswith("p=") and partition != "p=null":
+            start = datetime.strptime(partition[2:], fmt).replace(tzinfo=timezone.utc)
+            if start + width <= since:
+                continue
+
+        metadata = pq.ParquetFile(path).metadata
+        for rg in range(metadata.num_row_groups):
+            row_group = metadata.row_group(rg)
+            chunks = [row_group.column(c) for c in range(row_group.num_columns)]
+            by_column = {}
+            for chunk in chunks:
+                by_column.setdefault(chunk.path_in_schema.split(".")[0], []).append(chunk)
+
+            if _pruned(by_column, query["filters"], partition_column, since):
+                continue
+
+            referenced = query["columns"] or list(by_column)
+            referenced = set(referenced) | set(query["filters"]) | {partition_column}
+            rows_touched += row_group.num_rows
+            bytes_scanned += sum(
+                chunk.total_uncompressed_size
+                for column in referenced
+                for chunk in by_column.get(column, [])
+            )
+    return bytes_scanned, rows_touched
+
+
+def _pruned(
+    by_column: dict, filters: dict, partition_column: str, since: datetime
+) -> bool:
+    """True if row-group statistics prove no row matches the query."""
+    for column, value in filters.items():
+        stats = by_column[column][0].statistics
+        if stats is None or not stats.has_min_max:
+            continue
+        if not stats.min <= value <= stats.max:
+            return True
+    stats = by_column[partition_column][0].statistics
+    return stats is not None and stats.has_min_max and stats.max < since
+
+
+def run_query(
+    directory: Path, table_config: dict, query: dict, since: datetime, repeat: int
+) -> float:
+    """Run the query with DuckDB and return the median latency in milliseconds."""
+    columns = ", ".join(f'"{c}"' for c in query["columns"]) if query["columns"] else "*"
+    where = [f'"{column}" = ?' for column in query["filters"]]
+    where.append(f'"{table_config["partition_column"]}" >= CAST(? AS TIMESTAMPTZ)')
+    sql = (
+        f"SELECT {columns} FROM read_parquet('{directory}/**/*.parquet') "
+        f"WHERE {' AND '.join(where)}"
+    )
+    params = [*query["filters"].values(), since.isoformat()]
+
+    connection = duckdb.connect()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = connection.execute(sql, params)
+        # to_arrow_table() replaced fetch_arrow_table() in newer DuckDB releases
+        (getattr(result, "to_arrow_table", None) or result.fetch_arrow_table)()
+        timings.append((time.perf_counter() - started) * 1000)
+    connection.close()
+    return statistics.median(timings)
+
+
+def benchmark_table(table_config: dict, args: argparse.Namespace, root: Path) -> list:
+    """Generate, lay out and query one table under every strategy."""
+    generator = RowGenerator(table_config, args)
+    table = generator.table()
+    queries = canonical_queries(table, table_config)
+    results = []
+
+    for strategy in STRATEGIES:
+        directory = write_layout(
+            table, table_config, strategy, root, args.row_group_size
+        )
+        for query in queries:
+            since = generator.end - timedelta(days=query["days"])
+            bytes_scanned, rows_touched = estimate_scan(
+                directory, table_config, query, since
+            )
+            latency_ms = run_query(directory, table_config, query, since, args.repeat)
+            results.append(
+                {
+                    "table_id": table_config["table_id"],
+                    "strategy": strategy,
+                    "query": query["name"],
+                    "bytes_scanned": bytes_scanned,
+                    "rows_touched": rows_touched,
+                    "latency_ms": round(latency_ms, 2),
+                }
+            )
+    return results
+
+
+def print_report(results: list) -> None:
+    """Print results grouped by table and query, relative to unpartitioned."""
+    baseline = {
+        (r["table_id"], r["query"]): r["bytes_scanned"]
+        for r in results
+        if r["strategy"] == "unpartitioned"
+    }
+    header = (
+        f"{'table':<36} {'query':<20} {'strategy':<14} {'bytes_scanned':>14} "
+        f"{'vs base':>8} {'rows':>10} {'ms':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in sorted(results, key=lambda r: (r["table_id"], r["query"])):
+        base = baseline.get((r["table_id"], r["query"])) or 1
+        print(
+            f"{r['table_id']:<36} {r['query']:<20} {r['strategy']:<14} "
+            f"{r['bytes_scanned']:>14,} {r['bytes_scanned'] / base:>7.1%} "
+            f"{r['rows_touched']:>10,} {r['latency_ms']:>8.2f}"
+        )
+
+
+def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--tables", nargs="*", help="Table IDs to benchmark (default: all)"
+    )
+    parser.add_argument(
+        "--rows", type=int, default=100_000, help="Synthetic rows per table"
+    )
+    parser.add_argument(
+        "--accounts", type=int, default=5, help="Distinct client accounts"
+    )
+    parser.add_argument(
+        "--instances", type=int, default=200, help="Distinct client instances"
+    )
+    parser.add_argument("--days", type=int, default=7, help="Days of data to generate")
+    parser.add_argument(
+        "--row-group-size",
+        type=int,
+        default=1024,
+        help="Rows per Parquet row group (storage block)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per query for latency"
+    )
+    parser.add_argument("--seed", default="cyngular", help="Random seed")
+    parser.add_argument(
+        "--output-json", action="store_true", help="Output results as JSON"
+    )
+    args = parser.parse_args()
+
+    table_configs = [
+        c for c in TABLE_CONFIGS if not args.tables or c["table_id"] in args.tables
+    ]
+    if not table_configs:
+        print(f"No matching tables: {args.tables}", file=sys.stderr)
+        sys.exit(1)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_query_cost_") as tmp:
+        for table_config in table_configs:
+            results.extend(benchmark_table(table_config, args, Path(tmp)))
+
+    if args.output_json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()
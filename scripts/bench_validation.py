@@ -0,0 +1,307 @@
+#!/usr/bin/env -S uv run --quiet --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "pyarrow>=17",
+# ]
+# ///
+"""
+Ingestion Validation Throughput Benchmark
+
+Builds synthetic scanner rows for tables in code/config.py, in the shapes the
+scanners actually send: timestamps as epoch numbers, epoch strings and ISO
+8601 strings, numbers for STRING columns, auditd a0..a3 instead of args, and
+a small share of malformed rows (--reject-rate). Each table is pushed through
+the columnar Validator used by the ingestion entry point and, for comparison,
+through a per-row dict walk followed by RecordBatch.from_pylist.
+
+Rows are converted in batches of --batch-rows (INGEST_BATCH_ROWS in
+production) until --rows rows have been processed; a pool of distinct batches
+is generated up front and cycled so generation is not timed.
+
+For every table and engine the report shows rows/s, total seconds and the
+number of rejected rows.
+
+Usage:
+    # 1M rows through auditd and Windows event logs
+    uv run scripts/bench_validation.py
+
+    # Every table, machine-readable output
+    uv run scripts/bench_validation.py --tables --rows 200000 --output-json
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pyarrow as pa
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "code"))
+
+from config import TABLE_CONFIGS  # noqa: E402
+from validator import Validator, _coerce_scalar  # noqa: E402
+
+DEFAULT_TABLES = ("os_linux_auditd", "os_windows_event_logs")
+POOL_BATCHES = 4
+
+
+# ---------------------------
+# SYNTHETIC DATA
+# ---------------------------
+class RowGenerator:
+    """Deterministic synthetic scanner rows for one table."""
+
+    def __init__(self, table_config: dict, args: argparse.Namespace) -> None:
+        self.config = table_config
+        self.rng = random.Random(f"{args.seed}:{table_config['table_id']}")
+        self.reject_rate = args.reject_rate
+        self.mixed_shapes = args.mixed_shapes
+        self.shapes = {}
+        self.end = datetime(2026, 1, 8, tzinfo=timezone.utc)
+        self.combined = {
+            target: sources
+            for target, sources in table_config.get("combine_columns", {}).items()
+        }
+
+    def _timestamp(self, field):
+        moment = self.end - timedelta(seconds=self.rng.uniform(0, 7 * 86400))
+        shape = self.shapes.get(field.name) or self.rng.choice(self._shapes(field))
+        if shape == "epoch":
+            return moment.timestamp()
+        if shape == "epoch_string":
+            return f"{moment.timestamp():.6f}"
+        return moment.isoformat().replace("+00:00", "Z")
+
+    @staticmethod
+    def _shapes(field):
+        if field.field_type == "TIMESTAMP":
+            return ("epoch", "epoch_string", "iso")
+        return ("epoch", "epoch_string")
+
+    def _scalar(self, field):
+        kind = field.field_type
+        if kind == "TIMESTAMP" or (kind in ("FLOAT64", "FLOAT") and "epoch" in field.name):
+            return self._timestamp(field)
+        if kind in ("FLOAT64", "FLOAT"):
+            return self.rng.random()
+        if kind in ("INT64", "INTEGER"):
+            return self.rng.randrange(1 << 20)
+        if kind in ("BOOL", "BOOLEAN"):
+            return self.rng.random() < 0.5
+        if self.shapes.get(field.name) == "number":
+            return self.rng.randrange(100_000)
+        return f"{field.name}-{self.rng.randrange(1000)}"
+
+    def _value(self, field):
+        if field.mode == "REPEATED":
+            return [self._single(field) for _ in range(self.rng.randrange(4))]
+        return self._single(field)
+
+    def _single(self, field):
+        if field.field_type in ("RECORD", "STRUCT"):
+            return {f.name: self._value(f) for f in field.fields}
+        return self._scalar(field)
+
+    def row(self) -> dict:
+        row = {}
+        for field in self.config["schema"]:
+            if field.name in self.combined:
+                for source in self.combined[field.name]:
+                    if self.rng.random() < 0.8:
+                        row[source] = f"0x{self.rng.randrange(1 << 16):x}"
+                continue
+            if self.rng.random() < 0.9:
+                row[field.name] = self._value(field)
+        if self.rng.random() < self.reject_rate:
+            if self.rng.random() < 0.5:
+                row["unexpected_column"] = 1
+            else:
+                timestamps = [
+                    f.name for f in self.config["schema"] if f.field_type == "TIMESTAMP"
+                ]
+                row[self.rng.choice(timestamps)] = "not a timestamp"
+        return row
+
+    def batch(self, size: int) -> list:
+        """
+        One batch of rows. Each scanner sends a column in one shape, so shapes
+        are fixed per column within a batch and vary between batches; with
+        --mixed-shapes they vary per value instead.
+        """
+        self.shapes = {}
+        if not self.mixed_shapes:
+            for field in self.config["schema"]:
+                if field.field_type == "STRING":
+                    self.shapes[field.name] = self.rng.choice(("text",) * 9 + ("number",))
+                else:
+                    self.shapes[field.name] = self.rng.choice(self._shapes(field))
+        return [self.row() for _ in range(size)]
+
+
+# ---------------------------
+# ENGINES
+# ---------------------------
+def _rowwise_value(value, field):
+    if value is None:
+        return [] if field.mode == "REPEATED" else None
+    if field.mode == "REPEATED":
+        if not isinstance(value, list):
+            raise ValueError(f"{field.name}: expected array")
+        return [_rowwise_single(item, field) for item in value]
+    return _rowwise_single(value, field)
+
+
+def _rowwise_single(value, field):
+    if field.field_type in ("RECORD", "STRUCT"):
+        if not isinstance(value, dict):
+            raise ValueError(f"{field.name}: expected object")
+        return _rowwise_row(value, field.fields, {})
+    return _coerce_scalar(value, field.field_type)
+
+
+def _rowwise_row(row: dict, fields, combine: dict) -> dict:
+    by_name = {f.name: f for f in fields}
+    sources = {s for names in combine.values() for s in names}
+    unknown = [n for n in row if n not in by_name and n not in sources]
+    if unknown:
+        raise ValueError(f"unknown field(s): {', '.join(unknown)}")
+    out = {name: _rowwise_value(row.get(name), f) for name, f in by_name.items()}
+    for target, names in combine.items():
+        if out[target] is None:
+            parts = [str(row[n]) for n in names if row.get(n) is not None]
+            out[target] = " ".join(parts) or None
+    return out
+
+
+def convert_rowwise(validator: Validator, rows: list) -> tuple:
+    """Per-row dict walk, the conversion the columnar Validator replaced."""
+    accepted, rejected = [], {}
+    for i, row in enumerate(rows):
+        try:
+            accepted.append(
+                _rowwise_row(row, validator.fields, validator.combine_columns)
+            )
+        except (TypeError, ValueError, OverflowError, OSError) as e:
+            rejected[i] = str(e)
+    return pa.RecordBatch.from_pylist(accepted, schema=validator.schema), rejected
+
+
+def convert_columnar(validator: Validator, rows: list) -> tuple:
+    return validator.convert(rows)
+
+
+ENGINES = {"columnar": convert_columnar, "rowwise": convert_rowwise}
+
+
+# ---------------------------
+# BENCHMARK
+# ---------------------------
+def benchmark_table(table_config: dict, args: argparse.Namespace) -> list:
+    """Convert --rows rows of one table with every selected engine."""
+    validator = Validator(table_config)
+    generator = RowGenerator(table_config, args)
+    pool = [generator.batch(args.batch_rows) for _ in range(POOL_BATCHES)]
+    batches = -(-args.rows // args.batch_rows)
+
+    results = []
+    for engine in args.engines:
+        convert = ENGINES[engine]
+        written = rejected = 0
+        start = time.perf_counter()
+        for i in range(batches):
+            batch, errors = convert(validator, pool[i % POOL_BATCHES])
+            written += batch.num_rows
+            rejected += len(errors)
+        seconds = time.perf_counter() - start
+        processed = written + rejected
+        results.append(
+            {
+                "table_id": table_config["table_id"],
+                "engine": engine,
+                "rows": processed,
+                "written": written,
+                "rejected": rejected,
+                "seconds": round(seconds, 3),
+                "rows_per_second": round(processed / seconds) if seconds else None,
+            }
+        )
+    return results
+
+
+def print_report(results: list) -> None:
+    """Print results as a table."""
+    header = f"{'table':<36} {'engine':<9} {'rows':>9} {'rejected':>9} {'seconds':>8} {'rows/s':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['table_id']:<36} {r['engine']:<9} {r['rows']:>9} "
+            f"{r['rejected']:>9} {r['seconds']:>8.2f} {r['rows_per_second']:>10,}"
+        )
+
+
+def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--tables",
+        nargs="*",
+        default=list(DEFAULT_TABLES),
+        help="Table IDs to benchmark (no value: all tables)",
+    )
+    parser.add_argument(
+        "--rows", type=int, default=1_000_000, help="Rows to convert per table"
+    )
+    parser.add_argument(
+        "--batch-rows", type=int, default=10_000, help="Rows per converted batch"
+    )
+    parser.add_argument(
+        "--reject-rate",
+        type=float,
+        default=0.01,
+        help="Share of synthetic rows that are malformed",
+    )
+    parser.add_argument(
+        "--mixed-shapes",
+        action="store_true",
+        help="Vary value shapes within a column (worst case for the columnar path)",
+    )
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        choices=sorted(ENGINES),
+        default=["columnar", "rowwise"],
+        help="Conversion engines to compare",
+    )
+    parser.add_argument("--seed", default="cyngular", help="Random seed")
+    parser.add_argument(
+        "--output-json", action="store_true", help="Output results as JSON"
+    )
+    args = parser.parse_args()
+
+    table_configs = [
+        c for c in TABLE_CONFIGS if not args.tables or c["table_id"] in args.tables
+    ]
+    if not table_configs:
+        print(f"No matching tables: {args.tables}", file=sys.stderr)
+        sys.exit(1)
+
+    results = []
+    for table_config in table_configs:
+        results.extend(benchmark_table(table_config, args))
+
+    if args.output_json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()
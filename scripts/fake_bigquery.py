@@ -0,0 +1,241 @@
+"""
+In-process fake of the BigQuery client methods the provisioner uses.
+
+FakeBigQueryClient implements list_tables, get_table, create_table,
+update_table, create_dataset and get_dataset against an in-memory catalog, returning real
+google.cloud.bigquery Table/TableListItem/Dataset objects built from API
+resources so code under test sees the same types as against BigQuery. It
+can inject:
+
+    latency        a fixed delay plus uniform jitter on every call
+    conflicts      create_table answering 409 as if another caller had just
+                   created the table (the table then exists)
+    errors         503 backendError on any call
+    rate limits    403 rateLimitExceeded on any call, and optionally
+                   BigQuery's real limit of 5 metadata updates per table per
+                   10 seconds enforced on update_table
+
+update_table honours the table's etag like the real API (412 when it is
+stale). time_scale shrinks every delay and quota window by the same
+factor, so large runs finish quickly while keeping their shape.
+
+Used by scripts/bench_provisioning.py and scripts/bench_discovery.py;
+nothing here talks to GCP.
+"""
+
+import copy
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+from google.api_core import exceptions
+from google.cloud import bigquery
+
+
+class FakeBigQueryClient:
+    """Thread-safe in-memory stand-in for bigquery.Client (provisioning subset)."""
+
+    def __init__(
+        self,
+        project: str = "fake-project",
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        conflict_rate: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        enforce_update_quota: bool = False,
+        time_scale: float = 1.0,
+        seed: int | None = None,
+    ):
+        self.project = project
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.conflict_rate = conflict_rate
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.enforce_update_quota = enforce_update_quota
+        self.time_scale = time_scale
+        self.datasets = {}
+        self.tables = {}
+        self.calls = Counter()
+        self.injected = Counter()
+        self.max_in_flight = 0
+        self._faults = True
+        self._in_flight = 0
+        self._updates = defaultdict(deque)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # ---------------------------
+    # FAULT INJECTION
+    # ---------------------------
+    @contextmanager
+    def faults_disabled(self):
+        """Run calls without latency or injected errors (e.g. to seed the catalog)."""
+        self._faults = False
+        try:
+            yield self
+        finally:
+            self._faults = True
+
+    def reset_stats(self) -> None:
+        """Zero the call, injected-error and concurrency counters."""
+        with self._lock:
+            self.calls.clear()
+            self.injected.clear()
+            self.max_in_flight = 0
+
+    def _roll(self, rate: float) -> bool:
+        if not self._faults or rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    @contextmanager
+    def _call(self, method: str):
+        with self._lock:
+            self.calls[method] += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            if self._faults and (self.latency_ms or self.jitter_ms):
+                with self._lock:
+                    jitter = self._random.uniform(0, self.jitter_ms)
+                time.sleep((self.latency_ms + jitter) / 1000 * self.time_scale)
+            if self._roll(self.error_rate):
+                self.injected["backendError"] += 1
+                raise exceptions.ServiceUnavailable(
+                    f"{method}: backend error (injected)", errors=[{"reason": "backendError"}]
+                )
+            if self._roll(self.rate_limit_rate):
+                self.injected["rateLimitExceeded"] += 1
+                raise exceptions.Forbidden(
+                    f"{method}: rate limit exceeded (injected)",
+                    errors=[{"reason": "rateLimitExceeded"}],
+                )
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _check_update_quota(self, key) -> None:
+        if not (self._faults and self.enforce_update_quota):
+            return
+        window = 10.0 * self.time_scale
+        now = time.monotonic()
+        with self._lock:
+            recent = self._updates[key]
+            while recent and now - recent[0] >= window:
+                recent.popleft()
+            if len(recent) >= 5:
+                self.injected["updateQuota"] += 1
+                raise exceptions.Forbidden(
+                    "Exceeded rate limits: too many table update operations for this table",
+                    errors=[{"reason": "rateLimitExceeded"}],
+                )
+            recent.append(now)
+
+    # ---------------------------
+    # CATALOG
+    # ---------------------------
+    def _key(self, ref) -> tuple:
+        if isinstance(ref, str):
+            parts = ref.split(".")
+            return parts[-2], parts[-1]
+        return ref.dataset_id, ref.table_id
+
+    def _table_resource(self, key) -> dict:
+        resource = self.tables.get(key)
+        if resource is None:
+            raise exceptions.NotFound(f"Not found: Table {self.project}:{key[0]}.{key[1]}")
+        return copy.deepcopy(resource)
+
+    def _store(self, key, resource: dict) -> dict:
+        resource["etag"] = uuid.uuid4().hex
+        resource["tableReference"] = {
+            "projectId": self.project,
+            "datasetId": key[0],
+            "tableId": key[1],
+        }
+        self.tables[key] = resource
+        return copy.deepcopy(resource)
+
+    def create_dataset(self, dataset, exists_ok: bool = False, retry=None, timeout=None):
+        dataset_id = dataset if isinstance(dataset, str) else dataset.dataset_id
+        dataset_id = dataset_id.split(".")[-1]
+        with self._call("create_dataset"):
+            with self._lock:
+                if dataset_id in self.datasets and not exists_ok:
+                    raise exceptions.Conflict(f"Already Exists: Dataset {dataset_id}")
+                self.datasets.setdefault(dataset_id, {"location": getattr(dataset, "location", None)})
+            return bigquery.Dataset(f"{self.project}.{dataset_id}")
+
+    def get_dataset(self, dataset_ref, retry=None, timeout=None):
+        dataset_id = dataset_ref if isinstance(dataset_ref, str) else dataset_ref.dataset_id
+        dataset_id = dataset_id.split(".")[-1]
+        with self._call("get_dataset"):
+            with self._lock:
+                resource = copy.deepcopy(self.datasets.get(dataset_id))
+            if resource is None:
+                raise exceptions.NotFound(f"Not found: Dataset {self.project}:{dataset_id}")
+            return bigquery.Dataset.from_api_repr(
+                {
+                    **resource,
+                    "datasetReference": {"projectId": self.project, "datasetId": dataset_id},
+                }
+            )
+
+    def list_tables(self, dataset, retry=None, timeout=None, **kwargs):
+        dataset_id = (dataset if isinstance(dataset, str) else dataset.dataset_id).split(".")[-1]
+        with self._call("list_tables"):
+            with self._lock:
+                resources = [
+                    copy.deepcopy(r) for (ds, _), r in sorted(self.tables.items()) if ds == dataset_id
+                ]
+        return iter([bigquery.table.TableListItem(r) for r in resources])
+
+    def get_table(self, table, retry=None, timeout=None):
+        with self._call("get_table"):
+            with self._lock:
+                return bigquery.Table.from_api_repr(self._table_resource(self._key(table)))
+
+    def create_table(self, table, exists_ok: bool = False, retry=None, timeout=None):
+        key = self._key(table)
+        with self._call("create_table"):
+            resource = table.to_api_repr()
+            with self._lock:
+                exists = key in self.tables
+                if not exists:
+                    stored = self._store(key, resource)
+            if exists and not exists_ok:
+                raise exceptions.Conflict(f"Already Exists: Table {self.project}:{key[0]}.{key[1]}")
+            if not exists and self._roll(self.conflict_rate):
+                # Lost a race with another creator: the table exists, but not for us.
+                self.injected["conflict"] += 1
+                raise exceptions.Conflict(f"Already Exists: Table {self.project}:{key[0]}.{key[1]}")
+            if exists:
+                with self._lock:
+                    stored = self._table_resource(key)
+            return bigquery.Table.from_api_repr(stored)
+
+    def update_table(self, table, fields, retry=None, timeout=None):
+        key = self._key(table)
+        with self._call("update_table"):
+            self._check_update_quota(key)
+            partial = table._build_resource(fields)
+            with self._lock:
+                resource = self._table_resource(key)
+                if table.etag is not None and table.etag != resource["etag"]:
+                    raise exceptions.PreconditionFailed(
+                        f"Precondition check failed for {key[0]}.{key[1]}"
+                    )
+                for name, value in partial.items():
+                    if value is None:
+                        resource.pop(name, None)
+                    else:
+                        resource[name] = value
+                stored = self._store(key, resource)
+            return bigquery.Table.from_api_repr(stored)
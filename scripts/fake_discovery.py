@@ -0,0 +1,146 @@
+"""
+In-process fakes of the async logging and resource manager clients used
+by GCPResourceDiscovery in scripts/utils.py.
+
+FakeConfigServiceClient serves list_sinks from a mapping of parent
+("organizations/123", ...) to LogSink messages, FakeOrganizationsClient
+serves search_organizations, and FakeFoldersClient and FakeProjectsClient
+serve list_folders and list_projects from a mapping of parent to child
+resource names, all returning async pagers of the same proto-plus types
+as the real clients. Every call sleeps (asynchronously) for a fixed
+latency plus uniform jitter and is counted, so concurrency and call
+savings can be measured without GCP.
+Combine with FakeBigQueryClient from scripts/fake_bigquery.py for datasets.
+
+Used by scripts/bench_discovery.py; nothing here talks to GCP.
+"""
+
+import asyncio
+import random
+import threading
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from google.cloud import resourcemanager_v3
+from google.cloud.logging_v2.types import LogSink
+
+
+class _Pager:
+    """Async iterable over one call's results, like the async clients' pagers."""
+
+    def __init__(self, items: list):
+        self._items = items
+
+    async def __aiter__(self):
+        for item in self._items:
+            yield item
+
+
+class _FakeClient:
+    """Latency, call counting and concurrency tracking shared by the fakes."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int | None = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.calls = Counter()
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def _call(self, method: str):
+        with self._lock:
+            self.calls[method] += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            jitter = self._random.uniform(0, self.jitter_ms)
+        try:
+            if self.latency_ms or jitter:
+                await asyncio.sleep((self.latency_ms + jitter) / 1000)
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def reset_stats(self) -> None:
+        """Zero the call and concurrency counters."""
+        with self._lock:
+            self.calls.clear()
+            self.max_in_flight = 0
+
+
+class FakeConfigServiceClient(_FakeClient):
+    """Stand-in for ConfigServiceV2AsyncClient (list_sinks only)."""
+
+    def __init__(self, sinks: dict[str, list[LogSink]] | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.sinks = sinks or {}
+
+    async def list_sinks(self, request=None, parent: str | None = None, **kwargs):
+        parent = parent or request.parent
+        async with self._call("list_sinks"):
+            return _Pager(list(self.sinks.get(parent, [])))
+
+
+class FakeOrganizationsClient(_FakeClient):
+    """Stand-in for resourcemanager_v3.OrganizationsAsyncClient (search_organizations only)."""
+
+    def __init__(self, organizations: list[resourcemanager_v3.Organization] | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.organizations = organizations or []
+
+    async def search_organizations(self, request=None, **kwargs):
+        async with self._call("search_organizations"):
+            return _Pager(list(self.organizations))
+
+
+class FakeFoldersClient(_FakeClient):
+    """Stand-in for resourcemanager_v3.FoldersAsyncClient (list_folders only)."""
+
+    def __init__(self, children: dict[str, list[str]] | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.children = children or {}
+
+    async def list_folders(self, request=None, parent: str | None = None, **kwargs):
+        parent = parent or request.parent
+        async with self._call("list_folders"):
+            return _Pager(
+                [
+                    resourcemanager_v3.Folder(name=name, parent=parent)
+                    for name in self.children.get(parent, [])
+                    if name.startswith("folders/")
+                ]
+            )
+
+
+class FakeProjectsClient(_FakeClient):
+    """Stand-in for resourcemanager_v3.ProjectsAsyncClient (list_projects only)."""
+
+    def __init__(self, children: dict[str, list[str]] | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.children = children or {}
+
+    async def list_projects(self, request=None, parent: str | None = None, **kwargs):
+        parent = parent or request.parent
+        async with self._call("list_projects"):
+            return _Pager(
+                [
+                    resourcemanager_v3.Project(
+                        name=f"projects/{index}", project_id=name.split("/", 1)[1], parent=parent
+                    )
+                    for index, name in enumerate(self.children.get(parent, []))
+                    if name.startswith("projects/")
+                ]
+            )
+
+
+def audit_sink(parent: str, name: str, project_id: str, dataset_id: str) -> LogSink:
+    """A sink exporting CloudAudit logs to a BigQuery dataset."""
+    return LogSink(
+        name=name,
+        destination=f"bigquery.googleapis.com/projects/{project_id}/datasets/{dataset_id}",
+        filter='logName:"cloudaudit.googleapis.com"',
+        include_children=parent.startswith(("organizations/", "folders/")),
+        writer_identity=f"serviceAccount:{name}@gcp-sa-logging.iam.gserviceaccount.com",
+    )
@@ -24,23 +24,44 @@ Usage:
     # Get CloudAudit-specific log sinks (filtered)
     uv run scripts/get_log_sink_info.py --org-id 123456789012 --cloudaudit-only
 
+    # Also walk every folder and project of the organization (or, without
+    # --org-id, of every accessible organization), 16 API calls at a time
+    uv run scripts/get_log_sink_info.py --all-parents --cloudaudit-only --max-workers 16
+
     # Get specific BigQuery dataset details
     uv run scripts/get_log_sink_info.py --bq-dataset PROJECT_ID:DATASET_ID
 
+    # Stream one JSON object per line as results arrive, e.g. into jq
+    uv run scripts/get_log_sink_info.py --all-parents --output-ndjson | jq -r .destination
+
     # Interactive mode (recommended)
     uv run scripts/get_log_sink_info.py --interactive
 
+    Results are cached under ~/.cache/cyngular-onboarding/ per credentials
+    (sinks for 15 minutes, organizations, folders, projects and datasets for
+    an hour), so repeat runs during an onboarding session are near-instant:
+    # Ignore cached results
+    uv run scripts/get_log_sink_info.py --org-id 123456789012 --refresh
+
+    # Only use cached results, without calling any API
+    uv run scripts/get_log_sink_info.py --org-id 123456789012 --offline
+
 Requirements:
     - Authenticated with GCP (run: gcloud auth application-default login)
     - Proper IAM permissions:
         - roles/resourcemanager.organizationViewer (to list orgs)
         - roles/logging.viewer (to list log sinks)
+        - roles/resourcemanager.folderViewer and roles/browser (to walk
+          folders and projects with --all-parents)
         - roles/bigquery.dataViewer (to view dataset metadata)
 """
 
 import argparse
+import atexit
 import json
+import os
 import sys
+from collections.abc import Iterable
 from typing import Any
 
 from rich.console import Console
@@ -49,7 +70,13 @@ from rich.prompt import Confirm, Prompt
 from rich.table import Table
 from rich.tree import Tree
 
-from utils import GCPResourceDiscovery
+from utils import (
+    DEFAULT_MAX_WORKERS,
+    DiscoveryCache,
+    GCPResourceDiscovery,
+    credentials_fingerprint,
+    default_credentials,
+)
 
 console = Console()
 
@@ -92,6 +119,8 @@ def print_log_sinks(sinks: list[dict[str, Any]], cloudaudit_only: bool = False)
 
     for sink in sinks:
         sink_node = tree.add(f"[cyan]{sink['name']}[/cyan]")
+        if sink.get("parent"):
+            sink_node.add(f"[dim]Parent:[/dim] {sink['parent']}")
         sink_node.add(f"[dim]Destination:[/dim] {sink['destination']}")
         sink_node.add(f"[dim]Include Children:[/dim] {sink['include_children']}")
         sink_node.add(f"[dim]Writer Identity:[/dim] {sink['writer_identity']}")
@@ -144,6 +173,48 @@ def print_bq_dataset(dataset_info: dict[str, Any]) -> None:
     console.print(table)
 
 
+def print_ndjson(records: Iterable[Any]) -> None:
+    """Print each record as one line of JSON as soon as it is produced."""
+    try:
+        for record in records:
+            sys.stdout.write(json.dumps(record) + "\n")
+            sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader (e.g. head) has gone; stop quietly.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+def stream_hierarchy_sinks(
+    discovery: GCPResourceDiscovery,
+    org_ids: list[str] | None,
+    cloudaudit_only: bool,
+    output_json: bool,
+    output_ndjson: bool = False,
+) -> None:
+    """Walk the resource hierarchy, printing each sink as soon as it is found."""
+    found = discovery.iter_hierarchy_log_sinks(org_ids, cloudaudit_only=cloudaudit_only)
+    if output_ndjson:
+        print_ndjson(found)
+        return
+
+    sinks = []
+    for sink in found:
+        sinks.append(sink)
+        if not output_json:
+            console.print(
+                f"[cyan]{sink['name']}[/cyan] [dim]{sink['parent']} →[/dim] {sink['destination']}"
+            )
+
+    if output_json:
+        print(json.dumps(sinks, indent=2))
+        return
+
+    console.print(f"\n[dim]Found {len(sinks)} log sink(s)[/dim]")
+    if len(sinks) == 1:
+        console.print("\n" + "=" * 80)
+        console.print(generate_terraform_vars(sinks[0]))
+
+
 def generate_terraform_vars(sink: dict[str, Any]) -> str:
     """Generate Terraform variable configuration from sink information."""
     has_dataset_info = "bq_dataset_info" in sink
@@ -216,7 +287,7 @@ def generate_terraform_vars(sink: dict[str, Any]) -> str:
     return "\n".join(config_lines)
 
 
-def interactive_mode() -> None:
+def interactive_mode(discovery: GCPResourceDiscovery) -> None:
     """Run interactive discovery mode."""
     console.print(
         Panel.fit(
@@ -226,8 +297,6 @@ def interactive_mode() -> None:
         )
     )
 
-    discovery = GCPResourceDiscovery()
-
     # Step 1: List organizations
     console.print("\n[bold]Step 1: Discovering Organizations[/bold]")
     orgs = discovery.list_organizations()
@@ -309,23 +378,81 @@ def main() -> None:
         "--bq-dataset", help="Get BigQuery dataset info (format: PROJECT_ID:DATASET_ID)"
     )
     parser.add_argument(
-        "--interactive", "-i", action="store_true", help="Run in interactive mode"
+        "--all-parents",
+        action="store_true",
+        help="Also list sinks of every folder and project (of --org-id, or of every accessible org)",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help=f"Maximum concurrent API calls (default: {DEFAULT_MAX_WORKERS})",
     )
     parser.add_argument(
+        "--refresh", action="store_true", help="Ignore cached results and fetch everything"
+    )
+    parser.add_argument(
+        "--offline", action="store_true", help="Only use cached results, call no APIs"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Neither read nor write the cache"
+    )
+    parser.add_argument(
+        "--interactive", "-i", action="store_true", help="Run in interactive mode"
+    )
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument(
         "--output-json", action="store_true", help="Output results as JSON"
     )
+    output.add_argument(
+        "--output-ndjson",
+        action="store_true",
+        help="Stream results as newline-delimited JSON, one object per line as it arrives",
+    )
 
     args = parser.parse_args()
 
+    if not args.offline:
+        try:
+            default_credentials()
+        except Exception as e:
+            console.print(f"[red]No usable GCP credentials: {e}[/red]")
+            console.print("Run: gcloud auth application-default login")
+            sys.exit(1)
+
+    cache = None
+    if not args.no_cache:
+        cache = DiscoveryCache(
+            credentials=credentials_fingerprint(),
+            refresh=args.refresh,
+            offline=args.offline,
+        )
+        atexit.register(cache.save)
+
+    discovery = GCPResourceDiscovery(max_workers=args.max_workers, cache=cache)
+    atexit.register(discovery.close)
+
     # Interactive mode
     if args.interactive:
-        interactive_mode()
+        interactive_mode(discovery)
         return
 
-    discovery = GCPResourceDiscovery()
+    # Walk organizations, folders and projects
+    if args.all_parents:
+        stream_hierarchy_sinks(
+            discovery,
+            [args.org_id] if args.org_id else None,
+            args.cloudaudit_only,
+            args.output_json,
+            args.output_ndjson,
+        )
+        return
 
     # List organizations
     if args.list_orgs:
+        if args.output_ndjson:
+            print_ndjson(discovery.iter_organizations())
+            return
         orgs = discovery.list_organizations()
         if args.output_json:
             print(json.dumps(orgs, indent=2))
@@ -335,6 +462,13 @@ def main() -> None:
 
     # Query specific organization
     if args.org_id:
+        if args.output_ndjson:
+            if args.cloudaudit_only:
+                print_ndjson(discovery.iter_cloudaudit_sinks(args.org_id))
+            else:
+                print_ndjson(discovery.iter_log_sinks(f"organizations/{args.org_id}"))
+            return
+
         if args.cloudaudit_only:
             sinks = discovery.search_cloudaudit_sinks(args.org_id)
         else:
@@ -365,7 +499,9 @@ def main() -> None:
         project_id, dataset_id = args.bq_dataset.split(":", 1)
         dataset_info = discovery.get_bq_dataset_info(project_id, dataset_id)
 
-        if args.output_json:
+        if args.output_ndjson:
+            print_ndjson([dataset_info])
+        elif args.output_json:
             print(json.dumps(dataset_info, indent=2))
         else:
             print_bq_dataset(dataset_info)
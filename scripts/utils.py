@@ -3,70 +3,456 @@ GCP utilities for querying log sinks, BigQuery datasets, and organizations.
 
 This module provides helper functions for gathering information needed
 to populate Terraform variables when working with existing GCP resources.
+
+Discovery is asynchronous, on the async logging and resource manager
+clients, with sync wrappers for scripts. The Google Cloud client libraries
+are imported, and their clients created, only when a call first needs
+them, so runs answered from the discovery cache (or only touching
+BigQuery) skip the rest.
 """
 
+import asyncio
+import copy
+import functools
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import AsyncIterator, Awaitable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Any
 
-from google.cloud import bigquery, resourcemanager_v3
-from google.cloud.logging_v2.services.config_service_v2 import ConfigServiceV2Client
-from google.cloud.logging_v2.types import ListSinksRequest
+
+# API calls made at once when enriching sinks or walking the hierarchy
+DEFAULT_MAX_WORKERS = 8
+
+
+def is_cloudaudit_sink(sink: dict[str, Any]) -> bool:
+    """True for sinks exporting CloudAudit logs to BigQuery."""
+    # Only include BigQuery destinations (exclude Cloud Logging buckets like _Required, _Default)
+    destination = sink.get("destination", "")
+    if "bigquery.googleapis.com" not in destination:
+        return False
+
+    # Check if sink filter includes CloudAudit logs
+    filter_str = sink.get("filter", "").lower()
+    return "cloudaudit" in filter_str or "logs/activity" in filter_str
+
+
+# Seconds cached discovery results stay valid, per kind of resource. Sinks
+# change most often; the hierarchy and datasets rarely during onboarding.
+CACHE_TTLS = {
+    "organizations": 3600,
+    "children": 3600,
+    "sinks": 900,
+    "dataset": 3600,
+}
+
+
+def default_cache_path() -> Path:
+    """Discovery cache file under XDG_CACHE_HOME (~/.cache by default)."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "cyngular-onboarding" / "discovery.json"
+
+
+@functools.lru_cache(maxsize=1)
+def default_credentials() -> tuple[Any, str | None]:
+    """
+    Application default credentials and project, looked up once per process.
+
+    Raises:
+        google.auth.exceptions.DefaultCredentialsError: if none are configured
+    """
+    import google.auth
+
+    return google.auth.default()
+
+
+def credentials_fingerprint() -> str:
+    """
+    Short hash identifying the application default credentials.
+
+    Keeps one identity's cached results from being served to another.
+    Falls back to "anonymous" when no credentials are configured (e.g.
+    reading the cache offline).
+    """
+    try:
+        credentials, project = default_credentials()
+    except Exception:
+        return "anonymous"
+    identity = (
+        getattr(credentials, "service_account_email", None)
+        or getattr(credentials, "account", None)
+        or getattr(credentials, "refresh_token", None)
+        or getattr(credentials, "client_id", None)
+        or type(credentials).__name__
+    )
+    return hashlib.sha256(f"{identity}|{project}".encode()).hexdigest()[:16]
+
+
+class DiscoveryCache:
+    """
+    JSON file cache of discovery results, keyed by credentials, kind and resource.
+
+    Entries expire after CACHE_TTLS[kind] seconds. Reads and writes are
+    thread-safe; call save() to write the file back.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        credentials: str = "anonymous",
+        refresh: bool = False,
+        offline: bool = False,
+        ttls: dict[str, int] | None = None,
+    ) -> None:
+        """
+        Load the cache file, if there is one.
+
+        Args:
+            path: Cache file; default_cache_path() if None
+            credentials: Fingerprint of the credentials results are cached for
+            refresh: Ignore cached results (fresh ones are still stored)
+            offline: Only serve cached results, never call the APIs
+            ttls: Seconds per kind, overriding CACHE_TTLS
+        """
+        self.path = Path(path) if path else default_cache_path()
+        self.credentials = credentials
+        self.refresh = refresh
+        self.offline = offline
+        self.ttls = {**CACHE_TTLS, **(ttls or {})}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        try:
+            self._entries = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _key(self, kind: str, resource: str) -> str:
+        return f"{self.credentials}|{kind}|{resource}"
+
+    def get(self, kind: str, resource: str) -> tuple[bool, Any]:
+        """
+        Look up a result.
+
+        Returns:
+            (True, a copy of the value) if cached and fresh, else (False, None)
+        """
+        with self._lock:
+            entry = None if self.refresh else self._entries.get(self._key(kind, resource))
+            if entry is None or time.time() - entry["stored_at"] > self.ttls[kind]:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, copy.deepcopy(entry["value"])
+
+    def put(self, kind: str, resource: str, value: Any) -> None:
+        """Store a result (a JSON-serialisable value) fetched just now."""
+        with self._lock:
+            self._entries[self._key(kind, resource)] = {
+                "stored_at": time.time(),
+                "value": copy.deepcopy(value),
+            }
+            self._dirty = True
+
+    def save(self) -> None:
+        """Write fresh entries back to the cache file, dropping expired ones."""
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            entries = {
+                key: entry
+                for key, entry in self._entries.items()
+                if now - entry["stored_at"] <= self.ttls.get(key.split("|")[1], 0)
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_suffix(".tmp")
+            temporary.write_text(json.dumps(entries))
+            os.replace(temporary, self.path)
+            self._dirty = False
 
 
 class GCPResourceDiscovery:
-    """Helper class for discovering GCP resources."""
+    """
+    Helper class for discovering GCP resources.
 
-    def __init__(self) -> None:
-        """Initialize GCP clients."""
-        self.logging_client = ConfigServiceV2Client()
-        self.bq_client = bigquery.Client()
-        self.org_client = resourcemanager_v3.OrganizationsClient()
+    Discovery runs on asyncio: the a* coroutines and async generators use
+    the async GAPIC clients for logging and resource manager, and gather
+    every call an operation needs at once, at most max_workers in flight.
+    BigQuery has no async client, so dataset lookups run the sync client
+    in worker threads under the same limit. The sync methods are thin
+    wrappers that drive the async ones on an event loop owned by the
+    instance (the async clients are bound to the loop they were created
+    on); call close() when done with them.
+    """
 
-    def list_organizations(self) -> list[dict[str, Any]]:
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        logging_client: Any = None,
+        bq_client: Any = None,
+        org_client: Any = None,
+        folders_client: Any = None,
+        projects_client: Any = None,
+        cache: DiscoveryCache | None = None,
+    ) -> None:
+        """
+        Initialize GCP discovery; clients not given are created on first use.
+
+        Args:
+            max_workers: Maximum concurrent API calls when enriching sinks or
+                walking the resource hierarchy
+            logging_client: ConfigServiceV2AsyncClient to use instead of a new one
+            bq_client: bigquery.Client to use instead of a new one
+            org_client: OrganizationsAsyncClient to use instead of a new one
+            folders_client: FoldersAsyncClient to use instead of a new one
+            projects_client: ProjectsAsyncClient to use instead of a new one
+            cache: Cache to serve and store organizations, sinks, children
+                and datasets; results are always fetched if None
+        """
+        self.max_workers = max(1, max_workers)
+        self.cache = cache
+        self._clients = {
+            "logging": logging_client,
+            "bigquery": bq_client,
+            "organizations": org_client,
+            "folders": folders_client,
+            "projects": projects_client,
+        }
+        self._created = set()
+        self._clients_lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+        self._executor = None
+
+    # ---------------------------
+    # CLIENTS
+    # ---------------------------
+    def _client(self, name: str) -> Any:
+        """The named client, created on first use (once, even across threads)."""
+        client = self._clients[name]
+        if client is None:
+            with self._clients_lock:
+                client = self._clients[name]
+                if client is None:
+                    client = self._clients[name] = self._new_client(name)
+                    self._created.add(name)
+        return client
+
+    def _new_client(self, name: str) -> Any:
+        # All clients share one lookup of the default credentials.
+        credentials, project = default_credentials()
+        if name == "logging":
+            from google.cloud.logging_v2.services.config_service_v2 import (
+                ConfigServiceV2AsyncClient,
+            )
+
+            return ConfigServiceV2AsyncClient(credentials=credentials)
+        if name == "bigquery":
+            from google.cloud import bigquery
+
+            return bigquery.Client(project=project, credentials=credentials)
+
+        from google.cloud import resourcemanager_v3
+
+        client_class = {
+            "organizations": resourcemanager_v3.OrganizationsAsyncClient,
+            "folders": resourcemanager_v3.FoldersAsyncClient,
+            "projects": resourcemanager_v3.ProjectsAsyncClient,
+        }[name]
+        return client_class(credentials=credentials)
+
+    @property
+    def logging_client(self) -> Any:
+        """ConfigServiceV2AsyncClient, created on first use."""
+        return self._client("logging")
+
+    @property
+    def bq_client(self) -> Any:
+        """bigquery.Client, created on first use."""
+        return self._client("bigquery")
+
+    @property
+    def org_client(self) -> Any:
+        """OrganizationsAsyncClient, created on first use."""
+        return self._client("organizations")
+
+    @property
+    def folders_client(self) -> Any:
+        """FoldersAsyncClient, created on first use."""
+        return self._client("folders")
+
+    @property
+    def projects_client(self) -> Any:
+        """ProjectsAsyncClient, created on first use."""
+        return self._client("projects")
+
+    async def aclose(self) -> None:
+        """Close the transports of the async clients this instance created."""
+        for name in sorted(self._created):
+            client = self._clients[name]
+            if name != "bigquery":
+                await client.transport.close()
+            else:
+                client.close()
+            self._clients[name] = None
+        self._created.clear()
+
+    def close(self) -> None:
+        """Close the clients this instance created, its threads and its event loop."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._loop is None:
+            return
+        self._run(self.aclose())
+        self._loop.close()
+        self._loop = None
+        self._semaphore = None
+
+    # ---------------------------
+    # EVENT LOOP
+    # ---------------------------
+    def _limit(self) -> asyncio.Semaphore:
+        """Semaphore bounding the API calls in flight to max_workers."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        return self._semaphore
+
+    def _run(self, awaitable: Awaitable) -> Any:
+        """Run a coroutine to completion on this instance's event loop."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(awaitable)
+
+    def _iterate(self, items: AsyncIterator) -> Iterator:
+        """Iterate an async generator from sync code, as its items arrive."""
+        try:
+            while True:
+                try:
+                    yield self._run(anext(items))
+                except StopAsyncIteration:
+                    return
+        finally:
+            # The caller may stop early; let the generator clean up.
+            self._run(items.aclose())
+
+    # ---------------------------
+    # CACHE
+    # ---------------------------
+    def _cached(self, kind: str, resource: str) -> tuple[bool, Any]:
+        """(True, value) when the cache answers for a resource, else (False, None)."""
+        if self.cache is None:
+            return False, None
+        found, value = self.cache.get(kind, resource)
+        if not found and self.cache.offline:
+            print(f"[offline] No cached {kind} for {resource}; run without --offline to fetch", file=sys.stderr)
+            return True, None
+        return found, value
+
+    def _store(self, kind: str, resource: str, value: Any) -> None:
+        if self.cache is not None:
+            self.cache.put(kind, resource, value)
+
+    # ---------------------------
+    # DISCOVERY (ASYNC)
+    # ---------------------------
+    async def alist_organizations(self) -> list[dict[str, Any]]:
         """
         List all GCP organizations accessible to the current credentials.
 
         Returns:
             List of organization dictionaries with id, display_name, and state
         """
-        orgs = []
+        return [org async for org in self.aiter_organizations()]
+
+    async def aiter_organizations(self) -> AsyncIterator[dict[str, Any]]:
+        """
+        Yield the GCP organizations accessible to the current credentials.
+
+        Organizations are yielded as the API's result pages arrive.
+
+        Yields:
+            Organization dictionaries with id, display_name, and state
+        """
+        found, orgs = self._cached("organizations", "*")
+        if found:
+            for org_info in orgs or []:
+                yield org_info
+            return
+
+        orgs = [] if self.cache is not None else None
         try:
+            from google.cloud import resourcemanager_v3
+
             request = resourcemanager_v3.SearchOrganizationsRequest()
-            page_result = self.org_client.search_organizations(request=request)
-
-            for org in page_result:
-                orgs.append(
-                    {
-                        "id": org.name.split("/")[-1],
-                        "display_name": org.display_name,
-                        "state": org.state.name,
-                        "full_name": org.name,
-                    }
-                )
-        except Exception as e:
-            print(f"Error listing organizations: {e}")
-            print("Make sure you have proper permissions to list organizations")
+            async with self._limit():
+                page_result = await self.org_client.search_organizations(request=request)
 
-        return orgs
+            async for org in page_result:
+                org_info = {
+                    "id": org.name.split("/")[-1],
+                    "display_name": org.display_name,
+                    "state": org.state.name,
+                    "full_name": org.name,
+                }
+                if orgs is not None:
+                    orgs.append(org_info)
+                yield org_info
+            if orgs is not None:
+                self._store("organizations", "*", orgs)
+        except Exception as e:
+            print(f"Error listing organizations: {e}", file=sys.stderr)
+            print("Make sure you have proper permissions to list organizations", file=sys.stderr)
 
-    def get_org_log_sinks(self, org_id: str) -> list[dict[str, Any]]:
+    async def aget_log_sinks(self, parent: str) -> list[dict[str, Any]]:
         """
-        Get all log sinks configured at the organization level.
+        Get all log sinks configured directly on an organization, folder or project.
 
         Args:
-            org_id: Organization ID (numeric)
+            parent: organizations/ORG_ID, folders/FOLDER_ID or projects/PROJECT_ID
 
         Returns:
             List of log sink dictionaries with details
         """
-        sinks = []
+        return [sink async for sink in self.aiter_log_sinks(parent)]
+
+    async def aiter_log_sinks(self, parent: str) -> AsyncIterator[dict[str, Any]]:
+        """
+        Yield the log sinks configured directly on an organization, folder or project.
+
+        Sinks are yielded as the API's result pages arrive.
+
+        Args:
+            parent: organizations/ORG_ID, folders/FOLDER_ID or projects/PROJECT_ID
+
+        Yields:
+            Log sink dictionaries with details
+        """
+        found, sinks = self._cached("sinks", parent)
+        if found:
+            for sink_info in sinks or []:
+                yield sink_info
+            return
+
+        sinks = [] if self.cache is not None else None
         try:
-            parent = f"organizations/{org_id}"
+            from google.cloud.logging_v2.types import ListSinksRequest
+
             request = ListSinksRequest(parent=parent)
-            page_result = self.logging_client.list_sinks(request=request)
+            async with self._limit():
+                page_result = await self.logging_client.list_sinks(request=request)
 
-            for sink in page_result:
+            async for sink in page_result:
                 sink_info = {
                     "name": sink.name,
+                    "parent": parent,
                     "destination": sink.destination,
                     "filter": sink.filter,
                     "include_children": sink.include_children,
@@ -82,13 +468,234 @@ class GCPResourceDiscovery:
                         sink_info["bq_project_id"] = parts[1]
                         sink_info["bq_dataset_id"] = parts[3]
 
-                sinks.append(sink_info)
+                if sinks is not None:
+                    sinks.append(sink_info)
+                yield sink_info
 
+            if sinks is not None:
+                self._store("sinks", parent, sinks)
         except Exception as e:
-            print(f"Error listing log sinks for org {org_id}: {e}")
-            print("Make sure you have proper permissions (roles/logging.viewer)")
+            print(f"Error listing log sinks for {parent}: {e}", file=sys.stderr)
+            print("Make sure you have proper permissions (roles/logging.viewer)", file=sys.stderr)
 
-        return sinks
+    async def _alist_children(self, kind: str, parent: str) -> list[str] | None:
+        """Names of the folders or projects directly under parent, or None on error."""
+        from google.cloud import resourcemanager_v3
+
+        try:
+            async with self._limit():
+                if kind == "folders":
+                    request = resourcemanager_v3.ListFoldersRequest(parent=parent)
+                    pager = await self.folders_client.list_folders(request=request)
+                    return [folder.name async for folder in pager]
+                request = resourcemanager_v3.ListProjectsRequest(parent=parent)
+                pager = await self.projects_client.list_projects(request=request)
+                return [f"projects/{project.project_id}" async for project in pager]
+        except Exception as e:
+            role = "resourcemanager.folderViewer" if kind == "folders" else "browser"
+            print(f"Error listing {kind} under {parent}: {e}", file=sys.stderr)
+            print(f"Make sure you have proper permissions (roles/{role})", file=sys.stderr)
+            return None
+
+    async def alist_child_parents(self, parent: str, include_projects: bool = True) -> list[str]:
+        """
+        List the folders and (optionally) projects directly under an organization or folder.
+
+        Folders and projects are listed concurrently.
+
+        Args:
+            parent: organizations/ORG_ID or folders/FOLDER_ID
+            include_projects: Also list projects, not only folders
+
+        Returns:
+            Resource names (folders/FOLDER_ID, projects/PROJECT_ID) of active children
+        """
+        resource = parent if include_projects else f"{parent} (folders)"
+        found, children = self._cached("children", resource)
+        if found:
+            return children or []
+
+        kinds = ("folders", "projects") if include_projects else ("folders",)
+        listed = await asyncio.gather(*(self._alist_children(kind, parent) for kind in kinds))
+        children = [child for names in listed for child in names or []]
+        if None not in listed:
+            self._store("children", resource, children)
+        return children
+
+    async def aget_bq_dataset_info(
+        self, project_id: str, dataset_id: str
+    ) -> dict[str, Any] | None:
+        """
+        Get detailed information about a BigQuery dataset, in a worker thread.
+
+        Args:
+            project_id: GCP project ID containing the dataset
+            dataset_id: BigQuery dataset ID
+
+        Returns:
+            Dataset information dictionary or None if not found
+        """
+        found, info = self._cached("dataset", f"{project_id}:{dataset_id}")
+        if found:
+            return info
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        async with self._limit():
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.get_bq_dataset_info, project_id, dataset_id
+            )
+
+    async def _aenrich(
+        self, sinks: list[dict[str, Any]], datasets: dict[tuple, Any]
+    ) -> None:
+        """Add bq_dataset_info to sinks, fetching each dataset not in datasets once."""
+        wanted = {
+            (sink["bq_project_id"], sink["bq_dataset_id"])
+            for sink in sinks
+            if "bq_project_id" in sink and "bq_dataset_id" in sink
+        }
+        missing = sorted(wanted - datasets.keys())
+        infos = await asyncio.gather(*(self.aget_bq_dataset_info(*d) for d in missing))
+        datasets.update(zip(missing, infos))
+        for sink in sinks:
+            info = datasets.get((sink.get("bq_project_id"), sink.get("bq_dataset_id")))
+            if info:
+                sink["bq_dataset_info"] = dict(info)
+
+    async def aiter_hierarchy_log_sinks(
+        self,
+        org_ids: list[str] | None = None,
+        cloudaudit_only: bool = False,
+        include_projects: bool = True,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Yield the log sinks of every organization, folder and project under the given orgs.
+
+        The hierarchy is walked one level at a time: the sinks and children
+        of every parent in a level (and, with cloudaudit_only, the datasets
+        of its sinks) are gathered concurrently, at most max_workers API
+        calls at a time, and the level's sinks are yielded before the next
+        level is listed.
+
+        Args:
+            org_ids: Organization IDs to walk; every accessible one if None
+            cloudaudit_only: Only yield CloudAudit sinks exporting to BigQuery,
+                enriched with their dataset details as in search_cloudaudit_sinks
+            include_projects: Also list the sinks of projects, not only of
+                organizations and folders
+
+        Yields:
+            Log sink dictionaries with details, including their parent
+        """
+        if org_ids is None:
+            org_ids = [org["id"] for org in await self.alist_organizations()]
+
+        datasets = {}  # (project_id, dataset_id) -> dataset info once fetched
+        level = [f"organizations/{org_id}" for org_id in org_ids]
+        while level:
+            containers = [parent for parent in level if not parent.startswith("projects/")]
+            sinks_per_parent, children_per_parent = await asyncio.gather(
+                asyncio.gather(*(self.aget_log_sinks(parent) for parent in level)),
+                asyncio.gather(
+                    *(self.alist_child_parents(parent, include_projects) for parent in containers)
+                ),
+            )
+            sinks = [sink for parent_sinks in sinks_per_parent for sink in parent_sinks]
+            if cloudaudit_only:
+                sinks = [sink for sink in sinks if is_cloudaudit_sink(sink)]
+                await self._aenrich(sinks, datasets)
+            for sink in sinks:
+                yield sink
+            level = [child for children in children_per_parent for child in children]
+
+    async def asearch_cloudaudit_sinks(self, org_id: str) -> list[dict[str, Any]]:
+        """
+        Search for log sinks that export CloudAudit logs to BigQuery.
+
+        Args:
+            org_id: Organization ID (numeric)
+
+        Returns:
+            List of CloudAudit log sinks that export to BigQuery with enriched information
+        """
+        return [sink async for sink in self.aiter_cloudaudit_sinks(org_id)]
+
+    async def aiter_cloudaudit_sinks(self, org_id: str) -> AsyncIterator[dict[str, Any]]:
+        """
+        Yield the log sinks that export CloudAudit logs to BigQuery, in listing order.
+
+        Sinks are enriched with their BigQuery dataset details, every
+        distinct dataset fetched once and all of them concurrently (at most
+        max_workers at a time).
+
+        Args:
+            org_id: Organization ID (numeric)
+
+        Yields:
+            CloudAudit log sinks that export to BigQuery with enriched information
+        """
+        sinks = [
+            sink
+            for sink in await self.aget_log_sinks(f"organizations/{org_id}")
+            if is_cloudaudit_sink(sink)
+        ]
+        await self._aenrich(sinks, {})
+        for sink in sinks:
+            yield sink
+
+    # ---------------------------
+    # DISCOVERY (SYNC WRAPPERS)
+    # ---------------------------
+    def list_organizations(self) -> list[dict[str, Any]]:
+        """Sync alist_organizations."""
+        return self._run(self.alist_organizations())
+
+    def iter_organizations(self) -> Iterator[dict[str, Any]]:
+        """Sync aiter_organizations."""
+        return self._iterate(self.aiter_organizations())
+
+    def get_org_log_sinks(self, org_id: str) -> list[dict[str, Any]]:
+        """
+        Get all log sinks configured at the organization level.
+
+        Args:
+            org_id: Organization ID (numeric)
+
+        Returns:
+            List of log sink dictionaries with details
+        """
+        return self.get_log_sinks(f"organizations/{org_id}")
+
+    def get_log_sinks(self, parent: str) -> list[dict[str, Any]]:
+        """Sync aget_log_sinks."""
+        return self._run(self.aget_log_sinks(parent))
+
+    def iter_log_sinks(self, parent: str) -> Iterator[dict[str, Any]]:
+        """Sync aiter_log_sinks."""
+        return self._iterate(self.aiter_log_sinks(parent))
+
+    def list_child_parents(self, parent: str, include_projects: bool = True) -> list[str]:
+        """Sync alist_child_parents."""
+        return self._run(self.alist_child_parents(parent, include_projects))
+
+    def iter_hierarchy_log_sinks(
+        self,
+        org_ids: list[str] | None = None,
+        cloudaudit_only: bool = False,
+        include_projects: bool = True,
+    ) -> Iterator[dict[str, Any]]:
+        """Sync aiter_hierarchy_log_sinks."""
+        return self._iterate(
+            self.aiter_hierarchy_log_sinks(org_ids, cloudaudit_only, include_projects)
+        )
+
+    def search_cloudaudit_sinks(self, org_id: str) -> list[dict[str, Any]]:
+        """Sync asearch_cloudaudit_sinks."""
+        return self._run(self.asearch_cloudaudit_sinks(org_id))
+
+    def iter_cloudaudit_sinks(self, org_id: str) -> Iterator[dict[str, Any]]:
+        """Sync aiter_cloudaudit_sinks."""
+        return self._iterate(self.aiter_cloudaudit_sinks(org_id))
 
     def get_bq_dataset_info(
         self, project_id: str, dataset_id: str
@@ -96,6 +703,9 @@ class GCPResourceDiscovery:
         """
         Get detailed information about a BigQuery dataset.
 
+        Uses the sync BigQuery client directly; aget_bq_dataset_info runs
+        this in a worker thread.
+
         Args:
             project_id: GCP project ID containing the dataset
             dataset_id: BigQuery dataset ID
@@ -103,11 +713,17 @@ class GCPResourceDiscovery:
         Returns:
             Dataset information dictionary or None if not found
         """
+        found, info = self._cached("dataset", f"{project_id}:{dataset_id}")
+        if found:
+            return info
+
         try:
+            from google.cloud import bigquery
+
             dataset_ref = bigquery.DatasetReference(project_id, dataset_id)
             dataset = self.bq_client.get_dataset(dataset_ref)
 
-            return {
+            info = {
                 "project_id": project_id,
                 "dataset_id": dataset_id,
                 "location": dataset.location,
@@ -119,52 +735,23 @@ class GCPResourceDiscovery:
                 "full_dataset_id": dataset.full_dataset_id,
                 "labels": dict(dataset.labels) if dataset.labels else {},
             }
+            self._store("dataset", f"{project_id}:{dataset_id}", info)
+            return info
         except Exception as e:
             # Gracefully handle missing datasets or access issues
             error_msg = str(e).lower()
             if "not found" in error_msg or "404" in error_msg:
                 print(
-                    f"[Fetching BigQuery dataset metadata] ⚠️  Dataset not found or no access: {project_id}:{dataset_id}"
+                    f"[Fetching BigQuery dataset metadata] ⚠️  Dataset not found or no access: {project_id}:{dataset_id}",
+                    file=sys.stderr,
                 )
                 print(
-                    "   This may be normal if the project is in a different organization"
+                    "   This may be normal if the project is in a different organization",
+                    file=sys.stderr,
                 )
             else:
                 print(
-                    f"[Fetching BigQuery dataset metadata] Error getting dataset info for {project_id}:{dataset_id}: {e}"
+                    f"[Fetching BigQuery dataset metadata] Error getting dataset info for {project_id}:{dataset_id}: {e}",
+                    file=sys.stderr,
                 )
             return None
-
-    def search_cloudaudit_sinks(self, org_id: str) -> list[dict[str, Any]]:
-        """
-        Search for log sinks that export CloudAudit logs to BigQuery.
-
-        Args:
-            org_id: Organization ID (numeric)
-
-        Returns:
-            List of CloudAudit log sinks that export to BigQuery with enriched information
-        """
-        all_sinks = self.get_org_log_sinks(org_id)
-        cloudaudit_sinks = []
-
-        for sink in all_sinks:
-            # Only include BigQuery destinations (exclude Cloud Logging buckets like _Required, _Default)
-            destination = sink.get("destination", "")
-            if "bigquery.googleapis.com" not in destination:
-                continue
-
-            # Check if sink filter includes CloudAudit logs
-            filter_str = sink.get("filter", "").lower()
-            if "cloudaudit" in filter_str or "logs/activity" in filter_str:
-                # Enrich with BigQuery dataset details if available
-                if "bq_project_id" in sink and "bq_dataset_id" in sink:
-                    bq_info = self.get_bq_dataset_info(
-                        sink["bq_project_id"], sink["bq_dataset_id"]
-                    )
-                    if bq_info:
-                        sink["bq_dataset_info"] = bq_info
-
-                cloudaudit_sinks.append(sink)
-
-        return cloudaudit_sinks
@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The function source in code/ is flat modules imported by name, and so are
+# the fakes in scripts/.
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+sys.path.insert(0, str(ROOT / "code"))
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    """Required settings for modules that read them; nothing talks to GCP."""
+    monkeypatch.setenv("PROJECT_ID", "test-project")
+    monkeypatch.setenv("DATASET_ID", "test_dataset")
+    monkeypatch.setenv("LOCATION", "US")
+    monkeypatch.setenv("TELEMETRY_EXPORTERS", "")
+
+
+class FakeBlob:
+    """A GCS object in objects (name -> (data, generation)), with generation checks."""
+
+    def __init__(self, objects: dict, name: str):
+        self.objects = objects
+        self.name = name
+        self.generation = None
+
+    def download_as_bytes(self):
+        from google.api_core.exceptions import NotFound
+
+        if self.name not in self.objects:
+            raise NotFound(self.name)
+        data, self.generation = self.objects[self.name]
+        return data
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None):
+        from google.api_core.exceptions import PreconditionFailed
+
+        current = self.objects.get(self.name, (None, 0))[1]
+        if if_generation_match is not None and if_generation_match != current:
+            raise PreconditionFailed(f"{self.name}: generation {current}")
+        self.generation = current + 1
+        self.objects[self.name] = (data, self.generation)
+
+
+@pytest.fixture
+def gcs(monkeypatch):
+    """gs:// state files for IndexStore, held in a dict of object name to (data, generation)."""
+    import dedup
+
+    objects = {}
+    monkeypatch.setattr(dedup.IndexStore, "_blob", lambda self, path: FakeBlob(objects, path))
+    return objects
@@ -0,0 +1,62 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cache import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_run():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def provision():
+        runs.append(1)
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        leader = executor.submit(flight.do, "dataset", provision)
+        while not runs:
+            time.sleep(0.001)
+        followers = [executor.submit(flight.do, "dataset", provision) for _ in range(4)]
+        time.sleep(0.05)
+        assert flight.in_flight() == 1
+        release.set()
+
+    assert leader.result() == ("result", False)
+    assert [f.result() for f in followers] == [("result", True)] * 4
+    assert len(runs) == 1
+    assert flight.in_flight() == 0
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flight = SingleFlight()
+
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
+    assert flight.do("a", lambda: 3) == (3, False)
+
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("quota")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, "dataset", fail)
+        while not flight.in_flight():
+            time.sleep(0.001)
+        follower = executor.submit(flight.do, "dataset", fail)
+        time.sleep(0.05)
+        release.set()
+
+    for future in (leader, follower):
+        with pytest.raises(RuntimeError):
+            future.result()
+    assert flight.do("dataset", lambda: "ok") == ("ok", False)
@@ -0,0 +1,125 @@
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pytest
+
+import config
+from changes import _SNAPSHOT_SCHEMA, ChangeTracker
+from dedup import IndexStore
+
+
+@pytest.fixture
+def table_config():
+    return next(c for c in config.TABLE_CONFIGS if c["table_id"] == "os_linux_cron")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return IndexStore(str(tmp_path), _SNAPSHOT_SCHEMA)
+
+
+def scan_time(hour):
+    return datetime(2026, 1, 1, hour, tzinfo=timezone.utc)
+
+
+def rows(hour, items, schedule="@daily", instance_id="i-1"):
+    return [
+        {
+            "client_instance_id": instance_id,
+            "client_account_id": "acct",
+            "scan_time_timestamp": scan_time(hour),
+            "file_path": f"/etc/cron.d/job{n}",
+            "command": f"run {n}",
+            "schedule": schedule,
+        }
+        for n in items
+    ]
+
+
+def ingest(table_config, store, *batches):
+    """One ingest call: observe every batch, then return and commit the changes."""
+    tracker = ChangeTracker(table_config, store)
+    for batch in batches:
+        tracker.observe(pa.RecordBatch.from_pylist(batch))
+    changes = tracker.finish()
+    tracker.commit()
+    return changes
+
+
+def summary(changes):
+    return sorted((c["change_type"], c["item_key"]) for c in changes)
+
+
+def key(n):
+    return f'["/etc/cron.d/job{n}","run {n}"]'
+
+
+def test_first_scan_reports_every_item_added(table_config, store):
+    changes = ingest(table_config, store, rows(1, range(3)))
+
+    assert summary(changes) == [("ADDED", key(n)) for n in range(3)]
+    assert {c["scan_time_timestamp"] for c in changes} == {scan_time(1)}
+    assert {c["previous_scan_time_timestamp"] for c in changes} == {None}
+    assert {c["client_account_id"] for c in changes} == {"acct"}
+
+
+def test_next_scan_reports_modified_now_and_removed_when_it_is_complete(table_config, store):
+    ingest(table_config, store, rows(1, range(3)))
+
+    changes = ingest(table_config, store, rows(2, [0]), rows(2, [1], schedule="@hourly"))
+    assert summary(changes) == [("MODIFIED", key(1))]
+    assert changes[0]["previous_scan_time_timestamp"] == scan_time(1)
+
+    # Item 2 is only known to be gone once scan 2 is followed by scan 3.
+    changes = ingest(table_config, store, rows(3, [0]), rows(3, [1], schedule="@hourly"))
+    assert summary(changes) == [("REMOVED", key(2))]
+    assert changes[0]["scan_time_timestamp"] == scan_time(2)
+
+
+def test_scan_split_across_calls_is_merged(table_config, store):
+    assert len(ingest(table_config, store, rows(1, range(4)))) == 4
+    assert summary(ingest(table_config, store, rows(1, range(4, 6)))) == [
+        ("ADDED", key(4)),
+        ("ADDED", key(5)),
+    ]
+
+    # The same, unchanged items sent in two calls of the next scan.
+    assert ingest(table_config, store, rows(2, range(3))) == []
+    assert ingest(table_config, store, rows(2, range(3, 5))) == []
+    assert summary(ingest(table_config, store, rows(3, range(5)))) == [("REMOVED", key(5))]
+
+
+def test_resent_and_older_rows_are_ignored(table_config, store):
+    ingest(table_config, store, rows(2, range(2)))
+
+    assert ingest(table_config, store, rows(2, range(2))) == []
+    assert ingest(table_config, store, rows(1, range(5))) == []
+
+
+def test_instances_are_tracked_separately(table_config, store):
+    changes = ingest(
+        table_config, store, rows(1, [0], instance_id="i-1") + rows(1, [0], instance_id="i-2")
+    )
+    assert sorted(c["client_instance_id"] for c in changes) == ["i-1", "i-2"]
+
+    ingest(table_config, store, rows(2, [], instance_id="i-1") + rows(2, [0], instance_id="i-2"))
+    changes = ingest(table_config, store, rows(3, [0], instance_id="i-2"))
+    assert changes == []
+
+
+def test_concurrent_calls_for_one_scan_are_merged(table_config, gcs):
+    gcs_store = IndexStore("gs://bucket/changes", _SNAPSHOT_SCHEMA)
+    ingest(table_config, gcs_store, rows(1, range(3)))
+
+    # Two calls carrying halves of scan 2 read the same snapshot, then both commit.
+    first = ChangeTracker(table_config, IndexStore("gs://bucket/changes", _SNAPSHOT_SCHEMA))
+    second = ChangeTracker(table_config, IndexStore("gs://bucket/changes", _SNAPSHOT_SCHEMA))
+    first.observe(pa.RecordBatch.from_pylist(rows(2, [0])))
+    second.observe(pa.RecordBatch.from_pylist(rows(2, [1, 3])))
+    assert summary(first.finish() + second.finish()) == [("ADDED", key(3))]
+    first.commit()
+    second.commit()
+
+    # Only item 2 is gone from scan 2, and no item is reported added twice.
+    changes = ingest(table_config, gcs_store, rows(3, [0, 1, 3]))
+    assert summary(changes) == [("REMOVED", key(2))]
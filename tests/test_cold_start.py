@@ -0,0 +1,25 @@
+import json
+
+from bench_cold_start import _run, import_time_us
+
+# Importing main.py on a runtime that has already loaded the Functions
+# Framework; measured at under 10 ms, so this only trips on a real regression.
+IMPORT_MAIN_BUDGET_MS = 100
+
+HEAVY_MODULES = ("google.cloud.bigquery", "google.cloud.storage", "pyarrow", "requests")
+
+
+def test_importing_main_stays_within_the_startup_budget():
+    # Fastest of a few fresh interpreters, so a busy machine does not fail it.
+    fastest_us = min(import_time_us("main", preload="functions_framework") for _ in range(3))
+
+    assert fastest_us / 1000 <= IMPORT_MAIN_BUDGET_MS
+
+
+def test_importing_main_defers_client_libraries():
+    loaded = _run(
+        "import json, sys, functions_framework, main; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    ).stdout
+
+    assert json.loads(loaded) == []
@@ -0,0 +1,90 @@
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pytest
+
+import config
+from dedup import Deduplicator, IndexStore
+
+
+@pytest.fixture
+def table_config():
+    return next(c for c in config.TABLE_CONFIGS if c["table_id"] == "os_linux_dirlist")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return IndexStore(str(tmp_path))
+
+
+def batch(files, instance_id="i-1"):
+    scan_time = datetime.now(timezone.utc)
+    return pa.RecordBatch.from_pylist(
+        [
+            {
+                "client_instance_id": instance_id,
+                "file_path": f"/bin/{name}",
+                "sha256_sum": f"hash-{name}",
+                "last_modified_time_epoch_utc": 1.0,
+                "scan_time_timestamp": scan_time,
+            }
+            for name in files
+        ]
+    )
+
+
+def paths(filtered):
+    return filtered.column("file_path").to_pylist()
+
+
+def test_drops_keys_written_by_an_earlier_run(table_config, store):
+    first = Deduplicator(table_config, store)
+    first.filter(batch(["ls", "cat"]))
+    first.commit()
+
+    filtered, dropped = Deduplicator(table_config, store).filter(batch(["ls", "cat", "sh"]))
+    assert paths(filtered) == ["/bin/sh"]
+    assert dropped == 2
+
+
+def test_drops_keys_written_earlier_in_the_same_run(table_config, store):
+    dedup = Deduplicator(table_config, store)
+
+    filtered, dropped = dedup.filter(batch(["ls", "cat", "ls"]))
+    assert paths(filtered) == ["/bin/ls", "/bin/cat"]
+    assert dropped == 1
+
+    filtered, dropped = dedup.filter(batch(["cat", "sh"]))
+    assert paths(filtered) == ["/bin/sh"]
+    assert dropped == 1
+
+    dedup.commit()
+    assert store.read(table_config["table_id"], "i-1").num_rows == 3
+
+
+def test_instances_are_deduplicated_separately(table_config, store):
+    dedup = Deduplicator(table_config, store)
+    dedup.filter(batch(["ls"], instance_id="i-1"))
+
+    rows = [*batch(["ls"], "i-1").to_pylist(), *batch(["ls"], "i-2").to_pylist()]
+    filtered, dropped = dedup.filter(pa.RecordBatch.from_pylist(rows))
+    assert filtered.column("client_instance_id").to_pylist() == ["i-2"]
+    assert dropped == 1
+
+
+def test_concurrent_commits_for_one_instance_keep_every_key(table_config, gcs):
+    first = Deduplicator(table_config, IndexStore("gs://bucket/dedup"))
+    second = Deduplicator(table_config, IndexStore("gs://bucket/dedup"))
+    first.filter(batch(["ls", "cat"]))
+    second.filter(batch(["sh", "ls"]))
+
+    first.commit()
+    second.commit()
+
+    (path,) = gcs
+    assert gcs[path][1] == 2
+    filtered, dropped = Deduplicator(table_config, IndexStore("gs://bucket/dedup")).filter(
+        batch(["ls", "cat", "sh", "vi"])
+    )
+    assert paths(filtered) == ["/bin/vi"]
+    assert dropped == 3
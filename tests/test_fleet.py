@@ -0,0 +1,36 @@
+import pytest
+
+from fleet import parse_targets
+
+
+def test_targets_are_normalised_and_deduplicated():
+    targets = parse_targets(
+        {
+            "targets": [
+                {"project": "p", "dataset": "d", "retention_overrides": {"os_linux_auth": "short"}},
+                {"project": "p", "dataset_id": "d"},
+            ]
+        }
+    )
+
+    (target,) = targets
+    assert (target["project"], target["dataset_id"], target["location"]) == ("p", "d", "")
+    tiers = {c["table_id"]: c["retention_tier"] for c in target["table_configs"]}
+    assert tiers["os_linux_auth"] == "short"
+
+
+@pytest.mark.parametrize(
+    "target",
+    [
+        {"project": "p"},
+        {"project": ["p"], "dataset_id": "d"},
+        {"project": "p", "dataset_id": "d", "retention_tiers": ["short"]},
+        {"project": "p", "dataset_id": "d", "retention_tiers": "short"},
+        {"project": "p", "dataset_id": "d", "retention_overrides": [["os_linux_auth", "short"]]},
+        {"project": "p", "dataset_id": "d", "retention_overrides": {"os_linux_auth": ["short"]}},
+        {"project": "p", "dataset_id": "d", "retention_tiers": {"short": "3"}},
+    ],
+)
+def test_malformed_targets_are_rejected_with_value_error(target):
+    with pytest.raises(ValueError):
+        parse_targets([target])
@@ -0,0 +1,241 @@
+import pytest
+from google.api_core import exceptions
+from google.cloud import bigquery
+
+import provisioner
+import throttle
+from fake_bigquery import FakeBigQueryClient
+from provisioner import plan_table, plan_tables, provision_table, provision_tables, summarize_plans
+from schema import HASH_LABEL, Field, definition_hash
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+TABLE = {
+    "table_id": "provisioner_test",
+    "partition_column": "seen",
+    "partition_type": "DAY",
+    "clustering_columns": ["account", "name"],
+    "expiration_ms": 7 * DAY_MS,
+    "schema": [
+        Field("account", "STRING"),
+        Field("name", "STRING"),
+        Field("seen", "TIMESTAMP"),
+    ],
+}
+
+
+OTHER = {**TABLE, "table_id": "provisioner_other", "clustering_columns": ["name"]}
+
+
+@pytest.fixture
+def bq(monkeypatch):
+    """Fake client on a fresh metadata cache and throttle, retrying without delay."""
+    monkeypatch.setattr(provisioner, "_metadata_cache", provisioner.TTLCache())
+    monkeypatch.setattr(throttle, "_buckets", {})
+    monkeypatch.setattr(throttle, "BACKOFF_BASE", 0.0)
+    return FakeBigQueryClient(project="test-project")
+
+
+def seed(bq, table):
+    with bq.faults_disabled():
+        bq.create_table(table)
+    bq.reset_stats()
+
+
+def provision(bq, table_configs=(TABLE, OTHER), **kwargs):
+    kwargs.setdefault("max_workers", 2)
+    results = provision_tables(bq, "test_dataset", list(table_configs), **kwargs)
+    assert {r["status"] for r in results} == {"success"}
+    return [r["action"] for r in results]
+
+
+def live_table(table_config=TABLE, schema=None, clustering=None, expiration_ms=None, labels=None):
+    """A bigquery.Table as the API returns it for table_config, with overrides."""
+    return bigquery.Table.from_api_repr(
+        {
+            "tableReference": {
+                "projectId": "test-project",
+                "datasetId": "test_dataset",
+                "tableId": table_config["table_id"],
+            },
+            "schema": {
+                "fields": [f.to_api_repr() for f in schema or table_config["schema"]]
+            },
+            "timePartitioning": {
+                "type": table_config["partition_type"],
+                "field": table_config["partition_column"],
+                "expirationMs": str(expiration_ms or table_config["expiration_ms"]),
+            },
+            "clustering": {"fields": clustering or table_config["clustering_columns"]},
+            "labels": labels or {},
+        }
+    )
+
+
+def test_missing_table_is_created():
+    assert plan_table(TABLE)["action"] == "create"
+
+
+def test_missing_column_is_patched():
+    plan = plan_table(TABLE, live_table(schema=TABLE["schema"][:2]))
+
+    assert plan["action"] == "patch"
+    assert plan["missing_fields"] == ["seen"]
+    assert plan["incompatible_fields"] == []
+
+
+def test_incompatible_drift_is_reported_but_not_applied():
+    schema = [Field("account", "INT64"), *TABLE["schema"][1:]]
+    plan = plan_table(TABLE, live_table(schema=schema))
+
+    assert plan["action"] == "noop"
+    assert plan["incompatible_fields"] == ["account: type INTEGER != STRING"]
+
+
+def test_matching_table_is_stamped_once():
+    plan = plan_table(TABLE, live_table())
+    assert plan["action"] == "stamp"
+
+    labels = {HASH_LABEL: plan["config_hash"]}
+    assert plan_table(TABLE, live_table(labels=labels))["action"] == "noop"
+
+
+def test_current_hash_label_skips_the_diff_unless_forced():
+    labels = {HASH_LABEL: definition_hash(TABLE)}
+    table = live_table(schema=TABLE["schema"][:2], labels=labels)
+
+    assert plan_table(TABLE, table)["action"] == "noop"
+    assert plan_table(TABLE, table, force=True)["missing_fields"] == ["seen"]
+
+
+def test_stale_hash_label_is_rechecked():
+    old = {**TABLE, "schema": TABLE["schema"][:2]}
+    table = live_table(schema=old["schema"], labels={HASH_LABEL: definition_hash(old)})
+
+    assert plan_table(TABLE, table)["action"] == "patch"
+
+
+def test_run_creates_then_only_lists(bq):
+    assert provision(bq) == ["created", "created"]
+    assert bq.calls["create_table"] == 2
+
+    bq.reset_stats()
+    assert provision(bq, use_cache=False) == ["unchanged", "unchanged"]
+    assert bq.calls == {"list_tables": 1}
+
+
+def test_drifted_table_is_patched_and_stamped(bq):
+    seed(bq, live_table(schema=TABLE["schema"][:2], expiration_ms=DAY_MS))
+
+    assert provision(bq, [TABLE]) == ["patched"]
+    table = bq.get_table("test_dataset.provisioner_test")
+    assert [f.name for f in table.schema] == ["account", "name", "seen"]
+    assert table.time_partitioning.expiration_ms == TABLE["expiration_ms"]
+    assert table.labels == {HASH_LABEL: definition_hash(TABLE)}
+
+
+def test_matching_table_is_stamped_then_skipped(bq):
+    seed(bq, live_table())
+
+    assert provision(bq, [TABLE]) == ["stamped"]
+    assert bq.calls["update_table"] == 1
+
+    bq.reset_stats()
+    assert provision(bq, [TABLE], use_cache=False) == ["unchanged"]
+    assert bq.calls == {"list_tables": 1}
+
+
+def test_clustering_waits_for_recluster(bq):
+    seed(bq, live_table(clustering=["name"]))
+
+    (result,) = provision_tables(bq, "test_dataset", [TABLE])
+    assert result["action"] == "stamped"
+    assert result["deferred_options"] == {
+        "clustering_columns": {"live": ["name"], "desired": ["account", "name"]}
+    }
+    assert bq.get_table("test_dataset.provisioner_test").clustering_fields == ["name"]
+
+    assert provision(bq, [TABLE], recluster=True) == ["patched"]
+    assert bq.get_table("test_dataset.provisioner_test").clustering_fields == ["account", "name"]
+    assert provision(bq, [TABLE], recluster=True) == ["unchanged"]
+
+
+def test_verified_metadata_is_cached_for_the_same_configs(bq):
+    provision(bq)
+    provision(bq)
+
+    bq.reset_stats()
+    assert provision(bq) == ["unchanged", "unchanged"]
+    assert sum(bq.calls.values()) == 0
+
+    # Another retention policy, or force, is checked against BigQuery.
+    assert provision(bq, [TABLE], force=True) == ["unchanged"]
+    assert bq.calls["list_tables"] == 1
+    assert provision(bq, [{**TABLE, "expiration_ms": DAY_MS}]) == ["patched"]
+    assert bq.calls["list_tables"] == 2
+
+
+def test_declared_descriptions_are_written_to_existing_columns(bq):
+    seed(bq, live_table(labels={HASH_LABEL: definition_hash(TABLE)}))
+    described = [Field("account", "STRING", description="Client account"), *TABLE["schema"][1:]]
+    table_config = {**TABLE, "schema": described}
+
+    (result,) = provision_tables(bq, "test_dataset", [table_config])
+    assert result["action"] == "patched"
+    assert result["described_fields"] == ["account"]
+    schema = bq.get_table("test_dataset.provisioner_test").schema
+    assert schema[0].description == "Client account"
+    assert provision(bq, [table_config], force=True) == ["unchanged"]
+
+
+def test_table_changed_since_it_was_read_is_reread_and_replanned(bq):
+    seed(bq, live_table(schema=TABLE["schema"][:2]))
+    stale = bq.get_table("test_dataset.provisioner_test")
+    with bq.faults_disabled():
+        bq.update_table(live_table(labels={"owner": "someone"}), ["labels"])
+    bq.reset_stats()
+
+    result = provision_table(bq, "test_dataset", TABLE, stale)
+    assert result["action"] == "patched"
+    assert bq.calls == {"update_table": 2, "get_table": 1}
+    assert bq.get_table("test_dataset.provisioner_test").labels["owner"] == "someone"
+
+
+def test_injected_backend_errors_and_rate_limits_are_retried(bq, monkeypatch):
+    monkeypatch.setenv("THROTTLE_MAX_ATTEMPTS", "20")
+    bq.error_rate = bq.rate_limit_rate = 0.3
+    bq._random.seed(3)
+
+    assert provision(bq, max_workers=1) == ["created", "created"]
+    assert bq.injected["backendError"] and bq.injected["rateLimitExceeded"]
+
+
+@pytest.mark.parametrize(
+    "error, retryable",
+    [
+        (exceptions.Forbidden("denied", errors=[{"reason": "accessDenied"}]), False),
+        (exceptions.ServiceUnavailable("backend error"), True),
+    ],
+)
+def test_unreadable_table_fails_alone(bq, monkeypatch, error, retryable):
+    monkeypatch.setenv("THROTTLE_MAX_ATTEMPTS", "1")
+    seed(bq, live_table())
+    seed(bq, live_table(OTHER))
+    get_table = bq.get_table
+
+    def fail_one(table, **kwargs):
+        if str(table).endswith(TABLE["table_id"]):
+            raise error
+        return get_table(table, **kwargs)
+
+    monkeypatch.setattr(bq, "get_table", fail_one)
+
+    failed, stamped = provision_tables(bq, "test_dataset", [TABLE, OTHER])
+    assert (failed["status"], failed["retryable"]) == ("error", retryable)
+    assert (stamped["status"], stamped["action"]) == ("success", "stamped")
+
+    failed, planned = plan_tables(bq, "test_dataset", [TABLE, OTHER], force=True)
+    assert (failed["action"], failed["retryable"]) == ("error", retryable)
+    assert planned["action"] == "noop"
+    summary = summarize_plans([failed, planned])
+    assert (summary["errors"], summary["changes_pending"]) == (1, False)
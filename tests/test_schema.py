@@ -0,0 +1,104 @@
+from google.cloud import bigquery
+
+from schema import Field, definition_hash, diff_descriptions, diff_schema, merge_schema
+
+
+def live(*fields):
+    return [bigquery.SchemaField.from_api_repr(f.to_api_repr()) for f in fields]
+
+
+OWNER = Field("owner", "RECORD", fields=[Field("uid", "INT64"), Field("user", "STRING")])
+
+
+def test_matching_schemas_differ_in_nothing_despite_type_aliases():
+    desired = [Field("size", "INT64"), Field("ok", "BOOL"), OWNER]
+    current = live(Field("size", "INTEGER"), Field("OK", "BOOLEAN"), OWNER)
+
+    assert diff_schema(desired, current) == ([], [])
+
+
+def test_missing_columns_and_sub_fields_can_be_added():
+    desired = [Field("name", "STRING"), Field("path", "STRING"), OWNER]
+    current = live(Field("name", "STRING"), Field("owner", "RECORD", fields=[Field("uid", "INT64")]))
+
+    assert diff_schema(desired, current) == (["path", "owner.user"], [])
+
+
+def test_type_mode_and_required_differences_are_incompatible():
+    desired = [
+        Field("size", "INT64"),
+        Field("tags", "STRING", mode="REPEATED"),
+        Field("id", "STRING", mode="REQUIRED"),
+    ]
+    current = live(Field("size", "STRING"), Field("tags", "STRING"))
+
+    missing, incompatible = diff_schema(desired, current)
+    assert missing == []
+    assert incompatible == [
+        "size: type STRING != INTEGER",
+        "tags: mode NULLABLE != REPEATED",
+        "id: REQUIRED column cannot be added",
+    ]
+
+
+def test_merge_keeps_live_columns_in_place_and_appends_missing_ones():
+    desired = [Field("path", "STRING"), OWNER, Field("name", "STRING")]
+    current = live(
+        Field("name", "STRING", description="kept"),
+        Field("owner", "RECORD", fields=[Field("user", "STRING")]),
+        Field("legacy", "STRING"),
+    )
+
+    merged = merge_schema(desired, current)
+    assert [f.name for f in merged] == ["name", "owner", "legacy", "path"]
+    assert merged[0].description == "kept"
+    assert [f.name for f in merged[1].fields] == ["user", "uid"]
+    assert diff_schema(desired, merged) == ([], [])
+
+
+def test_declared_descriptions_are_diffed_and_merged():
+    desired = [
+        Field("name", "STRING", description="File name"),
+        Field("owner", "RECORD", fields=[Field("uid", "INT64", description="User id")]),
+        Field("size", "INT64"),
+    ]
+    current = live(
+        Field("name", "STRING", description="old"),
+        Field("owner", "RECORD", fields=[Field("uid", "INT64")]),
+        Field("size", "INT64", description="set elsewhere"),
+    )
+
+    assert diff_descriptions(desired, current) == ["name", "owner.uid"]
+    merged = merge_schema(desired, current)
+    assert diff_descriptions(desired, merged) == []
+    assert merged[2].description == "set elsewhere"
+
+
+TABLE = {
+    "table_id": "hash_test",
+    "partition_column": "seen",
+    "clustering_columns": ["account"],
+    "expiration_ms": 86400000,
+    "schema": [Field("account", "STRING"), Field("seen", "TIMESTAMP")],
+}
+
+
+def test_definition_hash_ignores_spelling_and_defaults_and_fits_a_label():
+    schema = [Field("account", "string"), Field("seen", "TIMESTAMP", mode="nullable")]
+
+    assert definition_hash({**TABLE, "schema": schema}) == definition_hash(TABLE)
+    assert definition_hash({**TABLE, "partition_type": "DAY"}) == definition_hash(TABLE)
+    assert len(definition_hash(TABLE)) <= 63
+
+
+def test_definition_hash_changes_with_everything_applied():
+    variants = [
+        {**TABLE, "schema": [*TABLE["schema"], Field("name", "STRING")]},
+        {**TABLE, "partition_type": "HOUR"},
+        {**TABLE, "clustering_columns": ["seen"]},
+        {**TABLE, "expiration_ms": 0},
+    ]
+
+    hashes = {definition_hash(v) for v in variants}
+    assert len(hashes) == len(variants)
+    assert definition_hash(TABLE) not in hashes
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+import telemetry
+
+
+@pytest.fixture
+def exporter():
+    exporter = telemetry.InMemoryExporter()
+    telemetry.set_exporters([exporter])
+    yield exporter
+    telemetry.set_exporters([])
+
+
+def test_spans_nest_and_share_a_trace(exporter):
+    with telemetry.span("invocation", table_count=2) as root:
+        with telemetry.span("table", table_id="a") as child:
+            assert telemetry.current_span() is child
+        assert telemetry.current_span() is root
+    assert telemetry.current_span() is None
+
+    (table,) = exporter.named("table")
+    (invocation,) = exporter.named("invocation")
+    assert table.parent is invocation
+    assert table.trace_id == invocation.trace_id
+    assert table.attributes == {"table_id": "a"}
+    assert table.to_dict()["parent_span_id"] == invocation.span_id
+    # Children finish, and are exported, before their parent.
+    assert exporter.spans == [table, invocation]
+
+
+def test_child_durations_add_up_in_ancestor_timings(exporter):
+    with telemetry.span("invocation"):
+        with telemetry.span("table"):
+            for _ in range(2):
+                with telemetry.span("get_table"):
+                    time.sleep(0.01)
+            telemetry.current_span().add_time("throttle", 5.0)
+
+    (table,) = exporter.named("table")
+    (invocation,) = exporter.named("invocation")
+    calls = exporter.named("get_table")
+    assert len(calls) == 2
+    assert table.timings["get_table"] == pytest.approx(sum(s.duration_ms for s in calls))
+    assert invocation.timings["get_table"] == table.timings["get_table"]
+    assert invocation.timings["throttle"] == 5.0
+    assert invocation.timings["table"] == table.duration_ms
+    assert table.duration_ms >= 20
+    assert table.breakdown()["throttle_ms"] == 5.0
+
+
+def test_errors_are_recorded_and_reraised(exporter):
+    with pytest.raises(ValueError):
+        with telemetry.span("table"):
+            raise ValueError("boom")
+
+    (table,) = exporter.named("table")
+    assert table.error == "ValueError: boom"
+    assert table.duration_ms is not None
+
+
+def _run_in_thread(fn):
+    worker = threading.Thread(target=fn)
+    worker.start()
+    worker.join()
+
+
+def _timed(name):
+    def run():
+        with telemetry.span(name):
+            pass
+
+    return run
+
+
+def test_propagate_nests_worker_thread_spans(exporter):
+    with telemetry.span("invocation") as root:
+        _run_in_thread(telemetry.propagate(_timed("x")))
+        _run_in_thread(_timed("y"))
+
+    assert exporter.named("x")[0].parent is root
+    assert exporter.named("y")[0].parent is None
+    assert "x" in root.timings and "y" not in root.timings
+
+
+def test_record_counts_a_phase_measured_before_tracing(exporter):
+    started = time.perf_counter()
+    with telemetry.span("invocation") as root:
+        telemetry.record("import", started, started + 0.25)
+
+    (phase,) = exporter.named("import")
+    assert phase.parent is root
+    assert phase.duration_ms == pytest.approx(250.0)
+    assert root.timings["import"] == pytest.approx(250.0)
+
+
+def test_metrics_keep_per_name_and_per_table_stats(exporter):
+    before = telemetry.METRICS.snapshot()["spans"].get("metrics_test", {}).get("count", 0)
+    for table_id in ("a", "a", "b"):
+        with telemetry.span("metrics_test", table_id=table_id):
+            pass
+
+    spans = telemetry.METRICS.snapshot()["spans"]
+    assert spans["metrics_test"]["count"] == before + 3
+    assert spans["metrics_test:a"]["count"] == 2
+    assert spans["metrics_test:b"]["count"] == 1
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("0af7651916cd43dd8448eb211c80319c/123;o=1", "0af7651916cd43dd8448eb211c80319c"),
+        (
+            "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01",
+            "0af7651916cd43dd8448eb211c80319c",
+        ),
+        ("not-a-trace", None),
+        (None, None),
+    ],
+)
+def test_trace_id_from_header(header, expected):
+    assert telemetry.trace_id_from_header(header) == expected
@@ -0,0 +1,91 @@
+import pytest
+from google.api_core import exceptions
+
+import throttle
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(throttle, "_buckets", {})
+    monkeypatch.setattr(throttle, "BACKOFF_BASE", 0.0)
+    monkeypatch.setenv("THROTTLE_MAX_ATTEMPTS", "3")
+
+
+def flaky(*errors, result="ok"):
+    """A client method failing with each error in turn, then returning result."""
+    pending = list(errors)
+    calls = []
+
+    def get_table(*args, **kwargs):
+        calls.append(kwargs)
+        if pending:
+            raise pending.pop(0)
+        return result
+
+    get_table.calls = calls
+    return get_table
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        exceptions.TooManyRequests("slow down"),
+        exceptions.ServiceUnavailable("backend error"),
+        exceptions.Forbidden("quota", errors=[{"reason": "rateLimitExceeded"}]),
+        ConnectionError("reset"),
+    ],
+)
+def test_retryable_errors_are_retried(error):
+    fn = flaky(error, error)
+
+    assert throttle.call("read", "p", fn, "p.d.t") == "ok"
+    assert len(fn.calls) == 3
+    # The client library's own retry is turned off.
+    assert fn.calls[0] == {"retry": None}
+
+
+def test_last_error_is_raised_once_attempts_run_out():
+    fn = flaky(*[exceptions.InternalServerError("boom")] * 3)
+
+    with pytest.raises(exceptions.InternalServerError):
+        throttle.call("read", "p", fn)
+    assert len(fn.calls) == 3
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        exceptions.NotFound("gone"),
+        exceptions.Forbidden("denied", errors=[{"reason": "accessDenied"}]),
+        exceptions.PreconditionFailed("etag"),
+    ],
+)
+def test_other_errors_are_raised_at_once(error):
+    fn = flaky(error)
+
+    with pytest.raises(type(error)):
+        throttle.call("update", "p.d.t", fn)
+    assert len(fn.calls) == 1
+    assert not throttle.is_retryable(error)
+
+
+def test_bucket_allows_a_burst_then_paces_at_its_rate(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(throttle.time, "monotonic", lambda: now[0])
+    bucket = throttle.TokenBucket(rate=2.0, capacity=3)
+
+    assert [bucket._reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket._reserve() == pytest.approx(0.5)
+    assert bucket._reserve() == pytest.approx(1.0)
+
+    now[0] += 10
+    assert bucket._reserve() == 0.0
+
+
+def test_buckets_are_shared_per_kind_and_scope(monkeypatch):
+    monkeypatch.setenv("THROTTLE_QUOTA_FRACTION", "0.5")
+
+    bucket = throttle.get_bucket("update", "p.d.t")
+    assert throttle.get_bucket("update", "p.d.t") is bucket
+    assert throttle.get_bucket("update", "p.d.u") is not bucket
+    assert (bucket.rate, bucket.capacity) == (0.25, 2.5)
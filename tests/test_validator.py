@@ -0,0 +1,103 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from schema import Field
+from validator import Validator
+
+TABLE = {
+    "table_id": "validator_test",
+    "schema": [
+        Field("name", "STRING"),
+        Field("size", "INT64"),
+        Field("ratio", "FLOAT64"),
+        Field("enabled", "BOOL"),
+        Field("seen", "TIMESTAMP"),
+        Field("tags", "STRING", mode="REPEATED"),
+        Field("owner", "RECORD", fields=[Field("uid", "INT64"), Field("user", "STRING")]),
+        Field("args", "STRING"),
+    ],
+    "combine_columns": {"args": ["a0", "a1"]},
+}
+
+
+@pytest.fixture
+def validator():
+    return Validator(TABLE)
+
+
+def test_coerces_strings_and_epochs_to_declared_types(validator):
+    batch, rejected = validator.convert(
+        [
+            {"name": 1, "size": "42", "ratio": "0.5", "enabled": "true", "seen": 0},
+            {"size": 7.0, "enabled": False, "seen": "2026-01-02T03:04:05Z"},
+        ]
+    )
+
+    assert rejected == {}
+    assert batch.column("name").to_pylist() == ["1", None]
+    assert batch.column("size").to_pylist() == [42, 7]
+    assert batch.column("ratio").to_pylist() == [0.5, None]
+    assert batch.column("enabled").to_pylist() == [True, False]
+    assert batch.column("seen").to_pylist() == [
+        datetime(1970, 1, 1, tzinfo=timezone.utc),
+        datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    ]
+
+
+def test_rejects_only_the_failing_rows(validator):
+    batch, rejected = validator.convert(
+        [
+            {"name": "ok", "size": 1},
+            {"name": "bad", "size": "many"},
+            {"name": "unknown", "extra": 1},
+            {"name": "also ok", "size": "3"},
+        ]
+    )
+
+    assert batch.column("name").to_pylist() == ["ok", "also ok"]
+    assert batch.column("size").to_pylist() == [1, 3]
+    assert rejected[1].startswith("size:")
+    assert rejected[2] == "unknown field(s): extra"
+    assert set(rejected) == {1, 2}
+
+
+@pytest.mark.parametrize("value", [2**70, "99999999999999999999999", -(2**64), 1.5])
+def test_rejects_values_outside_int64_per_row(validator, value):
+    batch, rejected = validator.convert([{"size": 5}, {"size": value}, {"size": "7"}])
+
+    assert batch.column("size").to_pylist() == [5, 7]
+    assert list(rejected) == [1]
+    assert rejected[1].startswith("size:")
+
+
+def test_nested_and_repeated_columns(validator):
+    batch, rejected = validator.convert(
+        [
+            {"tags": ["a", 2], "owner": {"uid": "0", "user": "root"}},
+            {},
+            {"owner": {"uid": 1, "shell": "/bin/sh"}},
+            {"tags": "a"},
+        ]
+    )
+
+    assert batch.column("tags").to_pylist() == [["a", "2"], []]
+    assert batch.column("owner").to_pylist() == [{"uid": 0, "user": "root"}, None]
+    assert rejected == {
+        2: "unknown field(s): owner.shell",
+        3: "tags: expected array",
+    }
+
+
+def test_combine_columns_fill_the_declared_column(validator):
+    batch, rejected = validator.convert(
+        [
+            {"a0": "ls", "a1": "-l"},
+            {"a0": "id", "a1": None},
+            {"args": "kept", "a0": "ignored"},
+        ]
+    )
+
+    assert rejected == {}
+    assert batch.column("args").to_pylist() == ["ls -l", "id", "kept"]
+    assert "a0" not in batch.schema.names
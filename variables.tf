@@ -125,4 +125,36 @@ variable "cyngular_delegation_sa_email" {
   EOF
   type        = string
   default     = ""
-}
\ No newline at end of file
+}
+
+# -----------
+variable "retention" {
+  description = <<EOF
+    Partition retention of the Cyngular BigQuery tables.
+
+    Every table is in the "standard" tier (default 7 days) unless moved with table_tiers;
+    "short" (default 3 days) and "extended" (default 30 days) are available to opt into.
+    0 days disables expiration. Shortening a table's retention deletes its existing
+    partitions older than the new length on the next apply.
+
+    Optional fields:
+      - tiers: tier name -> days, overriding the default length of a tier or adding a tier
+      - table_tiers: table ID -> tier name, moving a table (and its _changes table) to another tier
+
+    Example:
+      retention = {
+        tiers       = { extended = 90 }
+        table_tiers = { os_linux_auth = "extended", os_windows_web_browsers = "short" }
+      }
+  EOF
+  type = object({
+    tiers       = optional(map(number), {})
+    table_tiers = optional(map(string), {})
+  })
+  default = {}
+
+  validation {
+    condition     = alltrue([for days in values(var.retention.tiers) : days >= 0 && floor(days) == days])
+    error_message = "retention.tiers must map tier names to whole numbers of days >= 0."
+  }
+}